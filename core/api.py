@@ -0,0 +1,217 @@
+"""In-process Python API.
+
+    from core import api
+
+    session = api.Session()                       # reads profiles.json once
+    env = session.resolve_env("dev", "app")
+    res = session.run("dev", "app", ["server", "list", "-f", "json"])
+    res.code, res.stdout, res.timings             # bytes stdout, seconds per phase
+    rep = session.report(out="out/reports", format="json", summary=True)
+    rep.code, rep.files, rep.summary
+
+The module-level ``resolve_env``, ``run``, ``popen`` and ``report`` use a
+shared default session. Nothing here prompts or calls sys.exit. Errors are
+raised instead:
+    LookupError        unknown profile or catalog
+    FileNotFoundError  catalog neither imported nor backed by an RC file
+    ValueError         missing OS_AUTH_URL/OS_USERNAME/OS_PASSWORD, bad option
+    RuntimeError       the openstack CLI could not be found or bootstrapped
+"""
+import argparse
+import io
+import json
+import subprocess
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+from core.config import (
+    ensure_profiles_structure,
+    get_catalog_env,
+    load_profiles_config,
+    missing_vars,
+    select_catalogs,
+)
+from core import keystone, respcache
+from core.env import ensure_openstack_available
+from core.rc import build_rc_path, parse_rc_file
+from core.commands import report_cmd
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+@dataclass
+class RunResult:
+    code: int
+    stdout: bytes
+    stderr: bytes
+    cmd: List[str]
+    # Seconds spent resolving the env, locating openstack, and running it
+    timings: Dict[str, float] = field(default_factory=dict)
+
+
+@dataclass
+class ReportResult:
+    code: int
+    out: Path
+    files: List[Path]
+    summary: Optional[dict]
+    messages: str
+    elapsed: float
+
+
+class Session:
+    """Loaded config plus the located `openstack` CLI, reusable across calls (thread-safe)."""
+
+    def __init__(self, repo_root: Path = None, profiles: dict = None, username: str = None, password: str = None):
+        self.repo_root = Path(repo_root) if repo_root else REPO_ROOT
+        self.username = username
+        self.password = password
+        self._lock = threading.Lock()
+        self._openstack = {}
+        if profiles is None:
+            self.reload()
+        else:
+            self.profiles = ensure_profiles_structure(profiles)
+
+    def reload(self):
+        """Re-read profiles.json (after `config import-rc`/`set-cred` elsewhere)."""
+        profiles, _, _ = load_profiles_config(self.repo_root)
+        self.profiles = ensure_profiles_structure(profiles)
+
+    def catalogs(self, profile: str = None, catalog: str = None):
+        """[(profile, catalog)] matching the filters; LookupError if nothing matches."""
+        return [(p, c) for p, c, _, _ in select_catalogs(self.profiles, profile, catalog)]
+
+    def resolve_env(self, profile: str, catalog: str, rc_file: str = None, check: bool = True) -> dict:
+        """Child environment for a catalog, with the same precedence as the CLI."""
+        pdata = self.profiles.get("profiles", {}).get(profile)
+        if pdata is None:
+            raise LookupError("Profile not found: %s" % profile)
+        rc_env = get_catalog_env(self.profiles, profile, catalog) or {}
+        if not rc_env:
+            rc_env = parse_rc_file(build_rc_path(self.repo_root, profile, catalog, rc_file))
+        creds = SimpleNamespace(username=self.username, password=self.password)
+        env = report_cmd.task_env(creds, profile, catalog, rc_env, pdata)
+        missing = missing_vars(env)
+        if check and missing:
+            raise ValueError("Missing required variables: %s" % ", ".join(missing))
+        return env
+
+    def openstack(self, env: dict):
+        """Return (env, path of `openstack`), bootstrapping the venv on first use."""
+        key = env.get("PATH", "")
+        with self._lock:
+            cached = self._openstack.get(key)
+            if cached is None:
+                try:
+                    new_env, exe = ensure_openstack_available(self.repo_root, env)
+                except subprocess.CalledProcessError as e:
+                    raise RuntimeError("Failed to bootstrap virtualenv for openstackclient: %s" % e) from e
+                if not exe:
+                    raise RuntimeError("'openstack' CLI not found and auto-setup failed")
+                cached = self._openstack[key] = (new_env.get("PATH", key), exe)
+        path, exe = cached
+        return dict(env, PATH=path), exe
+
+    def _prepare(self, profile, catalog, argv, env_overrides):
+        started = time.monotonic()
+        env = self.resolve_env(profile, catalog)
+        env.update(env_overrides or {})
+        resolved = time.monotonic()
+        child_env, exe = self.openstack(keystone.select_auth_url(env))
+        timings = {"env": resolved - started, "bootstrap": time.monotonic() - resolved}
+        return [exe] + list(argv), child_env, timings, env
+
+    def run(self, profile: str, catalog: str, argv, input: bytes = None, timeout: float = None, env=None) -> RunResult:
+        """Run `openstack <argv>` for a catalog and capture its output.
+
+        A failed read-only command is repeated on an alternate auth URL if
+        the one used stopped answering (see core.authurls). A mutating one
+        drops the catalog's cached responses (see core.respcache).
+        """
+        cmd, child_env, timings, cache_env = self._prepare(profile, catalog, argv, env)
+        mutating = respcache.is_mutating(argv)
+        if mutating:
+            respcache.ResponseCache().invalidate(cache_env)
+        started = time.monotonic()
+        try:
+            proc = subprocess.run(cmd, env=child_env, input=input, capture_output=True, timeout=timeout)
+            tried = set()
+            while proc.returncode != 0 and respcache.is_read_only(argv):
+                child_env = keystone.fail_over(child_env, tried)
+                if child_env is None:
+                    break
+                proc = subprocess.run(cmd, env=child_env, input=input, capture_output=True, timeout=timeout)
+        finally:
+            if mutating:
+                # Again: a listing that ran meanwhile may have cached the old state
+                respcache.ResponseCache().invalidate(cache_env)
+        timings["command"] = time.monotonic() - started
+        return RunResult(proc.returncode, proc.stdout, proc.stderr, cmd, timings)
+
+    def popen(self, profile: str, catalog: str, argv, env=None, **kwargs) -> subprocess.Popen:
+        """Start `openstack <argv>` with stdout piped, for streaming large output."""
+        cmd, child_env, _, _ = self._prepare(profile, catalog, argv, env)
+        kwargs.setdefault("stdout", subprocess.PIPE)
+        return subprocess.Popen(cmd, env=child_env, **kwargs)
+
+    def report(self, out="out/reports", profile: str = None, catalog: str = None, **options) -> ReportResult:
+        """Run `ossc report` in-process; ``options`` are the report flags (format, summary, regions, ...).
+
+        Messages the command prints are returned in ``messages``.
+        """
+        args = report_args(out=str(out), profile=profile, catalog=catalog, **options)
+        args.username, args.password = self.username, self.password
+        buf = io.StringIO()
+        started = time.monotonic()
+        code, written = report_cmd.run_report(args, self.repo_root, self.profiles, out=buf)
+        summary = None
+        summary_file = Path(out) / "summary.json"
+        if getattr(args, "summary", False) and summary_file in written:
+            summary = json.loads(summary_file.read_text(encoding="utf-8"))
+        return ReportResult(code, Path(out), written, summary, buf.getvalue(), time.monotonic() - started)
+
+
+def report_args(**options):
+    """Namespace with the `report` defaults, overridden by ``options``."""
+    parser = argparse.ArgumentParser(add_help=False)
+    report_cmd.add_subparser(parser.add_subparsers(dest="subcmd"))
+    args = parser.parse_args(["report"])
+    known = report_cmd.run_option_names() | {"profile", "catalog"}
+    for key, value in options.items():
+        if key not in known:
+            raise ValueError("Unknown report option: %s" % key)
+        setattr(args, key, value)
+    return args
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_session() -> Session:
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = Session()
+        return _default
+
+
+def resolve_env(profile: str, catalog: str, **kwargs) -> dict:
+    return default_session().resolve_env(profile, catalog, **kwargs)
+
+
+def run(profile: str, catalog: str, argv, **kwargs) -> RunResult:
+    return default_session().run(profile, catalog, argv, **kwargs)
+
+
+def popen(profile: str, catalog: str, argv, **kwargs) -> subprocess.Popen:
+    return default_session().popen(profile, catalog, argv, **kwargs)
+
+
+def report(**kwargs) -> ReportResult:
+    return default_session().report(**kwargs)
@@ -0,0 +1,229 @@
+"""Alternate Keystone URLs per catalog, with a latency/health cache and failover.
+
+A catalog lists equivalent auth URLs (e.g. regional VIPs) in
+``OSSC_AUTH_URLS``, separated by commas or whitespace, next to its
+``OS_AUTH_URL``. Each URL's smoothed latency and health is kept in
+$XDG_CACHE_HOME/ossc/auth-urls.json and shared by all ossc processes.
+
+``select`` probes URLs whose entry is stale (a GET of the auth URL; any HTTP
+answer counts as healthy) and points OS_AUTH_URL at the fastest healthy one.
+``failover`` is called after a failed child: if its URL no longer answers,
+it is marked down and the next healthy URL is returned. Keystone requests
+made by ossc itself go through ``order`` and fail over on their own; their
+latencies are kept in memory and written when a URL's health changes or
+the process exits.
+Catalogs without alternates are never probed.
+"""
+import atexit
+import json
+import os
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+URLS_VAR = "OSSC_AUTH_URLS"
+# Seconds a healthy / failed measurement is trusted before probing again
+HEALTHY_TTL = 300
+DOWN_TTL = 30
+PROBE_TIMEOUT = 3.0
+# Weight of the newest measurement in the latency moving average
+ALPHA = 0.3
+
+
+def cache_path() -> Path:
+    base = os.getenv("XDG_CACHE_HOME")
+    return (Path(base) if base else Path.home() / ".cache") / "ossc" / "auth-urls.json"
+
+
+def candidates(env) -> list:
+    """OS_AUTH_URL followed by the alternates, without duplicates."""
+    urls = [env.get("OS_AUTH_URL") or ""] + re.split(r"[\s,]+", env.get(URLS_VAR) or "")
+    seen = []
+    for url in urls:
+        url = url.strip().rstrip("/")
+        if url and url not in seen:
+            seen.append(url)
+    return seen
+
+
+class HealthCache:
+    """Per-URL ``{"latency", "ok", "checked", "failures"}``, thread-safe."""
+
+    def __init__(self, path: Path = None):
+        self.path = Path(path) if path else cache_path()
+        self._lock = threading.Lock()
+        self.entries = self._read()
+        self.dirty = False
+
+    def _read(self):
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def get(self, url):
+        with self._lock:
+            return self.entries.get(url)
+
+    def stale(self, url, now=None) -> bool:
+        entry = self.get(url)
+        if entry is None:
+            return True
+        ttl = HEALTHY_TTL if entry.get("ok") else DOWN_TTL
+        return (now if now is not None else time.time()) - entry.get("checked", 0) >= ttl
+
+    def healthy(self, url) -> bool:
+        entry = self.get(url)
+        return entry is None or bool(entry.get("ok"))
+
+    def record(self, url, seconds=None, now=None) -> bool:
+        """A response from ``url`` after ``seconds``; ``None`` marks it down.
+
+        Only updates memory; returns True if the URL's health changed (or it
+        was not known), i.e. when other processes should hear about it.
+        """
+        with self._lock:
+            known = self.entries.get(url)
+            entry = dict(known or {})
+            if seconds is None:
+                entry.update(ok=False, failures=entry.get("failures", 0) + 1)
+            else:
+                old = entry.get("latency")
+                latency = seconds if old is None else ALPHA * seconds + (1 - ALPHA) * old
+                entry.update(ok=True, latency=round(latency, 4), failures=0)
+            entry["checked"] = round(now if now is not None else time.time(), 3)
+            self.entries[url] = entry
+            self.dirty = True
+            return known is None or bool(known.get("ok")) != entry["ok"]
+
+    def rank(self, urls) -> list:
+        """Healthy URLs by latency, then unmeasured ones, then those marked down (stable)."""
+
+        def key(url):
+            entry = self.get(url)
+            if entry is None:
+                return (1, 0.0)
+            if not entry.get("ok"):
+                return (2, 0.0)
+            return (0, entry.get("latency") or 0.0)
+
+        return sorted(urls, key=key)
+
+    def save(self):
+        """Write the cache, keeping newer measurements other processes saved meanwhile."""
+        with self._lock:
+            merged = self._read()
+            for url, entry in self.entries.items():
+                if entry.get("checked", 0) >= (merged.get(url) or {}).get("checked", 0):
+                    merged[url] = entry
+            self.entries = merged
+            self.dirty = False
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = self.path.with_name(self.path.name + ".%d.%d.tmp" % (os.getpid(), threading.get_ident()))
+                tmp.write_text(json.dumps(merged, indent=1, sort_keys=True) + "\n", encoding="utf-8")
+                os.replace(tmp, self.path)
+            except OSError:
+                pass  # the cache only speeds up selection
+
+    def flush(self):
+        """Save measurements recorded since the last save, if any."""
+        if self.dirty:
+            self.save()
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_cache() -> HealthCache:
+    """Process-wide cache for the current $XDG_CACHE_HOME, flushed at exit."""
+    global _shared
+    with _shared_lock:
+        if _shared is None or _shared.path != cache_path():
+            if _shared is not None:
+                _shared.flush()
+            _shared = HealthCache()
+            atexit.register(_shared.flush)
+        return _shared
+
+
+def probe(url, timeout=PROBE_TIMEOUT, context=None):
+    """Seconds until ``url`` answered (any HTTP status), or None if it did not."""
+    req = urllib.request.Request(url, headers={"Accept": "application/json"})
+    started = time.monotonic()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout, context=context) as resp:
+            resp.read()
+    except urllib.error.HTTPError:
+        pass
+    except (urllib.error.URLError, OSError):
+        return None
+    return time.monotonic() - started
+
+
+def refresh(urls, cache: HealthCache, context=None, timeout=PROBE_TIMEOUT):
+    """Probe the stale ``urls`` concurrently and save what was measured."""
+    stale = [url for url in urls if cache.stale(url)]
+    if not stale:
+        return
+    with ThreadPoolExecutor(max_workers=len(stale)) as pool:
+        for url, seconds in zip(stale, pool.map(lambda u: probe(u, timeout, context), stale)):
+            cache.record(url, seconds)
+    cache.save()
+
+
+def order(env, cache: HealthCache = None) -> list:
+    """Candidates in the order to try them, without probing."""
+    urls = candidates(env)
+    if len(urls) < 2:
+        return urls
+    return (cache or shared_cache()).rank(urls)
+
+
+_select_lock = threading.Lock()
+
+
+def select(env, context=None, cache: HealthCache = None) -> dict:
+    """``env`` with OS_AUTH_URL set to the fastest healthy candidate."""
+    urls = candidates(env)
+    if len(urls) < 2:
+        return env
+    cache = cache or shared_cache()
+    # One prober at a time; concurrent report tasks reuse its measurements
+    with _select_lock:
+        refresh(urls, cache, context)
+    best = cache.rank(urls)[0]
+    return env if best == env.get("OS_AUTH_URL") else dict(env, OS_AUTH_URL=best)
+
+
+def failover(env, tried, context=None, cache: HealthCache = None):
+    """After a failed run with ``env``: env for the next healthy URL, or None.
+
+    Returns None when the URL used still answers (the failure was not the
+    endpoint's) or no untried healthy candidate is left. ``tried`` is a set
+    of URLs already used; it is updated.
+    """
+    urls = candidates(env)
+    if len(urls) < 2:
+        return None
+    cache = cache or shared_cache()
+    current = urls[0]
+    tried.add(current)
+    seconds = probe(current, context=context)
+    cache.record(current, seconds)
+    cache.save()
+    if seconds is not None:
+        return None
+    with _select_lock:
+        refresh([u for u in urls if u not in tried], cache, context)
+    for url in cache.rank(urls):
+        if url not in tried and cache.healthy(url):
+            tried.add(url)
+            return dict(env, OS_AUTH_URL=url)
+    return None
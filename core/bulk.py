@@ -0,0 +1,372 @@
+"""Bulk server actions against the Compute API (`ossc bulk`).
+
+The catalog authenticates once; every worker then calls Nova directly with
+that token over its own keep-alive connection. No `openstack` process is
+started per server. Transient failures (429, 5xx, dropped connections) are
+retried with backoff, honouring Retry-After. An expired token (401) is
+renewed once for all workers. Targets that still fail are written to a
+manifest, which can be passed back with --file.
+"""
+import http.client
+import json
+import random
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote, urlencode, urlparse
+
+from core import keystone
+from core.regions import endpoint_url
+
+# action -> (HTTP method, path under /servers/<id>, body); "tag" is built from --tag
+ACTIONS = {
+    "delete": ("DELETE", "", None),
+    "start": ("POST", "/action", {"os-start": None}),
+    "stop": ("POST", "/action", {"os-stop": None}),
+    "reboot": ("POST", "/action", {"reboot": {"type": "SOFT"}}),
+    "hard-reboot": ("POST", "/action", {"reboot": {"type": "HARD"}}),
+    "lock": ("POST", "/action", {"lock": None}),
+    "unlock": ("POST", "/action", {"unlock": None}),
+    "tag": ("PUT", "/tags/%s", None),
+}
+# bulk --filter keys -> Nova `GET /servers` query parameters
+LIST_FILTERS = {
+    "status": "status",
+    "name": "name",
+    "flavor": "flavor",
+    "image": "image",
+    "host": "host",
+    "ip": "ip",
+    "availability-zone": "availability_zone",
+    "tags": "tags",
+    "changes-since": "changes-since",
+}
+TRANSIENT_STATUSES = {429, 500, 502, 503, 504}
+# Statuses returned before Nova acts on a request, so even a non-idempotent one can be resent
+REJECTED_STATUSES = {429, 503}
+# Non-idempotent actions -> (status once done, task states while running, status before);
+# after a lost response the server's state decides instead of sending them again
+ACTION_EFFECTS = {
+    "start": ("ACTIVE", {"powering-on"}, "SHUTOFF"),
+    "stop": ("SHUTOFF", {"powering-off"}, "ACTIVE"),
+    "reboot": (None, {"rebooting", "reboot_pending", "reboot_started"}, None),
+    "hard-reboot": (None, {"rebooting_hard", "reboot_pending_hard", "reboot_started_hard"}, None),
+}
+# Server tags need compute microversion 2.26
+TAG_MICROVERSION = "2.26"
+# Nova rejects longer tags and tags containing these characters
+TAG_MAX_LENGTH = 60
+TAG_FORBIDDEN = "/,"
+RE_UUID = re.compile(r"^[0-9a-f]{8}-?[0-9a-f]{4}-?[0-9a-f]{4}-?[0-9a-f]{4}-?[0-9a-f]{12}$", re.I)
+
+
+class ComputeError(Exception):
+    def __init__(self, message, status=None, retry_after=None, sent=True):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+        # False only if the connection failed before the request was sent
+        self.sent = sent
+
+    @property
+    def transient(self):
+        return self.status is None or self.status in TRANSIENT_STATUSES
+
+
+def _error_message(raw: bytes) -> str:
+    try:
+        data = json.loads(raw.decode("utf-8"))
+        return next(iter(data.values()))["message"]
+    except Exception:
+        return raw.decode("utf-8", "replace").strip()[:200]
+
+
+class ComputeSession:
+    """One scoped token and compute endpoint shared by all workers (thread-safe)."""
+
+    def __init__(self, env: dict, timeout: float = 30):
+        self.env = env
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._conns = []
+        # Date header of the last response: the cloud's clock, for changes-since
+        self.date = None
+        self.authenticate()
+
+    def authenticate(self, stale=None):
+        """(Re-)authenticate unless another worker already replaced the ``stale`` token."""
+        with self._lock:
+            if stale is not None and stale != self.token:
+                return
+            token = keystone.authenticate(self.env, timeout=self.timeout)
+            url = endpoint_url(self.env, token["catalog"], "compute")
+            if not url:
+                region = self.env.get("OS_REGION_NAME") or "any region"
+                raise keystone.KeystoneError(f"no compute endpoint for {region} in the service catalog")
+            self.token = token["id"]
+            self.url = urlparse(url.rstrip("/"))
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self.url.scheme == "https":
+                conn = http.client.HTTPSConnection(
+                    self.url.netloc, timeout=self.timeout, context=keystone.ssl_context(self.env)
+                )
+            else:
+                conn = http.client.HTTPConnection(self.url.netloc, timeout=self.timeout)
+            self._local.conn = conn
+            with self._lock:
+                self._conns.append(conn)
+        return conn
+
+    def close(self):
+        with self._lock:
+            conns, self._conns = self._conns, []
+        for conn in conns:
+            conn.close()
+
+    def request(self, method, path, body=None, headers=None, retry_auth=True):
+        """Send one request; return the decoded JSON body (or None). Raises ComputeError."""
+        token = self.token
+        all_headers = {"X-Auth-Token": token, "Accept": "application/json"}
+        all_headers.update(headers or {})
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode("utf-8")
+            all_headers["Content-Type"] = "application/json"
+        conn = self._connection()
+        sent = False
+        try:
+            conn.request(method, self.url.path + path, body=data, headers=all_headers)
+            sent = True
+            resp = conn.getresponse()
+            raw = resp.read()
+        except (http.client.HTTPException, OSError) as e:
+            conn.close()
+            self._local.conn = None
+            raise ComputeError(f"connection failed: {e}", sent=sent) from e
+        self.date = resp.getheader("Date") or self.date
+        if resp.status == 401 and retry_auth:
+            self.authenticate(stale=token)
+            return self.request(method, path, body, headers, retry_auth=False)
+        if resp.status >= 400:
+            retry_after = resp.getheader("Retry-After")
+            raise ComputeError(
+                f"HTTP {resp.status}: {_error_message(raw)}",
+                status=resp.status,
+                retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None,
+            )
+        return json.loads(raw.decode("utf-8")) if raw else None
+
+    def list_servers(self, filters=(), page_size=1000, detail=False):
+        """Yield servers matching Nova query ``filters``, following pagination."""
+        params = dict(filters, limit=str(page_size))
+        path = "/servers/detail?" if detail else "/servers?"
+        while True:
+            payload = self.request("GET", path + urlencode(params)) or {}
+            servers = payload.get("servers", [])
+            yield from servers
+            if not servers or not any(link.get("rel") == "next" for link in payload.get("servers_links", [])):
+                return
+            params["marker"] = servers[-1]["id"]
+
+
+def check_tag(tag):
+    """Raise ValueError for a server tag Nova would not accept."""
+    if not tag:
+        raise ValueError("Empty tag")
+    if len(tag) > TAG_MAX_LENGTH:
+        raise ValueError(f"Tag longer than {TAG_MAX_LENGTH} characters: {tag}")
+    bad = sorted(set(tag) & set(TAG_FORBIDDEN))
+    if bad:
+        raise ValueError(f"Tag must not contain {' or '.join(repr(c) for c in bad)}: {tag}")
+
+
+def action_request(action, server_id, tag=None):
+    method, path, body = ACTIONS[action]
+    headers = None
+    if action == "tag":
+        path = path % quote(tag, safe="")
+        headers = {"OpenStack-API-Version": "compute " + TAG_MICROVERSION}
+    return method, f"/servers/{server_id}{path}", body, headers
+
+
+def parse_filters(values, allowed=LIST_FILTERS):
+    """Parse KEY=VALUE filters into an ordered list of (key, value); raise ValueError on bad input."""
+    filters = []
+    for item in values or []:
+        key, sep, value = item.partition("=")
+        key = key.strip().lower().replace("_", "-")
+        if not sep or not key or not value:
+            raise ValueError(f"Invalid filter '{item}': expected KEY=VALUE")
+        if key not in allowed:
+            raise ValueError(f"Unknown filter '{key}'; supported: {', '.join(allowed)}")
+        filters.append((key, value))
+    return filters
+
+
+def read_lines(path):
+    """Lines of a targets file; '-' reads stdin."""
+    if path == "-":
+        return sys.stdin.readlines()
+    with open(path, encoding="utf-8") as f:
+        return f.readlines()
+
+
+def read_targets(lines):
+    """Targets from manifest-style lines: first word per line, '#' comments and blanks ignored."""
+    targets = {}
+    for line in lines:
+        words = line.split("#", 1)[0].split()
+        if words:
+            targets.setdefault(words[0], None)
+    return list(targets)
+
+
+def resolve_targets(session, targets, servers=None):
+    """Map names to server IDs with one listing. Returns ([(target, id)], {target: error}).
+
+    ``servers`` is a listing the caller already has; it is used instead of listing again.
+    """
+    names = [t for t in targets if not RE_UUID.match(t)]
+    by_name = {}
+    if names:
+        for server in session.list_servers() if servers is None else servers:
+            by_name.setdefault(server.get("name"), []).append(server["id"])
+    resolved, errors = [], {}
+    for target in targets:
+        if RE_UUID.match(target):
+            resolved.append((target, target))
+            continue
+        ids = by_name.get(target, [])
+        if len(ids) == 1:
+            resolved.append((target, ids[0]))
+        else:
+            errors[target] = "no server with this name" if not ids else f"name matches {len(ids)} servers"
+    return resolved, errors
+
+
+class Progress:
+    """Throttled done/failed/rate/ETA line on stderr (redrawn in place on a terminal)."""
+
+    def __init__(self, label, total, stream=None, interval=None):
+        self.label = label
+        self.total = total
+        self.stream = stream or sys.stderr
+        self.tty = self.stream.isatty()
+        self.interval = interval if interval is not None else (0.2 if self.tty else 5.0)
+        self.started = time.monotonic()
+        self.done = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+        self._shown = 0.0
+
+    def line(self):
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        rate = self.done / elapsed
+        eta = (self.total - self.done) / rate if rate else 0
+        return (
+            f"{self.label}: {self.done}/{self.total} done, {self.failed} failed, "
+            f"{rate:.1f}/s, elapsed {elapsed:.0f}s, ETA {eta:.0f}s"
+        )
+
+    def update(self, ok: bool):
+        with self._lock:
+            self.done += 1
+            self.failed += 0 if ok else 1
+            now = time.monotonic()
+            if now - self._shown >= self.interval or self.done == self.total:
+                self._shown = now
+                self._write()
+
+    def _write(self):
+        if self.tty:
+            self.stream.write("\r\033[K" + self.line())
+        else:
+            self.stream.write(self.line() + "\n")
+        self.stream.flush()
+
+    def finish(self):
+        with self._lock:
+            if self.tty:
+                self.stream.write("\n")
+                self.stream.flush()
+
+
+def _applied(session, action, server_id):
+    """Whether a non-idempotent ``action`` took effect: True, False, or None if its state cannot tell."""
+    server = (session.request("GET", f"/servers/{server_id}") or {}).get("server") or {}
+    status = (server.get("status") or "").upper()
+    task = server.get("OS-EXT-STS:task_state")
+    done, running, before = ACTION_EFFECTS[action]
+    if status == done or task in running:
+        return True
+    if status == before and not task:
+        return False
+    return None
+
+
+def run_action(session, action, server_id, tag=None, retries=3, backoff=1.0, sleep=time.sleep):
+    """Run one action with retries; return (error or None, attempts).
+
+    Idempotent actions are sent again after any transient error. A start,
+    stop or reboot is sent again only if it never reached Nova or was
+    rejected (429, 503); otherwise the server is looked up to see whether
+    it took effect, so a retry does not fail with 409 on a server that is
+    already rebooting.
+    """
+    method, path, body, headers = action_request(action, server_id, tag)
+    check = False
+    for attempt in range(1, retries + 2):
+        try:
+            if check:
+                applied = _applied(session, action, server_id)
+                if applied:
+                    return None, attempt
+                if applied is None:
+                    return f"{error}; server state does not show whether {action} took effect", attempt
+                check = False
+            session.request(method, path, body, headers)
+            return None, attempt
+        except ComputeError as e:
+            if e.status == 404 and action == "delete":
+                return None, attempt  # already gone
+            if not e.transient:
+                return str(e), attempt
+            if attempt > retries:
+                return str(error if check else e), attempt
+            if not check and action in ACTION_EFFECTS and e.sent and e.status not in REJECTED_STATUSES:
+                check, error = True, e  # it may have been applied: look before sending again
+            delay = e.retry_after if e.retry_after is not None else backoff * 2 ** (attempt - 1)
+            sleep(delay * random.uniform(1.0, 1.25))
+
+
+def run_bulk(session, action, targets, tag=None, jobs=16, retries=3, backoff=1.0, progress=None):
+    """Run ``action`` on [(target, server_id)] concurrently; return {target: error} for failures."""
+    failures = {}
+
+    def work(item):
+        target, server_id = item
+        error, _ = run_action(session, action, server_id, tag=tag, retries=retries, backoff=backoff)
+        if progress:
+            progress.update(error is None)
+        return target, error
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        for target, error in pool.map(work, targets):
+            if error:
+                failures[target] = error
+    return failures
+
+
+def write_manifest(path, failures, header=""):
+    """Write failed targets one per line, with the error as a comment; re-feed with --file."""
+    with open(path, "w", encoding="utf-8") as f:
+        if header:
+            f.write(f"# {header}\n")
+        for target, error in failures.items():
+            f.write(f"{target}  # {error}\n")
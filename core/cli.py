@@ -3,10 +3,15 @@ import os
 import shlex
 import subprocess
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from getpass import getpass
 from pathlib import Path
 
 from core.config import (
+    REQUIRED_VARS,
+    caller_environ,
     load_profiles_config,
     ensure_profiles_structure,
     get_catalog_env,
@@ -15,9 +20,13 @@ from core.config import (
     save_profiles_config,
     config_path,
 )
+from core import keystone
 from core.env import ensure_openstack_available
 from core.rc import parse_rc_file, build_rc_path
-from core.commands import config_cmd, report_cmd
+from core.commands import bulk_cmd, config_cmd, image_cmd, profile_cmd, report_cmd, serve_cmd, stats_cmd, wait_cmd
+from core.profiling import PROFILE_MODES, artifact_name, run_profiled
+from core.regions import parse_regions, region_envs
+from core import latency, respcache
 
 
 KNOWN_OPTS_WITH_VALUE = {
@@ -26,8 +35,14 @@ KNOWN_OPTS_WITH_VALUE = {
     "--rc-file",
     "--username",
     "--password",
+    "--profile-child",
+    "--profile-out",
+    "--regions",
 }
-KNOWN_FLAGS = {"--dry-run"}
+KNOWN_FLAGS = {"--dry-run", "--cache", "--no-cache"}
+# Run-mode commands handled by ossc itself instead of being forwarded
+LOCAL_COMMANDS = {"env", "shell"}
+SUBCOMMANDS = {"config", "report", "profile-summary", "serve-http", "stats", "bulk", "image-upload", "wait"}
 
 
 def _first_positional(argv):
@@ -55,6 +70,40 @@ def _first_positional(argv):
     return None
 
 
+def add_run_args(parser):
+    parser.add_argument("--profile", required=False, help="Profile name (e.g. dev, prod)")
+    parser.add_argument("--catalog", required=False, help="Catalog name (e.g. app, infra)")
+    parser.add_argument("--rc-file", help="Override RC file path")
+    parser.add_argument("--username", help="Override OS_USERNAME")
+    parser.add_argument("--password", help="Override OS_PASSWORD")
+    parser.add_argument("--dry-run", action="store_true", help="Print env and command without executing")
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Serve allowlisted read-only commands (flavor list, image list, ...) from a local cache; "
+        "also enabled by OSSC_CACHE=1",
+    )
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the response cache for this call")
+    parser.add_argument(
+        "--regions",
+        metavar="all|R1,R2",
+        help="Run the command in these regions (or all in the service catalog) concurrently with one token",
+    )
+    parser.add_argument(
+        "--profile-child",
+        choices=PROFILE_MODES,
+        help="Run the openstack child under cProfile or -X importtime and save the result",
+    )
+    parser.add_argument(
+        "--profile-out", default="out/profiles", help="Directory for --profile-child artifacts (default out/profiles)"
+    )
+    parser.add_argument(
+        "command",
+        nargs=argparse.REMAINDER,
+        help="Command to pass to openstack; 'env' prints shell exports, 'shell' starts a subshell",
+    )
+
+
 def build_parser():
     parser = argparse.ArgumentParser(
         prog="ossc",
@@ -68,15 +117,15 @@ def build_parser():
     # Subcommands
     config_cmd.add_subparser(subparsers)
     report_cmd.add_subparser(subparsers)
+    profile_cmd.add_subparser(subparsers)
+    serve_cmd.add_subparser(subparsers)
+    stats_cmd.add_subparser(subparsers)
+    bulk_cmd.add_subparser(subparsers)
+    image_cmd.add_subparser(subparsers)
+    wait_cmd.add_subparser(subparsers)
 
     # Default run-mode args
-    parser.add_argument("--profile", required=False, help="Profile name (e.g. dev, prod)")
-    parser.add_argument("--catalog", required=False, help="Catalog name (e.g. app, infra)")
-    parser.add_argument("--rc-file", help="Override RC file path")
-    parser.add_argument("--username", help="Override OS_USERNAME")
-    parser.add_argument("--password", help="Override OS_PASSWORD")
-    parser.add_argument("--dry-run", action="store_true", help="Print env and command without executing")
-    parser.add_argument("command", nargs=argparse.REMAINDER, help="Command to pass to openstack")
+    add_run_args(parser)
     return parser
 
 
@@ -88,20 +137,21 @@ def build_default_parser():
         ),
         add_help=True,
     )
-    parser.add_argument("--profile", required=False, help="Profile name (e.g. dev, prod)")
-    parser.add_argument("--catalog", required=False, help="Catalog name (e.g. app, infra)")
-    parser.add_argument("--rc-file", help="Override RC file path")
-    parser.add_argument("--username", help="Override OS_USERNAME")
-    parser.add_argument("--password", help="Override OS_PASSWORD")
-    parser.add_argument("--dry-run", action="store_true", help="Print env and command without executing")
-    parser.add_argument("command", nargs=argparse.REMAINDER, help="Command to pass to openstack")
+    add_run_args(parser)
     return parser
 
 
-def handle_default(args, repo_root: Path):
-    if not args.profile or not args.catalog:
-        raise SystemExit("--profile and --catalog are required unless using 'config' or 'report'")
+def resolve_run_env(args, repo_root: Path, interactive: bool = True, inherit_os: bool = True):
+    """Resolve the child environment for --profile/--catalog.
 
+    Returns (env, rc_source, rc_env). Prompts for missing credentials on a
+    TTY (and stores them) unless ``interactive`` is False. With
+    ``inherit_os=False`` the caller's OS_* variables are ignored, credentials
+    included; otherwise only those exported by `env` for another catalog are.
+    """
+    environ = caller_environ(args.profile, args.catalog)
+    if not inherit_os:
+        environ = {k: v for k, v in environ.items() if not k.startswith("OS_")}
     profiles, cfg_path, _ = load_profiles_config(repo_root)
     profiles = ensure_profiles_structure(profiles)
     cfg_env = get_catalog_env(profiles, args.profile, args.catalog) or {}
@@ -115,8 +165,8 @@ def handle_default(args, repo_root: Path):
 
     profile_entry = profiles.get("profiles", {}).get(args.profile, {})
     need_username = not resolve_username(args, profile_entry, rc_env)
-    need_password = not resolve_password(args, profile_entry, rc_env)
-    if sys.stdin.isatty() and (need_username or need_password):
+    need_password = not resolve_password(args, profile_entry, rc_env, environ)
+    if interactive and sys.stdin.isatty() and (need_username or need_password):
         print("First-time setup for profile '%s'." % args.profile)
         rc_user = rc_env.get("OS_USERNAME") or profile_entry.get("username")
         if need_username:
@@ -134,27 +184,56 @@ def handle_default(args, repo_root: Path):
             save_profiles_config(config_path(), profiles)
 
     effective_profile = profiles.get("profiles", {}).get(args.profile, {})
-    password = resolve_password(args, effective_profile, rc_env)
+    password = resolve_password(args, effective_profile, rc_env, environ)
     username = resolve_username(args, effective_profile, rc_env)
 
-    env = os.environ.copy()
+    env = dict(environ)
     env.update(rc_env)
     if username:
         env["OS_USERNAME"] = username
     if password:
         env["OS_PASSWORD"] = password
+    return env, rc_source, rc_env
+
+
+def _command_parts(args):
+    parts = list(args.command or [])
+    if parts and parts[0] == "--":
+        parts = parts[1:]
+    return parts
+
+
+def handle_default(args, repo_root: Path):
+    if not args.profile or not args.catalog:
+        raise SystemExit("--profile and --catalog are required unless using 'config' or 'report'")
+    started = time.monotonic()
+
+    # `env` / `shell` set up the environment once instead of proxying a command;
+    # `ossc ... -- env` still forwards to openstack.
+    local_cmd = args.command[0] if args.command and args.command[0] in LOCAL_COMMANDS else None
+    env, rc_source, rc_env = resolve_run_env(
+        args, repo_root, interactive=local_cmd != "env", inherit_os=local_cmd is None
+    )
 
-    missing = [k for k in ("OS_AUTH_URL", "OS_USERNAME", "OS_PASSWORD") if not env.get(k)]
+    missing = [k for k in REQUIRED_VARS if not env.get(k)]
     if missing:
         print("Missing required variables: %s" % ", ".join(missing), file=sys.stderr)
         return 2
 
-    cmd = ["openstack"]
-    if args.command:
-        parts = args.command
-        if parts and parts[0] == "--":
-            parts = parts[1:]
-        cmd.extend(parts)
+    if local_cmd == "env":
+        return handle_env(args, repo_root, env, rc_env)
+    if local_cmd == "shell":
+        return handle_shell(args, repo_root, env)
+
+    cmd = ["openstack"] + _command_parts(args)
+    try:
+        regions = parse_regions(getattr(args, "regions", None))
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    if regions and getattr(args, "profile_child", None):
+        print("--profile-child cannot be combined with --regions", file=sys.stderr)
+        return 2
 
     if args.dry_run:
         safe_env = {k: ("***" if k in ("OS_PASSWORD",) else v) for k, v in env.items() if k.startswith("OS_")}
@@ -163,6 +242,8 @@ def handle_default(args, repo_root: Path):
         for k in sorted(safe_env):
             print("  %s=%s" % (k, safe_env[k]))
         print("Command:", " ".join(shlex.quote(c) for c in cmd))
+        if regions:
+            print("Regions:", args.regions)
         return 0
 
     try:
@@ -176,7 +257,171 @@ def handle_default(args, repo_root: Path):
         print("'openstack' CLI not found and auto-setup failed. See README for manual setup.", file=sys.stderr)
         return 127
 
-    proc = subprocess.run(cmd, env=env)
+    argv = cmd[1:]
+
+    def log(child_env, code, child):
+        wall = time.monotonic() - started
+        latency.record("proxy", args.profile, args.catalog, latency.command_name(argv), child_env, code, wall, child)
+
+    # Cached responses are keyed by the configured environment, before an
+    # alternate auth URL is selected
+    cache_env = env
+    mutating = respcache.is_mutating(argv)
+    if mutating:
+        respcache.ResponseCache().invalidate(cache_env)
+    if regions:
+        code = run_regions(cmd, keystone.select_auth_url(env), regions, log)
+        if mutating:
+            respcache.ResponseCache().invalidate(cache_env)
+        return code
+    if not mutating and not getattr(args, "profile_child", None) and respcache.enabled(args):
+        ttl = respcache.cache_ttl(argv)
+        if ttl:
+            return run_cached(cmd, env, ttl, log)
+
+    env = keystone.select_auth_url(env)
+    child_started = time.monotonic()
+    if getattr(args, "profile_child", None):
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+        artifact = Path(args.profile_out) / f"{args.profile}-{args.catalog}-{stamp}-{artifact_name(args.profile_child)}"
+        code = run_profiled(cmd, env, args.profile_child, artifact)
+        print(f"Profile ({args.profile_child}) saved to {artifact}", file=sys.stderr)
+    else:
+        code = subprocess.run(cmd, env=env).returncode
+        # A read-only command is safe to repeat on an alternate auth URL
+        tried = set()
+        while code != 0 and respcache.is_read_only(argv):
+            next_env = keystone.fail_over(env, tried)
+            if next_env is None:
+                break
+            print(
+                "ossc: %s is not answering; retrying with %s" % (env["OS_AUTH_URL"], next_env["OS_AUTH_URL"]),
+                file=sys.stderr,
+            )
+            env = next_env
+            code = subprocess.run(cmd, env=env).returncode
+    if mutating:
+        # Again: a listing that ran meanwhile may have cached the old state
+        respcache.ResponseCache().invalidate(cache_env)
+    log(env, code, time.monotonic() - child_started)
+    return code
+
+
+def run_cached(cmd, env, ttl, log=None):
+    """Serve ``cmd`` from the response cache, or run it and cache a successful result."""
+    cache = respcache.ResponseCache()
+    hit = cache.get(env, cmd[1:])
+    if hit is not None:
+        sys.stdout.buffer.write(hit[0])
+        sys.stdout.flush()
+        if log:
+            log(env, 0, None)
+        return 0
+    child_started = time.monotonic()
+    proc = subprocess.run(cmd, env=keystone.select_auth_url(env), capture_output=True)
+    if log:
+        log(env, proc.returncode, time.monotonic() - child_started)
+    if proc.returncode == 0:
+        try:
+            cache.put(env, cmd[1:], ttl, proc.stdout)
+        except OSError as e:
+            print("ossc: response cache not written: %s" % e, file=sys.stderr)
+    sys.stdout.buffer.write(proc.stdout)
+    sys.stdout.flush()
+    sys.stderr.buffer.write(proc.stderr)
+    sys.stderr.flush()
+    return proc.returncode
+
+
+def run_regions(cmd, env, regions, log=None):
+    """Run ``cmd`` in every region concurrently; print each region's output in order."""
+    try:
+        targets = region_envs(env, regions)
+    except keystone.KeystoneError as e:
+        print("Authentication failed: %s" % e, file=sys.stderr)
+        return 1
+    if not targets:
+        print("No regions with a compute endpoint in the service catalog", file=sys.stderr)
+        return 2
+
+    def run(target):
+        region, region_env = target
+        if region_env is None:
+            return region, None
+        child_started = time.monotonic()
+        proc = subprocess.run(cmd, env=region_env, capture_output=True, text=True)
+        if log:
+            log(region_env, proc.returncode, time.monotonic() - child_started)
+        return region, proc
+
+    code = 0
+    with ThreadPoolExecutor(max_workers=len(targets)) as pool:
+        for region, proc in pool.map(run, targets):
+            print("==> %s <==" % region, flush=True)
+            if proc is None:
+                print("Region not found in service catalog: %s" % region, file=sys.stderr)
+                code = code or 2
+                continue
+            sys.stdout.write(proc.stdout or "")
+            sys.stdout.flush()
+            sys.stderr.write(proc.stderr or "")
+            code = code or proc.returncode
+    return code
+
+
+def _openstack_env(repo_root: Path, env):
+    try:
+        env, openstack_exe = ensure_openstack_available(repo_root, env)
+    except subprocess.CalledProcessError as e:
+        print("Failed to bootstrap virtualenv for openstackclient:", e, file=sys.stderr)
+        return None
+    if not openstack_exe:
+        print("'openstack' CLI not found and auto-setup failed. See README for manual setup.", file=sys.stderr)
+        return None
+    return env
+
+
+def env_exports(env, rc_env, base_env=None):
+    """Shell lines that switch the current shell to ``env``.
+
+    Exports the catalog's OS_* variables (plus resolved credentials), unsets
+    OS_* left over from another catalog, and exports PATH if bootstrapping
+    put a venv in front of it.
+    """
+    base_env = os.environ if base_env is None else base_env
+    keys = {k for k in rc_env if k.startswith("OS_")} | {"OS_USERNAME", "OS_PASSWORD"}
+    exported = {k: env[k] for k in keys if env.get(k)}
+    lines = ["unset %s" % k for k in sorted(base_env) if k.startswith("OS_") and k not in exported]
+    for k in sorted(exported):
+        lines.append("export %s=%s" % (k, shlex.quote(exported[k])))
+    for k in ("OSSC_PROFILE", "OSSC_CATALOG"):
+        if env.get(k):
+            lines.append("export %s=%s" % (k, shlex.quote(env[k])))
+    if env.get("PATH") and env.get("PATH") != base_env.get("PATH"):
+        lines.append("export PATH=%s" % shlex.quote(env["PATH"]))
+    return lines
+
+
+def handle_env(args, repo_root: Path, env, rc_env):
+    env = _openstack_env(repo_root, keystone.select_auth_url(env))
+    if env is None:
+        return 127
+    env["OSSC_PROFILE"] = args.profile
+    env["OSSC_CATALOG"] = args.catalog
+    for line in env_exports(env, rc_env):
+        print(line)
+    return 0
+
+
+def handle_shell(args, repo_root: Path, env):
+    env = _openstack_env(repo_root, keystone.select_auth_url(env))
+    if env is None:
+        return 127
+    env["OSSC_PROFILE"] = args.profile
+    env["OSSC_CATALOG"] = args.catalog
+    shell = env.get("SHELL") or "/bin/sh"
+    print("ossc: entering %s for %s/%s; 'exit' to leave" % (shell, args.profile, args.catalog), file=sys.stderr)
+    proc = subprocess.run([shell] + args.command[1:], env=env)
     return proc.returncode
 
 
@@ -188,7 +433,7 @@ def main(argv=None):
         parser = build_parser()
         args = parser.parse_args(argv)
     # Route to subcommands only if the first positional is a known subcommand
-    elif first_pos in {"config", "report"}:
+    elif first_pos in SUBCOMMANDS:
         parser = build_parser()
         args = parser.parse_args(argv)
     else:
@@ -200,4 +445,16 @@ def main(argv=None):
         return config_cmd.handle(args, repo_root)
     if getattr(args, "subcmd", None) == "report":
         return report_cmd.handle(args, repo_root)
+    if getattr(args, "subcmd", None) == "profile-summary":
+        return profile_cmd.handle(args, repo_root)
+    if getattr(args, "subcmd", None) == "serve-http":
+        return serve_cmd.handle(args, repo_root)
+    if getattr(args, "subcmd", None) == "stats":
+        return stats_cmd.handle(args, repo_root)
+    if getattr(args, "subcmd", None) == "bulk":
+        return bulk_cmd.handle(args, repo_root)
+    if getattr(args, "subcmd", None) == "image-upload":
+        return image_cmd.handle(args, repo_root)
+    if getattr(args, "subcmd", None) == "wait":
+        return wait_cmd.handle(args, repo_root)
     return handle_default(args, repo_root)
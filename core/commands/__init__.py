@@ -1,2 +1,12 @@
 """Command handlers for subcommands."""
 
+
+def print_table(headers, rows):
+    """Print rows as left-aligned columns under headers."""
+    widths = [len(h) for h in headers]
+    for row in rows:
+        widths = [max(w, len(str(c))) for w, c in zip(widths, row)]
+    line = "  ".join("%-*s" for _ in headers).rstrip()
+    print((line % tuple(v for pair in zip(widths, headers) for v in pair)).rstrip())
+    for row in rows:
+        print((line % tuple(v for pair in zip(widths, row) for v in pair)).rstrip())
@@ -0,0 +1,137 @@
+import argparse
+import shlex
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from core import api, bulk, keystone
+
+
+def add_subparser(subparsers):
+    blk = subparsers.add_parser(
+        "bulk", help="Run a server action (delete, stop, tag, ...) on many servers concurrently with one token"
+    )
+    blk.add_argument("action", choices=sorted(bulk.ACTIONS), help="Action to run on every target")
+    blk.add_argument("--file", help="Targets (server IDs or names), one per line; '-' reads stdin")
+    blk.add_argument(
+        "--filter",
+        action="append",
+        default=[],
+        metavar="KEY=VALUE",
+        help="Select targets by server-side filter (repeatable); keys: " + ", ".join(bulk.LIST_FILTERS),
+    )
+    blk.add_argument("--tag", help="Tag to add (action 'tag')")
+    blk.add_argument("-j", "--jobs", type=int, default=16, help="Concurrent requests (default 16)")
+    blk.add_argument("--retries", type=int, default=3, help="Retries per target for 429/5xx/connection errors (default 3)")
+    blk.add_argument("--timeout", type=float, default=30, help="Per-request timeout in seconds (default 30)")
+    blk.add_argument(
+        "--failed-out", help="Manifest of failed targets (default bulk-failed-<action>-<timestamp>.txt)"
+    )
+    blk.add_argument("-y", "--yes", action="store_true", help="Do not ask before deleting")
+    blk.add_argument("--dry-run", action="store_true", default=argparse.SUPPRESS, help="List the targets and exit")
+    return blk
+
+
+def handle(args, repo_root: Path):
+    profile = getattr(args, "profile", None)
+    catalog = getattr(args, "catalog", None)
+    if not profile or not catalog:
+        print("bulk needs --profile and --catalog")
+        return 2
+    if args.action == "tag":
+        if not args.tag:
+            print("bulk tag needs --tag")
+            return 2
+        try:
+            bulk.check_tag(args.tag)
+        except ValueError as e:
+            print(e)
+            return 2
+    if bool(args.file) == bool(args.filter):
+        print("bulk needs exactly one of --file or --filter")
+        return 2
+    try:
+        filters = bulk.parse_filters(args.filter)
+        lines = bulk.read_lines(args.file) if args.file else []
+    except (ValueError, OSError) as e:
+        print(e)
+        return 2
+    name = f"{profile}/{catalog}"
+
+    try:
+        session = api.Session(
+            repo_root, username=getattr(args, "username", None), password=getattr(args, "password", None)
+        )
+        env = session.resolve_env(profile, catalog, rc_file=getattr(args, "rc_file", None))
+    except (LookupError, ValueError, OSError) as e:
+        print(e)
+        return 2
+    try:
+        compute = bulk.ComputeSession(env, timeout=args.timeout)
+    except keystone.KeystoneError as e:
+        print(f"Authentication failed for {name}: {e}")
+        return 2
+
+    try:
+        return _run(args, compute, name, filters, lines)
+    finally:
+        compute.close()
+
+
+def _run(args, compute, name, filters, lines):
+    try:
+        if filters:
+            servers = compute.list_servers([(bulk.LIST_FILTERS[k], v) for k, v in filters])
+            targets, unresolved = [(s["id"], s["id"]) for s in servers], {}
+        else:
+            targets, unresolved = bulk.resolve_targets(compute, bulk.read_targets(lines))
+    except bulk.ComputeError as e:
+        print(f"Listing servers in {name} failed: {e}")
+        return 2
+    for target, error in unresolved.items():
+        print(f"Skipping {target}: {error}")
+    if not targets and not unresolved:
+        print(f"No servers matched in {name}")
+        return 0
+
+    if getattr(args, "dry_run", False):
+        for target, server_id in targets:
+            print(server_id if target == server_id else f"{server_id}  {target}")
+        print(f"Would {args.action} {len(targets)} server(s) in {name}")
+        return 0
+    if args.action == "delete" and targets and not args.yes and args.file != "-" and sys.stdin.isatty():
+        answer = input(f"Delete {len(targets)} server(s) in {name}? [y/N] ")
+        if answer.strip().lower() not in ("y", "yes"):
+            print("Aborted")
+            return 1
+
+    started = time.monotonic()
+    progress = bulk.Progress(f"{args.action} {name}", len(targets))
+    failures = bulk.run_bulk(
+        compute, args.action, targets, tag=args.tag, jobs=args.jobs, retries=args.retries, progress=progress
+    )
+    progress.finish()
+    elapsed = time.monotonic() - started
+    failures.update(unresolved)
+    ok = len(targets) - (len(failures) - len(unresolved))
+    print(f"{args.action}: {ok} ok, {len(failures)} failed in {elapsed:.1f}s ({ok / max(elapsed, 1e-6):.1f}/s)")
+    if not failures:
+        return 0
+
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+    out = Path(args.failed_out or f"bulk-failed-{args.action}-{stamp}.txt")
+    try:
+        bulk.write_manifest(out, failures, header=f"ossc bulk {args.action} {name} {stamp}: {len(failures)} failed")
+    except OSError as e:
+        print(f"Cannot write {out}: {e}")
+        for target, error in failures.items():
+            print(f"{target}  # {error}")
+        return 1
+    retry = ["ossc", "--profile", args.profile, "--catalog", args.catalog, "bulk", args.action]
+    if args.tag:
+        retry += ["--tag", args.tag]
+    retry += ["--file", str(out)]
+    print(f"Failed targets written to {out}; retry with:")
+    print("  " + " ".join(shlex.quote(c) for c in retry))
+    return 1
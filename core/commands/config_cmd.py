@@ -1,7 +1,22 @@
+import argparse
+import json
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from getpass import getpass
 from core.rc import parse_rc_file, build_rc_path
-from core.config import load_profiles_config, ensure_profiles_structure, save_profiles_config, config_path
+from core.config import (
+    REQUIRED_VARS,
+    caller_environ,
+    load_profiles_config,
+    ensure_profiles_structure,
+    save_profiles_config,
+    config_path,
+    resolve_password,
+    resolve_username,
+    select_catalogs,
+)
+from core import keystone
+from core.commands import print_table
 
 
 def add_subparser(subparsers):
@@ -19,9 +34,67 @@ def add_subparser(subparsers):
     cfg_setcred = cfg_sp.add_parser("set-cred", help="Set password for a profile (username comes from RC)")
     cfg_setcred.add_argument("--profile", required=True)
     cfg_setcred.add_argument("--password", help="Password value; if omitted, will prompt")
+
+    cfg_check = cfg_sp.add_parser("check", help="Authenticate every configured catalog against Keystone")
+    cfg_check.add_argument("--profile", default=argparse.SUPPRESS, help="Only check this profile")
+    cfg_check.add_argument("--catalog", default=argparse.SUPPRESS, help="Only check this catalog")
+    cfg_check.add_argument("-j", "--jobs", type=int, default=32, help="Concurrent auth requests (default 32)")
+    cfg_check.add_argument("--timeout", type=float, default=15, help="Per-request timeout in seconds (default 15)")
+    cfg_check.add_argument("-f", "--format", choices=["table", "json"], default="table", help="Output format, defaults to table")
     return cfg_parser
 
 
+def _check_catalog(args, prof, catalog, rc_env, pdata):
+    environ = caller_environ(prof, catalog)
+    env = {k: v for k, v in environ.items() if k.startswith("OS_")}
+    env.update(rc_env)
+    username = resolve_username(args, pdata, rc_env)
+    password = resolve_password(args, pdata, rc_env, environ)
+    if username:
+        env["OS_USERNAME"] = username
+    if password:
+        env["OS_PASSWORD"] = password
+    result = {"profile": prof, "catalog": catalog, "auth_url": env.get("OS_AUTH_URL") or ""}
+    missing = [k for k in REQUIRED_VARS if not env.get(k)]
+    if missing:
+        result.update(status="missing", auth_ms=None, detail="Missing variables: " + ", ".join(missing))
+        return result
+    try:
+        token = keystone.authenticate(env, timeout=args.timeout, catalog=False)
+    except keystone.KeystoneError as e:
+        result.update(status="failed", auth_ms=None, detail=str(e))
+        return result
+    project = (token.get("project") or {}).get("name") or ""
+    result.update(auth_url=token.get("auth_url") or result["auth_url"], status="ok", auth_ms=round(token["elapsed"] * 1000, 1), detail=project)
+    return result
+
+
+def _handle_check(args, profiles):
+    try:
+        targets = select_catalogs(profiles, getattr(args, "profile", None), getattr(args, "catalog", None))
+    except LookupError as e:
+        print(e)
+        return 2
+    if not targets:
+        print("No profiles configured.")
+        return 2
+    jobs = max(1, min(args.jobs, len(targets)))
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        results = list(pool.map(lambda t: _check_catalog(args, *t), targets))
+
+    if args.format == "json":
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        rows = [
+            (r["profile"], r["catalog"], r["status"], "-" if r["auth_ms"] is None else "%.0f" % r["auth_ms"], r["detail"])
+            for r in results
+        ]
+        print_table(("PROFILE", "CATALOG", "STATUS", "AUTH_MS", "DETAIL"), rows)
+        ok = sum(1 for r in results if r["status"] == "ok")
+        print(f"\nChecked {len(results)} catalog(s): ok={ok}, failed={len(results) - ok}")
+    return 0 if all(r["status"] == "ok" for r in results) else 1
+
+
 def handle(args, repo_root: Path):
     profiles, cfg_path, _ = load_profiles_config(repo_root)
     profiles = ensure_profiles_structure(profiles)
@@ -100,4 +173,6 @@ def handle(args, repo_root: Path):
         save_profiles_config(config_path(), profiles)
         print(f"Updated password for profile '{args.profile}'.")
         return 0
+    if args.cfg_cmd == "check":
+        return _handle_check(args, profiles)
     return 0
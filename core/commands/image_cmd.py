@@ -0,0 +1,142 @@
+import json
+import sys
+import time
+from pathlib import Path
+
+from core import api, glance, keystone, respcache
+
+
+def add_subparser(subparsers):
+    img = subparsers.add_parser(
+        "image-upload", help="Upload an image file in one streaming pass, verifying its checksum and multihash"
+    )
+    img.add_argument("file", help="Image file to upload")
+    img.add_argument("--name", help="Image name (default: file name without extension)")
+    img.add_argument("--disk-format", help="Disk format (default: from the file extension, else raw)")
+    img.add_argument("--container-format", default="bare", help="Container format (default bare)")
+    img.add_argument("--visibility", choices=["public", "private", "shared", "community"], help="Image visibility")
+    img.add_argument(
+        "--property", action="append", default=[], metavar="KEY=VALUE", help="Image property (repeatable)"
+    )
+    img.add_argument("--image", metavar="ID", help="Upload into this existing queued image instead of creating one")
+    img.add_argument(
+        "--hash-algo", choices=glance.HASH_ALGOS, default="sha512", help="Multihash algorithm (default sha512)"
+    )
+    img.add_argument("--chunk-size", type=int, default=4, help="Send buffer size in MiB (default 4)")
+    img.add_argument("--timeout", type=float, default=300, help="Socket timeout in seconds (default 300)")
+    img.add_argument("-f", "--format", choices=["table", "json"], default="table", help="Output format")
+    return img
+
+
+def parse_properties(values):
+    props = {}
+    for item in values or []:
+        key, sep, value = item.partition("=")
+        if not sep or not key.strip():
+            raise ValueError(f"Invalid property '{item}': expected KEY=VALUE")
+        props[key.strip()] = value
+    return props
+
+
+def _mib(n):
+    return n / (1024 * 1024)
+
+
+def progress_printer(stream=None, interval=None):
+    """Throttled bytes/percent/rate line for upload_file(progress=...)."""
+    stream = stream or sys.stderr
+    tty = stream.isatty()
+    interval = interval if interval is not None else (0.2 if tty else 5.0)
+    state = {"started": time.monotonic(), "shown": 0.0}
+
+    def show(done, total):
+        now = time.monotonic()
+        if now - state["shown"] < interval and done < total:
+            return
+        state["shown"] = now
+        rate = _mib(done) / max(now - state["started"], 1e-6)
+        line = f"{_mib(done):.1f}/{_mib(total):.1f} MiB ({done * 100 // max(total, 1)}%), {rate:.1f} MiB/s"
+        stream.write(("\r\033[K" + line + ("\n" if done >= total else "")) if tty else line + "\n")
+        stream.flush()
+
+    return show
+
+
+def handle(args, repo_root: Path):
+    profile = getattr(args, "profile", None)
+    catalog = getattr(args, "catalog", None)
+    if not profile or not catalog:
+        print("image-upload needs --profile and --catalog")
+        return 2
+    path = Path(args.file)
+    if not path.is_file():
+        print(f"Not a file: {path}")
+        return 2
+    try:
+        properties = parse_properties(args.property)
+        session = api.Session(
+            repo_root, username=getattr(args, "username", None), password=getattr(args, "password", None)
+        )
+        env = session.resolve_env(profile, catalog, rc_file=getattr(args, "rc_file", None))
+    except (LookupError, ValueError, OSError) as e:
+        print(e)
+        return 2
+    try:
+        client = glance.ImageClient(env, timeout=args.timeout, chunk_size=max(1, args.chunk_size) * 1024 * 1024)
+    except keystone.KeystoneError as e:
+        print(f"Authentication failed for {profile}/{catalog}: {e}")
+        return 2
+    try:
+        return _upload(args, client, path, properties)
+    finally:
+        client.close()
+
+
+def _upload(args, client, path: Path, properties):
+    image_id = args.image
+    if not image_id:
+        try:
+            image = client.create_image(
+                args.name or path.stem,
+                args.disk_format or glance.guess_disk_format(path),
+                args.container_format,
+                args.visibility,
+                properties,
+            )
+        except glance.GlanceError as e:
+            print(f"Creating image failed: {e}")
+            return 2
+        finally:
+            # Cached `image list` output no longer matches the catalog
+            respcache.ResponseCache().invalidate(client.env)
+        image_id = image["id"]
+
+    try:
+        result = client.upload_file(image_id, path, args.hash_algo, progress=progress_printer())
+        image = client.get_image(image_id)
+    except (glance.GlanceError, OSError) as e:
+        print(f"Upload of {path} failed: {e}")
+        print(f"Image {image_id} stays queued; retry with --image {image_id}")
+        return 1
+    finally:
+        respcache.ResponseCache().invalidate(client.env)
+    problems = glance.verify(result, image)
+    verified = not problems and bool(image.get("checksum") or image.get("os_hash_value"))
+
+    if args.format == "json":
+        print(json.dumps(dict(result, id=image_id, name=image.get("name"), status=image.get("status"),
+                              verified=verified, problems=problems), indent=2))
+    else:
+        print(
+            f"Image {image_id} ({image.get('name')}) {image.get('status')}: {_mib(result['size']):.1f} MiB "
+            f"in {result['elapsed']:.1f}s, {_mib(result['throughput']):.1f} MiB/s"
+        )
+        print(f"checksum (md5): {result['checksum']}")
+        print(f"os_hash_value ({result['os_hash_algo']}): {result['os_hash_value']}")
+        if verified:
+            print("Verified against the image service")
+        elif not problems:
+            print("The image service returned no checksum to verify against")
+    for problem in problems:
+        print(f"Mismatch: {problem}", file=sys.stderr)
+    return 1 if problems else 0
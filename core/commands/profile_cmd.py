@@ -0,0 +1,21 @@
+from pathlib import Path
+
+from core.profiling import format_summary
+
+
+def add_subparser(subparsers):
+    prof = subparsers.add_parser(
+        "profile-summary", help="Summarize a --profile-child artifact (pstats file or importtime log)"
+    )
+    prof.add_argument("path", help="Path to profile.pstats or importtime.log")
+    prof.add_argument("--top", type=int, default=20, help="Rows per table (default 20)")
+    return prof
+
+
+def handle(args, repo_root: Path):
+    path = Path(args.path)
+    if not path.is_file():
+        print(f"Profile file not found: {path}")
+        return 2
+    print(format_summary(path, args.top))
+    return 0
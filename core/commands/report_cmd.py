@@ -1,27 +1,593 @@
+import argparse
+import contextlib
+import io
+import json
 import os
 import shlex
+import shutil
 import subprocess
-from datetime import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from pathlib import Path
 
-from core.config import load_profiles_config, ensure_profiles_structure, get_catalog_env, resolve_password, resolve_username
+from core.config import (
+    caller_environ,
+    load_profiles_config,
+    ensure_profiles_structure,
+    resolve_password,
+    missing_vars,
+    resolve_username,
+    select_catalogs,
+)
+from core import bulk, forkserver, incremental, keystone, latency, metrics, respcache, schedule, shard
+from core.journal import RunJournal, digest, digest_file, signature
 from core.env import ensure_openstack_available
+from core.history import HistoryStore
+from core.summary import SUMMARY_FORMATS, ReportSummary, ServerCounts, iter_rows
+from core.profiling import PROFILE_MODES, artifact_name, profiled_command, split_importtime
+from core.regions import parse_regions, region_envs
+
+# report --filter keys -> `openstack server list` options (applied by Nova)
+SERVER_LIST_FILTERS = {
+    "status": "--status",
+    "name": "--name",
+    "flavor": "--flavor",
+    "image": "--image",
+    "host": "--host",
+    "ip": "--ip",
+    "ip6": "--ip6",
+    "availability-zone": "--availability-zone",
+    "project": "--project",
+    "user": "--user",
+    "instance-name": "--instance-name",
+    "changes-since": "--changes-since",
+    "tags": "--tags",
+}
+# Columns that need extra flavor/image lookups when shown
+NAME_LOOKUP_COLUMNS = {"image", "image name", "flavor", "flavor name"}
+# Concurrent Keystone authentications while discovering --regions
+DISCOVERY_JOBS = 16
+
+
+def add_run_options(rpt):
+    """Add the options of a report run to ``rpt``; return their dests."""
+    actions = []
+
+    def add(*args, **kwargs):
+        actions.append(rpt.add_argument(*args, **kwargs))
+
+    add("--out", default="out/reports", help="Output directory for reports")
+    add("-f", "--format", choices=["csv", "json", "table", "value", "yaml"], default="table", help="the output format, defaults to table")
+    add(
+        "--filter",
+        action="append",
+        default=[],
+        metavar="KEY=VALUE",
+        help="Server-side filter passed to server list (repeatable); keys: " + ", ".join(SERVER_LIST_FILTERS),
+    )
+    add("--columns", help="Comma-separated columns to fetch, e.g. ID,Name,Networks")
+    add(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Catalog queries to run at once (default 1); the longest expected (durations.json) start first",
+    )
+    add(
+        "--executor",
+        choices=["subprocess", "fork"],
+        default="subprocess",
+        help="How to start openstack children: a fresh process each (default), or forked from one "
+        "preloaded fork server (much faster startup and shared memory at high -j)",
+    )
+    add(
+        "--profile-child",
+        choices=PROFILE_MODES,
+        default=argparse.SUPPRESS,
+        help="Profile each openstack child; saves profile.pstats or importtime.log next to report.txt",
+    )
+    add(
+        "--regions",
+        default=argparse.SUPPRESS,
+        metavar="all|R1,R2",
+        help="Query these regions (or all in the service catalog) concurrently with one token; "
+        "reports go to <profile>/<catalog>/<region>/",
+    )
+    add(
+        "--rescope",
+        action="store_true",
+        help="Authenticate once per identity and let each catalog rescope the shared token",
+    )
+    add(
+        "--summary",
+        action="store_true",
+        help="Write summary.json/summary.md with server counts by status, flavor, image and AZ",
+    )
+    add(
+        "--incremental",
+        action="store_true",
+        help="Fetch only servers changed since the last run (-f json); keeps a server map per catalog",
+    )
+    add("--full-sync", action="store_true", help="With --incremental: refetch everything and rebuild the map")
+    add(
+        "--shard",
+        metavar="I/N",
+        help="Only run the I-th of N deterministic parts of the catalog list (1-based); combine with 'report merge'",
+    )
+    add(
+        "--resume",
+        action="store_true",
+        help="Reuse the reports that completed successfully in the last run into --out (see run.journal)",
+    )
+    add(
+        "--metrics-file",
+        metavar="PATH",
+        help="Write Prometheus metrics (node_exporter textfile collector, e.g. ossc.prom) at the end of the run",
+    )
+    add("--history", action="store_true", help="Store this run's reports in the content-addressed history")
+    add("--history-dir", default="out/history", help="History store directory (default out/history)")
+    add("--keep-days", type=int, help="Prune history runs older than N days")
+    add("--keep-runs", type=int, help="Keep only the newest N history runs")
+    return [a.dest for a in actions]
+
+
+def run_option_names():
+    """Names of the report run options (keyword arguments of api.Session.report)."""
+    return set(add_run_options(argparse.ArgumentParser(add_help=False)))
 
 
 def add_subparser(subparsers):
     rpt = subparsers.add_parser("report", help="Generate summary reports per profile/catalog")
-    rpt.add_argument("--out", default="out/reports", help="Output directory for reports")
-    rpt.add_argument("-f", "--format", choices=["csv", "json", "table", "value", "yaml"], default="table", help="the output format, defaults to table")
+    add_run_options(rpt)
+
+    rpt_sp = rpt.add_subparsers(dest="report_action")
+    rpt_runs = rpt_sp.add_parser("runs", help="List runs stored in the report history")
+    rpt_runs.add_argument("--history-dir", default=argparse.SUPPRESS, help="History store directory (default out/history)")
+    rpt_restore = rpt_sp.add_parser("restore", help="Restore a past run's report tree from history")
+    rpt_restore.add_argument("run_id", help="Run id as shown by 'report runs'")
+    rpt_restore.add_argument("--dest", required=True, help="Directory to write the restored tree into")
+    rpt_restore.add_argument("--history-dir", default=argparse.SUPPRESS, help="History store directory (default out/history)")
+    rpt_merge = rpt_sp.add_parser("merge", help="Combine the output trees of 'report --shard' runs")
+    rpt_merge.add_argument("inputs", nargs="+", help="Output directories of shards 1..N")
+    rpt_merge.add_argument("--out", default=argparse.SUPPRESS, help="Merged output directory (default out/reports)")
     return rpt
 
 
+def parse_filters(values, allowed=SERVER_LIST_FILTERS):
+    """Parse report --filter values; see bulk.parse_filters."""
+    return bulk.parse_filters(values, allowed)
+
+
+def parse_columns(value):
+    return [c.strip() for c in (value or "").split(",") if c.strip()]
+
+
+def server_list_args(filters, columns, summary=False):
+    """Build the `server list` arguments for filters and column projection."""
+    argv = ["--long"] if summary and not columns else []
+    for key, value in filters:
+        argv.extend([SERVER_LIST_FILTERS[key], value])
+    for col in columns:
+        argv.extend(["-c", col])
+    if columns and not any(c.lower() in NAME_LOOKUP_COLUMNS for c in columns):
+        argv.append("--no-name-lookup")
+    return argv
+
+
+def list_args(args):
+    """`server list` arguments (after -f) for this report, excluding --changes-since."""
+    columns = parse_columns(getattr(args, "columns", None))
+    if getattr(args, "incremental", False):
+        columns = incremental.fetch_columns(columns)
+    return server_list_args(parse_filters(getattr(args, "filter", None)), columns, getattr(args, "summary", False))
+
+
+def task_env(args, prof, catalog, rc_env, pdata):
+    """Effective child environment for a catalog (same precedence as the proxy)."""
+    environ = caller_environ(prof, catalog)
+    env = dict(environ)
+    env.update(rc_env)
+    username = resolve_username(args, pdata, rc_env)
+    password = resolve_password(args, pdata, rc_env, environ)
+    if username:
+        env["OS_USERNAME"] = username
+    if password:
+        env["OS_PASSWORD"] = password
+    return env
+
+
+def query_key(env):
+    """Catalogs whose effective OS_* environments are equal run the identical query."""
+    return tuple(sorted((k, v) for k, v in env.items() if k.startswith("OS_")))
+
+
+class _ReportFile:
+    """A report.txt the child writes its stdout into directly, below the header.
+
+    The output is never held in memory; ``start`` is the byte offset where it
+    begins, for reading it back (counting, deduplicated members).
+    """
+
+    def __init__(self, path: Path, header):
+        self.path = path
+        self.header = header  # cmd -> header text
+        self.start = 0
+        self.f = None
+
+    def open(self, cmd):
+        """The file for the child's stdout; a retry starts again below the header."""
+        if self.f is None:
+            text = self.header(cmd)
+            self.f = open(self.path, "w", encoding="utf-8")
+            self.f.write(text)
+            self.start = len(text.encode("utf-8"))
+        else:
+            self.f.seek(self.start)
+            self.f.truncate()
+        self.f.flush()
+        return self.f
+
+    def close(self, code, stderr):
+        self.f.flush()
+        self.f.seek(0, os.SEEK_END)  # past what the child wrote through the shared descriptor
+        if code != 0:
+            self.f.write(_report_trailer(code, stderr))
+        self.f.close()
+
+    def body(self):
+        """Binary file positioned at the child's output."""
+        f = open(self.path, "rb")
+        f.seek(self.start)
+        return f
+
+
+def _run_child(cmd, env, stdout=None):
+    """Run ``cmd`` capturing its output, or with stdout going to the open file ``stdout``."""
+    if stdout is None:
+        return subprocess.run(cmd, env=env, capture_output=True, text=True)
+    return subprocess.run(cmd, env=env, stdout=stdout, stderr=subprocess.PIPE, text=True)
+
+
+def _run_query(args, repo_root: Path, env, report_dir: Path, extra_args=(), servers=None, report=None):
+    """Run server list for one environment.
+
+    Returns a result dict with ``code`` and either ``text`` (setup failure,
+    written as the whole report) or ``cmd``/``stdout``/``stderr``. With
+    ``servers`` (forkserver.ForkServers) the child is forked from a preloaded
+    server instead of started fresh. With ``report`` (_ReportFile, not with
+    ``servers``) the child writes straight into the report file, which is
+    complete on return; the result has ``report`` instead of ``stdout``.
+    """
+    # Ensure openstack
+    try:
+        env, openstack_exe = ensure_openstack_available(repo_root, env)
+    except subprocess.CalledProcessError as e:
+        return {"code": 127, "text": f"Bootstrap failed: {e}\n"}
+    if not openstack_exe:
+        return {"code": 127, "text": "OpenStack CLI not found.\n"}
+
+    cmd = [openstack_exe, "server", "list", "-f", args.format] + list_args(args) + list(extra_args)
+    profile_mode = getattr(args, "profile_child", None)
+    env = keystone.select_auth_url(env)
+    tried = set()
+    started = time.monotonic()
+    while True:
+        stdout = report.open(cmd) if report is not None else None
+        if profile_mode:
+            artifact = report_dir / artifact_name(profile_mode)
+            proc = _run_child(profiled_command(cmd, profile_mode, artifact), env, stdout)
+            if profile_mode == "importtime":
+                log, rest = split_importtime(proc.stderr)
+                artifact.write_text(log, encoding="utf-8")
+                proc.stderr = rest
+        elif servers is not None:
+            proc = servers.run(cmd, env)
+        else:
+            proc = _run_child(cmd, env, stdout)
+        if proc.returncode == 0:
+            break
+        # Retry on an alternate auth URL if the one used stopped answering
+        env = keystone.fail_over(env, tried)
+        if env is None:
+            break
+    result = {
+        "code": proc.returncode,
+        "cmd": cmd,
+        "stdout": proc.stdout,
+        "stderr": proc.stderr,
+        "elapsed": time.monotonic() - started,
+    }
+    if report is not None:
+        report.close(proc.returncode, proc.stderr)
+        result["report"] = report
+    return result
+
+
+def _run_group(args, repo_root: Path, members, tokens, shared_identities, servers=None, header=None):
+    """Run the query shared by ``members`` once; return (result, header notes).
+
+    With ``header`` (notes, cmd -> text) the first member's report is written
+    while the query runs, unless the output must be captured (fork servers,
+    --incremental).
+    """
+    prof, catalog, env, report_dir = members[0]
+    missing = missing_vars(env)
+    if missing:
+        text = f"[{datetime.utcnow().isoformat()}Z] Missing variables: {', '.join(missing)}\n"
+        return {"code": 2, "text": text}, []
+
+    notes = []
+    if tokens is not None and keystone.identity_key(env) in shared_identities:
+        try:
+            token = tokens.get(env)
+        except keystone.KeystoneError as e:
+            notes.append(f"# Auth: password (shared token unavailable: {e})")
+        else:
+            env = keystone.token_env(env, token["id"])
+            notes.append("# Auth: shared unscoped token, rescoped to this project")
+    if not getattr(args, "incremental", False):
+        report = None
+        if header is not None and servers is None:
+            report = _ReportFile(report_dir / "report.txt", lambda cmd: header(notes, cmd))
+        return _run_query(args, repo_root, env, report_dir, servers=servers, report=report), notes
+
+    sig = incremental.signature(list_args(args), env)
+    server_map = incremental.ServerMap.load(report_dir / incremental.SYNC_FILE, sig)
+    if getattr(args, "full_sync", False):
+        server_map = incremental.ServerMap(server_map.path, sig)
+    extra = server_map.fetch_args()
+    started = datetime.now(timezone.utc)
+    result = _run_query(args, repo_root, env, report_dir, extra, servers)
+    if result.get("text") is None and result["code"] == 0:
+        changed, deleted = server_map.apply(result["stdout"] or "", started)
+        server_map.save()
+        result["stdout"] = server_map.render(parse_columns(getattr(args, "columns", None)))
+        if extra:
+            notes.append(f"# Incremental: {changed} changed, {deleted} deleted since {extra[1]}")
+        else:
+            notes.append(f"# Incremental: full sync, {changed} server(s)")
+    return result, notes
+
+
+def _render_report(args, prof, catalog, result, notes=(), profiled=True):
+    if result.get("text") is not None:
+        return result["text"]
+    content = _report_header(args, prof, catalog, result["cmd"], notes, profiled) + (result["stdout"] or "")
+    if result["code"] != 0:
+        content += _report_trailer(result["code"], result["stderr"])
+    return content
+
+
+def _report_header(args, prof, catalog, cmd, notes=(), profiled=True):
+    filters = parse_filters(getattr(args, "filter", None))
+    columns = parse_columns(getattr(args, "columns", None))
+    profile_mode = getattr(args, "profile_child", None)
+    header = f"# Report: server list\n# Profile: {prof}\n# Catalog: {catalog}\n# Format: {args.format}\n"
+    if filters:
+        header += f"# Filters: {', '.join(f'{k}={v}' for k, v in filters)}\n"
+    if columns:
+        header += f"# Columns: {','.join(columns)}\n"
+    if profile_mode and profiled:
+        header += f"# Child profile: {profile_mode} ({artifact_name(profile_mode)})\n"
+    for note in notes:
+        header += note + "\n"
+    header += f"# Time: {datetime.utcnow().isoformat()}Z\n# Command: {' '.join(shlex.quote(c) for c in cmd)}\n\n"
+    return header
+
+
+def _report_trailer(code, stderr):
+    return f"\n[exit={code}] stderr:\n{stderr or ''}"
+
+
+def plan_groups(args, out_root: Path, tasks, shard_spec=None):
+    """Group catalogs by effective environment: {query_key: [(prof, catalog, env, report_dir), ...]}.
+
+    With ``shard_spec`` (index, count) only the groups owned by that shard are kept.
+    """
+    groups = {}
+    for prof, catalog, rc_env, pdata in tasks:
+        env = task_env(args, prof, catalog, rc_env, pdata)
+        groups.setdefault(query_key(env), []).append((prof, catalog, env, out_root / prof / catalog))
+    if shard_spec:
+        index, count = shard_spec
+        groups = {k: members for k, members in groups.items() if shard.shard_of(group_key(k), count) == index}
+    for members in groups.values():
+        for _, _, _, report_dir in members:
+            report_dir.mkdir(parents=True, exist_ok=True)
+    return groups
+
+
+def group_key(key) -> str:
+    """Shard key of a query group: its query without secrets, whichever catalogs share it."""
+    return respcache.identity(dict(key))
+
+
+def shared_identities(groups):
+    """Identities used by more than one distinct query; only these benefit from a shared token."""
+    counts = {}
+    for members in groups.values():
+        key = keystone.identity_key(members[0][2])
+        counts[key] = counts.get(key, 0) + 1
+    return {key for key, count in counts.items() if count > 1}
+
+
+def fan_out_regions(groups, regions):
+    """Split every query into one query per region, authenticating once per query.
+
+    Returns (items, workers): items are (members, notes, result) where result is
+    None for work still to run, and workers is the largest region count, so
+    the regions of a catalog run concurrently.
+    """
+
+    def discover(members):
+        env = members[0][2]
+        if missing_vars(env):
+            return members, None, None
+        try:
+            return members, region_envs(env, regions), None
+        except keystone.KeystoneError as e:
+            return members, None, e
+
+    items = []
+    workers = 1
+    with ThreadPoolExecutor(max_workers=DISCOVERY_JOBS) as pool:
+        for members, found, error in pool.map(discover, groups):
+            stamp = f"[{datetime.utcnow().isoformat()}Z]"
+            if error is not None:
+                items.append((members, [], {"code": 1, "text": f"{stamp} Region discovery failed: {error}\n"}))
+                continue
+            if found is None:
+                items.append((members, [], None))
+                continue
+            if not found:
+                text = f"{stamp} No regions with a compute endpoint in the service catalog\n"
+                items.append((members, [], {"code": 2, "text": text}))
+                continue
+            workers = max(workers, len(found))
+            for region, env in found:
+                region_members = []
+                for prof, catalog, member_env, report_dir in members:
+                    (report_dir / region).mkdir(parents=True, exist_ok=True)
+                    region_members.append((prof, catalog, env or member_env, report_dir / region))
+                if env is None:
+                    text = f"{stamp} Region not found in service catalog: {region}\n"
+                    items.append((region_members, [], {"code": 2, "text": text}))
+                else:
+                    items.append((region_members, [f"# Region: {region}"], None))
+    return items, workers
+
+
+def _count_servers(args, result):
+    """Fold one catalog's output into counters (None if the query failed)."""
+    if result.get("text") is not None or result["code"] != 0:
+        return None
+    counts = ServerCounts()
+    if result.get("report") is not None:
+        # Read back line by line from the report file, so memory stays flat
+        with io.TextIOWrapper(result["report"].body(), encoding="utf-8", errors="replace") as lines:
+            for row in iter_rows(lines, args.format):
+                counts.add(row)
+        return counts
+    for row in iter_rows(io.StringIO(result["stdout"] or ""), args.format):
+        counts.add(row)
+    return counts
+
+
+def _write_summary(out_root: Path, summary, out=None):
+    generated = f"{datetime.utcnow().isoformat()}Z"
+    paths = []
+    for name, text in (
+        ("summary.json", json.dumps(summary.to_dict(generated), ensure_ascii=False, indent=2) + "\n"),
+        ("summary.md", summary.to_markdown(generated)),
+    ):
+        path = out_root / name
+        tmp = out_root / (name + ".tmp")
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, path)
+        paths.append(path)
+    print(
+        f"Summary: {summary.total.servers} server(s) in {len(summary.catalogs)} catalog(s) -> {paths[0]}",
+        file=out,
+    )
+    return paths
+
+
+def _handle_history_action(args):
+    store = HistoryStore(Path(args.history_dir))
+    if args.report_action == "runs":
+        runs = store.list_runs()
+        if not runs:
+            print(f"No runs in history: {store.root}")
+            return 0
+        for run in runs:
+            size = sum(e["size"] for e in run["files"].values())
+            print(f"{run['run_id']}  files={len(run['files'])}  bytes={size}  exit={run.get('exit_code', '-')}")
+        return 0
+    try:
+        count = store.restore(args.run_id, Path(args.dest))
+    except LookupError as e:
+        print(e)
+        return 2
+    print(f"Restored {count} file(s) from run {args.run_id} into {args.dest}")
+    return 0
+
+
+def _merge_shards(args):
+    out_root = Path(getattr(args, "out", "out/reports"))
+    if any(Path(d).resolve() == out_root.resolve() for d in args.inputs):
+        print(f"--out must not be one of the shard directories: {out_root}")
+        return 2
+    try:
+        manifests = shard.read_manifests(args.inputs)
+        out_root.mkdir(parents=True, exist_ok=True)
+        owners = {}
+        files = sum(shard.copy_tree(m["dir"], out_root, owners, m["catalogs"]) for m in manifests)
+    except (ValueError, OSError) as e:
+        print(e)
+        return 2
+
+    exit_code = next((m["exit_code"] for m in manifests if m["exit_code"]), 0)
+    catalogs = {}
+    for m in manifests:
+        catalogs.update(m["catalogs"])
+    summaries = [m["dir"] / "summary.json" for m in manifests if (m["dir"] / "summary.json").exists()]
+    if summaries and len(summaries) == len(manifests):
+        _write_summary(out_root, shard.merge_summaries(summaries))
+    elif summaries:
+        print("Not every shard has summary.json (run all of them with --summary); no merged summary written")
+    merged = {
+        "shards": len(manifests),
+        "exit_code": exit_code,
+        "generated": f"{datetime.utcnow().isoformat()}Z",
+        "inputs": [{"shard": m["shard"], "dir": str(m["dir"]), "exit_code": m["exit_code"]} for m in manifests],
+        "catalogs": catalogs,
+    }
+    (out_root / shard.MERGED_MANIFEST).write_text(json.dumps(merged, indent=2) + "\n", encoding="utf-8")
+    failed = sum(1 for code in catalogs.values() if code)
+    print(f"Merged {len(manifests)} shard(s): {len(catalogs)} report(s), {failed} failed, {files} file(s) -> {out_root}")
+    return exit_code
+
+
+def _record_history(args, out_root: Path, written, exit_code, out=None):
+    store = HistoryStore(Path(args.history_dir))
+    run_id, stats = store.record_run(
+        out_root, written, meta={"out": str(out_root), "format": args.format, "exit_code": exit_code}
+    )
+    print(
+        f"History: run {run_id} stored {stats['files']} file(s), {stats['bytes']} bytes, "
+        f"{stats['new_objects']} new object(s)",
+        file=out,
+    )
+    keep_days = getattr(args, "keep_days", None)
+    keep_runs = getattr(args, "keep_runs", None)
+    if keep_days is not None or keep_runs is not None:
+        runs_removed, objects_removed = store.prune(keep_days=keep_days, keep_runs=keep_runs)
+        print(f"History: pruned {runs_removed} run(s), {objects_removed} unreferenced object(s)", file=out)
+
+
 def handle(args, repo_root: Path):
-    profiles, cfg_path, _ = load_profiles_config(repo_root)
+    if getattr(args, "report_action", None) == "merge":
+        return _merge_shards(args)
+    if getattr(args, "report_action", None):
+        return _handle_history_action(args)
+    return run_report(args, repo_root)[0]
+
+
+def run_report(args, repo_root: Path, profiles=None, out=None):
+    """Generate the reports; return (exit_code, written files).
+
+    ``profiles`` is an already loaded profiles.json; loaded from disk when None.
+    Messages go to the text stream ``out`` (default: sys.stdout).
+    """
+    run_started = time.monotonic()
+    if profiles is None:
+        profiles, _, _ = load_profiles_config(repo_root)
     profiles = ensure_profiles_structure(profiles)
     prof_map = profiles.get("profiles", {})
     if not prof_map:
-        print("No profiles configured. Import RCs first via 'ossc config import-rc'.")
-        return 2
+        print("No profiles configured. Import RCs first via 'ossc config import-rc'.", file=out)
+        return 2, []
 
     out_root = Path(args.out)
     out_root.mkdir(parents=True, exist_ok=True)
@@ -30,96 +596,202 @@ def handle(args, repo_root: Path):
     filter_profile = getattr(args, "profile", None)
     filter_catalog = getattr(args, "catalog", None)
 
-    # Build a list of (profile, catalog, rc_env) to process
-    tasks = []
-    if filter_profile and filter_catalog:
-        pdata = prof_map.get(filter_profile)
-        if not pdata:
-            print(f"Profile not found: {filter_profile}")
-            return 2
-        rc_env = (pdata.get("catalogs", {}) or {}).get(filter_catalog)
-        if not rc_env:
-            print(f"Catalog not found in profile '{filter_profile}': {filter_catalog}")
-            return 2
-        tasks.append((filter_profile, filter_catalog, rc_env, pdata))
-    elif filter_profile and not filter_catalog:
-        pdata = prof_map.get(filter_profile)
-        if not pdata:
-            print(f"Profile not found: {filter_profile}")
-            return 2
-        catalogs = (pdata or {}).get("catalogs", {})
-        if not catalogs:
-            print(f"No catalogs configured for profile '{filter_profile}'.")
-            return 2
-        for catalog, rc_env in catalogs.items():
-            tasks.append((filter_profile, catalog, rc_env, pdata))
-    elif not filter_profile and filter_catalog:
-        # Process this catalog across all profiles that have it
-        found = False
-        for prof, pdata in prof_map.items():
-            rc_env = (pdata.get("catalogs", {}) or {}).get(filter_catalog)
-            if rc_env:
-                tasks.append((prof, filter_catalog, rc_env, pdata))
-                found = True
-        if not found:
-            print(f"Catalog not found in any profile: {filter_catalog}")
-            return 2
+    try:
+        parse_filters(getattr(args, "filter", None))
+    except ValueError as e:
+        print(e, file=out)
+        return 2, []
+    if getattr(args, "incremental", False):
+        if args.format != "json":
+            print("--incremental needs -f json", file=out)
+            return 2, []
+        if getattr(args, "filter", None):
+            # A filtered delta misses servers that stopped matching (e.g. left status=ACTIVE)
+            print("--incremental cannot be combined with --filter", file=out)
+            return 2, []
+    try:
+        regions = parse_regions(getattr(args, "regions", None))
+        shard_spec = shard.parse_shard(args.shard) if getattr(args, "shard", None) else None
+    except ValueError as e:
+        print(e, file=out)
+        return 2, []
+    summary = ReportSummary() if getattr(args, "summary", False) else None
+    if summary is not None and args.format not in SUMMARY_FORMATS:
+        print(f"--summary needs structured output; use -f {' | '.join(SUMMARY_FORMATS)}", file=out)
+        return 2, []
+
+    # Build a list of (profile, catalog, rc_env, profile_entry) to process
+    try:
+        tasks = select_catalogs(profiles, filter_profile, filter_catalog)
+    except LookupError as e:
+        print(e, file=out)
+        return 2, []
+
+    journal = RunJournal(out_root)
+    try:
+        done = journal.begin(signature(args), resume=getattr(args, "resume", False))
+    except ValueError as e:
+        print(e, file=out)
+        return 2, []
+
+    groups = plan_groups(args, out_root, tasks, shard_spec)
+    if shard_spec:
+        kept = sum(len(members) for members in groups.values())
+        print(f"Shard {shard_spec[0]}/{shard_spec[1]}: {kept} of {len(tasks)} catalog(s)", file=out)
+    # Region fan-out carries its own token, so --rescope does not apply to it
+    tokens = keystone.UnscopedTokens() if getattr(args, "rescope", False) and not regions else None
+    shared = shared_identities(groups) if tokens is not None else set()
+    if regions:
+        items, workers = fan_out_regions(groups.values(), regions)
     else:
-        # No filters provided: process all profiles/catalogs
-        for prof, pdata in prof_map.items():
-            catalogs = (pdata or {}).get("catalogs", {})
-            if not catalogs:
-                continue
-            for catalog, rc_env in catalogs.items():
-                tasks.append((prof, catalog, rc_env, pdata))
+        items, workers = [(members, [], None) for members in groups.values()], 1
 
-    exit_code = 0
-    for prof, catalog, rc_env, pdata in tasks:
-            # Build env
-            env = os.environ.copy()
-            env.update(rc_env)
-            username = resolve_username(args, pdata, rc_env)
-            password = resolve_password(args, pdata, rc_env)
-            if username:
-                env["OS_USERNAME"] = username
-            if password:
-                env["OS_PASSWORD"] = password
-
-            missing = [k for k in ("OS_AUTH_URL", "OS_USERNAME", "OS_PASSWORD") if not env.get(k)]
-            report_dir = out_root / prof / catalog
-            report_dir.mkdir(parents=True, exist_ok=True)
-            report_file = report_dir / "report.txt"
+    def reusable(members):
+        return all(report_dir.relative_to(out_root).as_posix() in done for _, _, _, report_dir in members)
 
-            if missing:
-                report_file.write_text(
-                    f"[{datetime.utcnow().isoformat()}Z] Missing variables: {', '.join(missing)}\n",
-                    encoding="utf-8",
-                )
-                exit_code = exit_code or 2
-                continue
+    def item_name(item):
+        return item[0][0][3].relative_to(out_root).as_posix()
 
-            # Ensure openstack
-            try:
-                env, openstack_exe = ensure_openstack_available(repo_root, env)
-            except subprocess.CalledProcessError as e:
-                report_file.write_text(f"Bootstrap failed: {e}\n", encoding="utf-8")
-                exit_code = exit_code or 127
-                continue
-            if not openstack_exe:
-                report_file.write_text("OpenStack CLI not found.\n", encoding="utf-8")
-                exit_code = exit_code or 127
-                continue
+    # Longest expected first; reused and already decided items take no time
+    history = schedule.DurationHistory(out_root)
+    to_run = [item for item in items if item[2] is None and not reusable(item[0])]
+    predicted = {item_name(item): history.predict(item_name(item)) for item in to_run}
+    items = schedule.lpt_order(items, lambda item: predicted.get(item_name(item), 0.0))
+    workers = max(workers, getattr(args, "jobs", 1) or 1)
+    walls = {}
+    # A profiled child must start fresh to be measured
+    fork = getattr(args, "executor", "subprocess") == "fork" and not getattr(args, "profile_child", None)
+    servers = forkserver.ForkServers(out) if fork else None
+
+    def run_item(item):
+        members, notes, result = item
+        if result is None and reusable(members):
+            return members, None, notes
+        if result is None:
+            prof, catalog, _, _ = members[0]
+
+            def header(run_notes, cmd):
+                return _report_header(args, prof, catalog, cmd, notes + run_notes)
+
+            started = time.monotonic()
+            result, run_notes = _run_group(args, repo_root, members, tokens, shared, servers, header)
+            notes = notes + run_notes
+            wall = time.monotonic() - started
+            walls[item_name(item)] = wall
+            if "elapsed" in result:
+                prof, catalog, env, _ = members[0]
+                latency.record("report", prof, catalog, "server list", env, result["code"], wall, result["elapsed"])
+        return members, result, notes
 
-            cmd = [openstack_exe, "server", "list", "-f", args.format]
-            proc = subprocess.run(cmd, env=env, capture_output=True, text=True)
-            header = (
-                f"# Report: server list\n# Profile: {prof}\n# Catalog: {catalog}\n# Format: {args.format}\n"
-                f"# Time: {datetime.utcnow().isoformat()}Z\n# Command: {' '.join(shlex.quote(c) for c in cmd)}\n\n"
+    exit_code = 0
+    written = []
+    statuses = {}
+    reused = 0
+    run_metrics = metrics.RunMetrics() if getattr(args, "metrics_file", None) else None
+    # Server counts are folded when a summary or metrics want them and the format allows it
+    count = (summary is not None or run_metrics is not None) and args.format in SUMMARY_FORMATS
+    # Queries run in worker threads; results are written here, in order
+    started = time.monotonic()
+    # The pool is shut down before the fork servers are
+    with contextlib.ExitStack() as stack, ThreadPoolExecutor(max_workers=workers) as pool:
+        if servers is not None:
+            stack.callback(servers.close)
+        for members, result, notes in pool.map(run_item, items):
+            first = members[0][3].relative_to(out_root).as_posix()
+            if result is None:
+                # Completed in the run being resumed
+                for _, _, _, report_dir in members:
+                    name = report_dir.relative_to(out_root).as_posix()
+                    rec = done[name]
+                    counts = ServerCounts.from_dict(rec["counts"]) if "counts" in rec else None
+                    if summary is not None:
+                        summary.add_catalog(name, counts, 0, counted=rec.get("counted", True), note=rec.get("note"))
+                    if run_metrics is not None:
+                        size = (report_dir / "report.txt").stat().st_size
+                        run_metrics.add_catalog(name, 0, size, counts=counts, reused=True)
+                    written.append(report_dir / "report.txt")
+                    statuses[name] = 0
+                    reused += 1
+                continue
+            counts = _count_servers(args, result) if count else None
+            wall = walls.get(first)
+            for i, (prof, catalog, _, report_dir) in enumerate(members):
+                name = report_dir.relative_to(out_root).as_posix()
+                note = f"same query as {first}" if i else None
+                if summary is not None:
+                    summary.add_catalog(name, counts, result["code"], counted=not i, note=note)
+                member_notes = list(notes)
+                if i:
+                    member_notes.append(f"# Deduplicated: same query as {first}")
+                report_file = report_dir / "report.txt"
+                streamed = result.get("report")
+                if streamed is None:
+                    # Only the member that ran has a profile artifact
+                    text = _render_report(args, prof, catalog, result, member_notes, profiled=not i)
+                    report_file.write_text(text, encoding="utf-8")
+                    sha256, size = digest(text), len(text.encode("utf-8"))
+                else:
+                    if i:
+                        # The first member's report already holds the output; copy it below this header
+                        text = _report_header(args, prof, catalog, result["cmd"], member_notes, profiled=False)
+                        with streamed.body() as src, open(report_file, "wb") as dst:
+                            dst.write(text.encode("utf-8"))
+                            shutil.copyfileobj(src, dst)
+                    sha256, size = digest_file(report_file), report_file.stat().st_size
+                journal.record(
+                    name,
+                    result["code"],
+                    sha256=sha256,
+                    counts=counts.to_dict() if counts is not None else None,
+                    counted=not i,
+                    note=note,
+                )
+                written.append(report_file)
+                statuses[name] = result["code"]
+                if run_metrics is not None:
+                    run_metrics.add_catalog(name, result["code"], size, wall, counts, counted=not i)
+                exit_code = exit_code or result["code"]
+    if reused:
+        print(f"Resumed: reused {reused} completed report(s), ran {len(statuses) - reused}", file=out)
+    if to_run:
+        plan = {
+            "queries": len(to_run),
+            "workers": workers,
+            "without_history": sum(1 for name in predicted if not history.known(name)),
+            "predicted_makespan": round(schedule.makespan(sorted(predicted.values(), reverse=True), workers), 1),
+            "actual_makespan": round(time.monotonic() - started, 1),
+        }
+        # Order only matters with parallel workers; sequential runs print as before
+        if workers > 1 or summary is not None:
+            print(
+                f"Schedule: {plan['queries']} query(s) on {workers} worker(s), longest first; "
+                f"predicted makespan {plan['predicted_makespan']:.1f}s "
+                f"({plan['without_history']} without history), actual {plan['actual_makespan']:.1f}s",
+                file=out,
             )
-            content = header + (proc.stdout or "")
-            if proc.returncode != 0:
-                content += f"\n[exit={proc.returncode}] stderr:\n{proc.stderr or ''}"
-            report_file.write_text(content, encoding="utf-8")
-            exit_code = exit_code or proc.returncode
+        if summary is not None:
+            summary.schedule = plan
+        for name, seconds in walls.items():
+            if statuses.get(name) == 0:
+                history.update(name, seconds)
+        try:
+            history.save()
+        except OSError as e:
+            print(f"Cannot save {history.path}: {e}", file=out)
 
-    return exit_code
+    if summary is not None:
+        written.extend(_write_summary(out_root, summary, out))
+    if shard_spec:
+        generated = f"{datetime.utcnow().isoformat()}Z"
+        written.append(shard.write_manifest(out_root, *shard_spec, exit_code, statuses, generated))
+
+    if getattr(args, "history", False):
+        _record_history(args, out_root, written, exit_code, out)
+    if run_metrics is not None:
+        text = run_metrics.render(exit_code, time.time(), time.monotonic() - run_started)
+        try:
+            metrics.write(args.metrics_file, text)
+        except OSError as e:
+            print(f"Cannot write metrics file {args.metrics_file}: {e}", file=out)
+
+    return exit_code, written
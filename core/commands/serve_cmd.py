@@ -0,0 +1,79 @@
+import json
+from pathlib import Path
+
+from core import api
+from core.inventory import Inventory, make_server, parse_bind
+
+SERVER_LIST_ARGS = ["server", "list", "-f", "json", "--long"]
+
+
+def add_subparser(subparsers):
+    srv = subparsers.add_parser(
+        "serve-http", help="Serve cached per-catalog server lists and aggregates as JSON over HTTP"
+    )
+    srv.add_argument("--bind", default="127.0.0.1:8780", help="HOST:PORT to listen on (default 127.0.0.1:8780)")
+    srv.add_argument("--ttl", type=int, default=300, help="Seconds before a catalog is refetched (default 300)")
+    srv.add_argument(
+        "--catalog-ttl",
+        action="append",
+        default=[],
+        metavar="PROFILE/CATALOG=SECONDS",
+        help="Per-catalog TTL override (repeatable)",
+    )
+    srv.add_argument("-j", "--jobs", type=int, default=4, help="Concurrent background fetches (default 4)")
+    return srv
+
+
+def parse_catalog_ttls(values):
+    ttls = {}
+    for item in values or []:
+        name, sep, seconds = item.partition("=")
+        if not sep or name.count("/") != 1 or not seconds.strip().isdigit():
+            raise ValueError(f"Invalid --catalog-ttl '{item}': expected PROFILE/CATALOG=SECONDS")
+        ttls[name.strip()] = int(seconds)
+    return ttls
+
+
+def session_fetch(session):
+    """Fetch function for Inventory that runs `server list` through an api.Session."""
+
+    def fetch(profile, catalog):
+        res = session.run(profile, catalog, SERVER_LIST_ARGS)
+        if res.code != 0:
+            lines = res.stderr.decode("utf-8", "replace").strip().splitlines()
+            raise RuntimeError(f"exit={res.code}: {lines[-1] if lines else 'no stderr'}")
+        return json.loads(res.stdout or b"[]")
+
+    return fetch
+
+
+def handle(args, repo_root: Path):
+    try:
+        host, port = parse_bind(args.bind)
+        ttls = parse_catalog_ttls(args.catalog_ttl)
+        session = api.Session(repo_root)
+        catalogs = session.catalogs(getattr(args, "profile", None), getattr(args, "catalog", None))
+    except (ValueError, LookupError) as e:
+        print(e)
+        return 2
+    unknown = set(ttls) - {f"{p}/{c}" for p, c in catalogs}
+    if unknown:
+        print(f"--catalog-ttl for unknown catalog(s): {', '.join(sorted(unknown))}")
+        return 2
+
+    inventory = Inventory(session_fetch(session), catalogs, ttl=args.ttl, ttls=ttls, jobs=args.jobs)
+    try:
+        server = make_server(inventory, host, port)
+    except OSError as e:
+        print(f"Cannot listen on {args.bind}: {e}")
+        return 2
+    inventory.start()
+    print(f"Serving {len(catalogs)} catalog(s) on http://{host}:{server.server_address[1]}/ (ttl {args.ttl}s)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        inventory.stop()
+    return 0
@@ -0,0 +1,62 @@
+import argparse
+import json
+from pathlib import Path
+
+from core import latency
+from core.commands import print_table
+
+
+def add_subparser(subparsers):
+    st = subparsers.add_parser("stats", help="Latency percentiles and error rates from the command latency log")
+    st.add_argument("--since", default="24h", help="Time window, e.g. 30m, 24h, 7d (default 24h)")
+    st.add_argument("--by", choices=latency.GROUP_FIELDS, default="catalog", help="Group by (default catalog)")
+    st.add_argument("-f", "--format", choices=["table", "json"], default="table", help="Output format")
+    st.add_argument("--log", default=argparse.SUPPRESS, help="Latency log path (default: see README)")
+    return st
+
+
+def _ms(value):
+    return "-" if value is None else "%d" % round(value * 1000)
+
+
+def handle(args, repo_root: Path):
+    path = Path(args.log) if getattr(args, "log", None) else latency.log_path()
+    if path is None:
+        print("Latency log is disabled (OSSC_LATENCY_LOG=off)")
+        return 2
+    try:
+        since = latency.parse_window(args.since)
+    except ValueError as e:
+        print(e)
+        return 2
+    profile = getattr(args, "profile", None)
+    catalog = getattr(args, "catalog", None)
+    records = (
+        r
+        for r in latency.read_records(path, since)
+        if (not profile or r.get("profile") == profile) and (not catalog or r.get("catalog") == catalog)
+    )
+    rows = latency.aggregate(records, args.by)
+
+    if args.format == "json":
+        print(json.dumps(rows, indent=2))
+        return 0
+    if not rows:
+        print(f"No records in the last {args.since}: {path}")
+        return 0
+    print_table(
+        (args.by.upper(), "COUNT", "ERR%", "P50_MS", "P95_MS", "P99_MS", "CHILD_P50_MS"),
+        [
+            (
+                r[args.by],
+                r["count"],
+                "%.1f" % (r["error_rate"] * 100),
+                _ms(r["p50"]),
+                _ms(r["p95"]),
+                _ms(r["p99"]),
+                _ms(r["child_p50"]),
+            )
+            for r in rows
+        ],
+    )
+    return 0
@@ -0,0 +1,177 @@
+import json
+import sys
+import time
+from pathlib import Path
+
+from core import api, bulk, keystone, waiter
+
+
+def add_subparser(subparsers):
+    wt = subparsers.add_parser(
+        "wait", help="Wait for many servers to reach a status, with one server listing per poll"
+    )
+    wt.add_argument("targets", nargs="*", metavar="TARGET", help="Server IDs or names")
+    wt.add_argument(
+        "--status",
+        default="ACTIVE",
+        help="Status to wait for, or several separated by commas (default ACTIVE); DELETED waits for deletion",
+    )
+    wt.add_argument("--file", help="More targets, one per line; '-' reads stdin")
+    wt.add_argument(
+        "--filter",
+        action="append",
+        default=[],
+        metavar="KEY=VALUE",
+        help="Select targets by server-side filter (repeatable); keys: " + ", ".join(bulk.LIST_FILTERS),
+    )
+    wt.add_argument("--timeout", type=float, default=600, help="Give up after this many seconds (default 600)")
+    wt.add_argument("--interval", type=float, default=2, help="Poll interval after a change, in seconds (default 2)")
+    wt.add_argument(
+        "--max-interval", type=float, default=30, help="Longest interval while nothing changes, in seconds (default 30)"
+    )
+    wt.add_argument("--fail-fast", action="store_true", help="Exit as soon as one target fails")
+    wt.add_argument("--request-timeout", type=float, default=30, help="Per-request timeout in seconds (default 30)")
+    wt.add_argument(
+        "-f", "--format", choices=["table", "json"], default="table", help="Output format (json: one object per event)"
+    )
+    return wt
+
+
+def handle(args, repo_root: Path):
+    profile = getattr(args, "profile", None)
+    catalog = getattr(args, "catalog", None)
+    if not profile or not catalog:
+        print("wait needs --profile and --catalog")
+        return 2
+    if bool(args.targets or args.file) == bool(args.filter):
+        print("wait needs either targets (arguments or --file) or --filter")
+        return 2
+    wanted = [s.strip().upper() for s in args.status.split(",") if s.strip()]
+    if not wanted:
+        print("wait needs a --status")
+        return 2
+    try:
+        filters = bulk.parse_filters(args.filter)
+        lines = bulk.read_lines(args.file) if args.file else []
+    except (ValueError, OSError) as e:
+        print(e)
+        return 2
+    name = f"{profile}/{catalog}"
+
+    try:
+        session = api.Session(
+            repo_root, username=getattr(args, "username", None), password=getattr(args, "password", None)
+        )
+        env = session.resolve_env(profile, catalog, rc_file=getattr(args, "rc_file", None))
+    except (LookupError, ValueError, OSError) as e:
+        print(e)
+        return 2
+    try:
+        compute = bulk.ComputeSession(env, timeout=getattr(args, "request_timeout", 30))
+    except keystone.KeystoneError as e:
+        print(f"Authentication failed for {name}: {e}")
+        return 2
+
+    try:
+        return _run(args, compute, name, wanted, filters, bulk.read_targets(list(args.targets) + lines))
+    finally:
+        compute.close()
+
+
+class _Output:
+    """Human lines or JSON lines on stdout, flushed as events happen."""
+
+    def __init__(self, fmt, started):
+        self.json = fmt == "json"
+        self.started = started
+
+    def emit(self, text, **event):
+        if self.json:
+            print(json.dumps(dict(event, elapsed=round(time.monotonic() - self.started, 1))))
+        else:
+            print(text)
+        sys.stdout.flush()
+
+
+def _label(w, server_id):
+    name = w.names.get(server_id)
+    return f"{name} ({server_id})" if name else server_id
+
+
+def _states(w, server_ids):
+    return ", ".join(f"{_label(w, sid)} {w.states[sid]}" for sid in server_ids)
+
+
+def _run(args, compute, name, wanted, filters, targets):
+    started = time.monotonic()
+    out = _Output(getattr(args, "format", "table"), started)
+    w = waiter.Waiter(
+        compute, wanted, interval=getattr(args, "interval", 2), max_interval=getattr(args, "max_interval", 30)
+    )
+    try:
+        servers = w.listing([(bulk.LIST_FILTERS[k], v) for k, v in filters])
+        if filters:
+            resolved, unresolved = [(s["id"], s["id"]) for s in servers], {}
+        else:
+            resolved, unresolved = bulk.resolve_targets(compute, targets, servers=servers)
+    except bulk.ComputeError as e:
+        print(f"Listing servers in {name} failed: {e}")
+        return 2
+    for target, error in unresolved.items():
+        out.emit(f"Skipping {target}: {error}", event="skipped", target=target, error=error)
+    if not resolved:
+        out.emit(f"No servers to wait for in {name}", event="done", result="ok" if not unresolved else "failed",
+                 polls=w.polls)
+        return 1 if unresolved else 0
+
+    w.track([server_id for _, server_id in resolved], servers)
+    counts = {}
+    for state in w.states.values():
+        counts[state] = counts.get(state, 0) + 1
+    states = ", ".join(f"{n} {state}" for state, n in sorted(counts.items(), key=lambda kv: -kv[1]))
+    out.emit(
+        f"Waiting for {len(w.states)} server(s) in {name} to be {'/'.join(wanted)}: {states}",
+        event="start",
+        servers={sid: {"name": w.names[sid], "state": state} for sid, state in w.states.items()},
+    )
+
+    def on_change(server_id, old, new):
+        left = len(w.pending())
+        elapsed = time.monotonic() - started
+        out.emit(
+            f"+{elapsed:.0f}s {_label(w, server_id)}: {old} -> {new} ({left} left)",
+            event="change",
+            id=server_id,
+            name=w.names[server_id],
+            old=old,
+            new=new,
+            pending=left,
+        )
+
+    def on_error(e):
+        out.emit(f"Poll failed ({e}); backing off", event="error", error=str(e))
+
+    try:
+        finished = w.run(args.timeout, on_change, on_error, fail_fast=getattr(args, "fail_fast", False))
+    except bulk.ComputeError as e:
+        print(f"Polling servers in {name} failed: {e}")
+        return 2
+    elapsed = time.monotonic() - started
+    failed, pending = w.failed(), w.pending()
+    final = dict(w.states)
+    if not failed and not pending and not unresolved:
+        text = f"All {len(w.states)} server(s) {'/'.join(wanted)} after {elapsed:.0f}s ({w.polls} listings)"
+        out.emit(text, event="done", result="ok", polls=w.polls, servers=final)
+        return 0
+    result = "timeout" if not finished else "failed"
+    parts = []
+    if failed:
+        parts.append(f"{len(failed)} failed: {_states(w, failed)}")
+    if pending:
+        parts.append(f"{len(pending)} still pending: {_states(w, pending)}")
+    if unresolved:
+        parts.append(f"{len(unresolved)} not found")
+    head = f"Timed out after {elapsed:.0f}s" if result == "timeout" else f"Done after {elapsed:.0f}s"
+    out.emit(f"{head} ({w.polls} listings); " + "; ".join(parts), event="done", result=result, polls=w.polls,
+             servers=final)
+    return 1
@@ -80,15 +80,29 @@ def get_catalog_env(config: Dict, profile: str, catalog: str):
     return dict(cat)
 
 
-def resolve_password(args, profile_entry: Dict, rc_env: Dict = None):
+def caller_environ(profile: str, catalog: str, environ=None) -> Dict:
+    """The caller's environment as the base for ``profile``/``catalog``.
+
+    OS_* variables exported by `ossc env` for another catalog (as named by
+    OSSC_PROFILE/OSSC_CATALOG) are dropped, credentials included.
+    """
+    environ = os.environ if environ is None else environ
+    exported_for = (environ.get("OSSC_PROFILE"), environ.get("OSSC_CATALOG"))
+    if exported_for in ((None, None), (profile, catalog)):
+        return dict(environ)
+    return {k: v for k, v in environ.items() if not k.startswith("OS_")}
+
+
+def resolve_password(args, profile_entry: Dict, rc_env: Dict = None, environ=None):
+    environ = os.environ if environ is None else environ
     # Highest priority: explicit flag
     if getattr(args, "password", None):
         return args.password
     # Env vars (allow both project-specific and OS_* for convenience)
-    if os.getenv("OSS_PASSWORD"):
-        return os.getenv("OSS_PASSWORD")
-    if os.getenv("OS_PASSWORD"):
-        return os.getenv("OS_PASSWORD")
+    if environ.get("OSS_PASSWORD"):
+        return environ.get("OSS_PASSWORD")
+    if environ.get("OS_PASSWORD"):
+        return environ.get("OS_PASSWORD")
     # Stored plain password in profile
     if (profile_entry or {}).get("password"):
         return profile_entry.get("password")
@@ -113,3 +127,53 @@ def resolve_username(args, profile_entry: Dict, rc_env: Dict):
     if (profile_entry or {}).get("username"):
         return profile_entry.get("username")
     return (rc_env or {}).get("OS_USERNAME")
+
+
+REQUIRED_VARS = ("OS_AUTH_URL", "OS_USERNAME", "OS_PASSWORD")
+# An env that authenticates with an existing token (e.g. one region of a --regions fan-out)
+TOKEN_REQUIRED_VARS = ("OS_AUTH_URL", "OS_TOKEN")
+
+
+def missing_vars(env: Dict):
+    required = TOKEN_REQUIRED_VARS if env.get("OS_AUTH_TYPE") in ("v3token", "token") else REQUIRED_VARS
+    return [k for k in required if not env.get(k)]
+
+
+def select_catalogs(profiles: Dict, profile: str = None, catalog: str = None):
+    """Return (profile, catalog, rc_env, profile_entry) tuples matching the filters.
+
+    Raises LookupError with a user-facing message when a filter matches nothing.
+    """
+    prof_map = profiles.get("profiles", {})
+    tasks = []
+    if profile and catalog:
+        pdata = prof_map.get(profile)
+        if not pdata:
+            raise LookupError(f"Profile not found: {profile}")
+        rc_env = (pdata.get("catalogs", {}) or {}).get(catalog)
+        if not rc_env:
+            raise LookupError(f"Catalog not found in profile '{profile}': {catalog}")
+        tasks.append((profile, catalog, rc_env, pdata))
+    elif profile and not catalog:
+        pdata = prof_map.get(profile)
+        if not pdata:
+            raise LookupError(f"Profile not found: {profile}")
+        catalogs = (pdata or {}).get("catalogs", {})
+        if not catalogs:
+            raise LookupError(f"No catalogs configured for profile '{profile}'.")
+        for cat, rc_env in catalogs.items():
+            tasks.append((profile, cat, rc_env, pdata))
+    elif not profile and catalog:
+        # This catalog across all profiles that have it
+        for prof, pdata in prof_map.items():
+            rc_env = (pdata.get("catalogs", {}) or {}).get(catalog)
+            if rc_env:
+                tasks.append((prof, catalog, rc_env, pdata))
+        if not tasks:
+            raise LookupError(f"Catalog not found in any profile: {catalog}")
+    else:
+        for prof, pdata in prof_map.items():
+            catalogs = (pdata or {}).get("catalogs", {})
+            for cat, rc_env in (catalogs or {}).items():
+                tasks.append((prof, cat, rc_env, pdata))
+    return tasks
@@ -0,0 +1,353 @@
+"""Fork server for `openstack` children (`report --executor fork`).
+
+Every `openstack` process imports openstackclient, keystoneauth and the
+command plugins again. A fork server starts the interpreter of the
+`openstack` console script once, imports what the script imports, and then
+forks one child per command. The children share the imported modules
+copy-on-write and run the script with their own argv, environment, working
+directory and stdio, so output and exit codes match a fresh process.
+
+The server is this file run by the openstack interpreter, so it uses only
+the standard library. Requests come over a Unix socket: a length-prefixed
+JSON header (argv, env, cwd) followed by the child's stdin/stdout/stderr
+descriptors. The exit code goes back as a JSON line once the child is reaped.
+"""
+import atexit
+import gc
+import importlib
+import io
+import json
+import os
+import re
+import runpy
+import selectors
+import shlex
+import shutil
+import signal
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import traceback
+
+# Imported by the server after the script's own imports, when installed
+PRELOAD = {
+    "openstackclient.shell": (
+        "openstackclient.common.clientmanager",
+        "openstackclient.compute.v2.server",
+        "openstack.connection",
+        "keystoneauth1.identity.generic",
+        "keystoneauth1.loading",
+    ),
+}
+START_TIMEOUT = 60
+RE_IMPORT = re.compile(r"^\s*(?:from\s+([\w.]+)\s+import\s|import\s+([\w.]+)\s*$)")
+
+
+class ForkServerError(Exception):
+    pass
+
+
+def interpreter(exe):
+    """Command of the Python that runs console script ``exe``, or None if it is not one."""
+    try:
+        with open(exe, "rb") as f:
+            first = f.readline(1024).decode("utf-8", "replace")
+    except OSError:
+        return None
+    if not first.startswith("#!"):
+        return None
+    parts = shlex.split(first[2:].strip())
+    if parts and os.path.basename(parts[0]) == "env":
+        parts = parts[1:]
+    if not parts or not os.path.basename(parts[0]).startswith("python"):
+        return None
+    return parts
+
+
+def script_imports(script):
+    """Modules ``script`` imports at top level, plus their PRELOAD companions."""
+    modules = []
+    with open(script, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            m = RE_IMPORT.match(line)
+            if m:
+                name = m.group(1) or m.group(2)
+                modules += [name] + list(PRELOAD.get(name, ()))
+    return modules
+
+
+def _decode(data: bytes) -> str:
+    # Same decoding and newline translation as subprocess.run(text=True)
+    return io.TextIOWrapper(io.BytesIO(data)).read()
+
+
+def _read_all(fds):
+    """Read the pipes in ``fds`` to EOF concurrently; return their contents in order."""
+    chunks = {fd: [] for fd in fds}
+    with selectors.DefaultSelector() as sel:
+        for fd in fds:
+            sel.register(fd, selectors.EVENT_READ)
+        while sel.get_map():
+            for key, _ in sel.select():
+                data = os.read(key.fd, 65536)
+                if data:
+                    chunks[key.fd].append(data)
+                else:
+                    sel.unregister(key.fd)
+    return [b"".join(chunks[fd]) for fd in fds]
+
+
+def _stdin_fd():
+    try:
+        os.fstat(0)
+        return 0, False
+    except OSError:
+        return os.open(os.devnull, os.O_RDONLY), True
+
+
+class ForkServer:
+    """One preloaded server for the `openstack` script ``exe``."""
+
+    def __init__(self, exe, env):
+        python = interpreter(exe)
+        if python is None:
+            raise ForkServerError(f"{exe} is not a Python console script")
+        self.exe = exe
+        self.dir = tempfile.mkdtemp(prefix="ossc-fork-")
+        self.path = os.path.join(self.dir, "server.sock")
+        # The server needs no credentials; children get the full env per request
+        server_env = {k: v for k, v in env.items() if not k.startswith("OS_")}
+        try:
+            self.proc = subprocess.Popen(
+                python + [os.path.abspath(__file__), self.path, exe],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                env=server_env,
+            )
+        except OSError:
+            shutil.rmtree(self.dir, ignore_errors=True)
+            raise
+        with selectors.DefaultSelector() as sel:
+            sel.register(self.proc.stdout, selectors.EVENT_READ)
+            ready = sel.select(START_TIMEOUT) and self.proc.stdout.readline() == b"ready\n"
+        if not ready:
+            self.close()
+            raise ForkServerError(f"fork server for {exe} did not start")
+
+    def run(self, cmd, env) -> subprocess.CompletedProcess:
+        """Like ``subprocess.run(cmd, env=env, capture_output=True, text=True)``."""
+        # Imported here: multiprocessing is only needed with --executor fork
+        from multiprocessing import reduction
+
+        out_r, out_w = os.pipe()
+        err_r, err_w = os.pipe()
+        stdin, own_stdin = _stdin_fd()
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            try:
+                conn.connect(self.path)
+                header = json.dumps({"argv": list(cmd[1:]), "env": dict(env), "cwd": os.getcwd()}).encode("utf-8")
+                conn.sendall(struct.pack("!I", len(header)) + header)
+                reduction.sendfds(conn, [stdin, out_w, err_w])
+            finally:
+                for fd in (out_w, err_w) + ((stdin,) if own_stdin else ()):
+                    os.close(fd)
+            stdout, stderr = _read_all([out_r, err_r])
+            with conn.makefile("rb") as reply:
+                line = reply.readline()
+        except OSError as e:
+            raise ForkServerError(f"fork server for {self.exe} failed: {e}") from e
+        finally:
+            conn.close()
+            os.close(out_r)
+            os.close(err_r)
+        if not line:
+            raise ForkServerError(f"fork server for {self.exe} exited")
+        return subprocess.CompletedProcess(cmd, json.loads(line)["code"], _decode(stdout), _decode(stderr))
+
+    def close(self):
+        if self.proc.stdin:
+            self.proc.stdin.close()  # EOF tells the server to exit
+        try:
+            self.proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+            self.proc.wait()
+        self.proc.stdout.close()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+
+class ForkServers:
+    """Fork servers by `openstack` path, started on first use (thread-safe).
+
+    Commands whose server cannot start or breaks run as normal children.
+    """
+
+    def __init__(self, out=None):
+        self.out = out  # stream for fallback notices (default: sys.stdout)
+        self._lock = threading.Lock()
+        self._servers = {}
+
+    def _server(self, exe, env):
+        with self._lock:
+            if exe not in self._servers:
+                try:
+                    self._servers[exe] = ForkServer(exe, env)
+                except (ForkServerError, OSError) as e:
+                    print(f"Fork server unavailable ({e}); starting children normally", file=self.out)
+                    self._servers[exe] = None
+            return self._servers[exe]
+
+    def run(self, cmd, env) -> subprocess.CompletedProcess:
+        server = self._server(cmd[0], env)
+        if server is not None:
+            try:
+                return server.run(cmd, env)
+            except ForkServerError as e:
+                print(f"{e}; starting children normally", file=self.out)
+                with self._lock:
+                    self._servers[cmd[0]] = None
+                server.close()
+        return subprocess.run(cmd, env=env, capture_output=True, text=True)
+
+    def close(self):
+        with self._lock:
+            servers, self._servers = list(self._servers.values()), {}
+        for server in servers:
+            if server is not None:
+                server.close()
+
+
+# -- server side (runs under the openstack interpreter) ----------------------
+
+
+def _exit_code(status):
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def _recv_exact(conn, n):
+    data = b""
+    while len(data) < n:
+        chunk = conn.recv(n - len(data))
+        if not chunk:
+            raise EOFError("short request")
+        data += chunk
+    return data
+
+
+def _child(script, request, fds, inherited):
+    """Body of a forked child: become ``script`` with the request's argv/env/stdio. Never returns."""
+    code = 1
+    try:
+        signal.set_wakeup_fd(-1)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        for obj in inherited:
+            if isinstance(obj, int):
+                os.close(obj)
+            else:
+                obj.close()
+        for target, fd in enumerate(fds):
+            os.dup2(fd, target)
+        for fd in fds:
+            if fd > 2:
+                os.close(fd)
+        os.chdir(request["cwd"])
+        os.environ.clear()
+        os.environ.update(request["env"])
+        sys.argv = [script] + request["argv"]
+        try:
+            runpy.run_path(script, run_name="__main__")
+            code = 0
+        except SystemExit as e:
+            code = e.code
+            if code is None:
+                code = 0
+            elif not isinstance(code, int):
+                print(code, file=sys.stderr)
+                code = 1
+        except BaseException:
+            traceback.print_exc()
+            code = 1
+        atexit._run_exitfuncs()
+        sys.stdout.flush()
+        sys.stderr.flush()
+    finally:
+        os._exit(code & 0xFF)
+
+
+def serve(sock_path, script):
+    from multiprocessing import reduction
+
+    # Same sys.path as `openstack` started directly: its own directory first
+    sys.path[0] = os.path.dirname(os.path.abspath(script))
+    for name in script_imports(script):
+        try:
+            importlib.import_module(name)
+        except Exception:
+            pass  # the child reports it like a fresh process would
+    if hasattr(gc, "freeze"):
+        gc.freeze()  # keep preloaded objects out of collections, so their pages stay shared
+
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(sock_path)
+    listener.listen(128)
+    wake_r, wake_w = os.pipe()
+    os.set_blocking(wake_r, False)
+    os.set_blocking(wake_w, False)
+    signal.set_wakeup_fd(wake_w)
+    signal.signal(signal.SIGCHLD, lambda *_: None)
+    sel = selectors.DefaultSelector()
+    sel.register(listener, selectors.EVENT_READ)
+    sel.register(wake_r, selectors.EVENT_READ)
+    sel.register(0, selectors.EVENT_READ)
+    pending = {}
+    sys.stdout.write("ready\n")
+    sys.stdout.flush()
+
+    while True:
+        for key, _ in sel.select():
+            if key.fileobj is listener:
+                conn, _ = listener.accept()
+                conn.settimeout(10)
+                try:
+                    size = struct.unpack("!I", _recv_exact(conn, 4))[0]
+                    request = json.loads(_recv_exact(conn, size).decode("utf-8"))
+                    fds = reduction.recvfds(conn, 3)
+                except (OSError, ValueError, EOFError, RuntimeError):
+                    conn.close()
+                    continue
+                pid = os.fork()
+                if pid == 0:
+                    _child(script, request, fds, [sel, listener, conn, wake_r, wake_w] + list(pending.values()))
+                for fd in fds:
+                    os.close(fd)
+                pending[pid] = conn
+            elif key.fileobj == wake_r:
+                while True:
+                    try:
+                        if not os.read(wake_r, 512):
+                            break
+                    except BlockingIOError:
+                        break
+            elif not os.read(0, 4096):
+                return  # the client closed our stdin
+        while pending:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                break
+            conn = pending.pop(pid, None)
+            if conn is not None:
+                try:
+                    conn.sendall(json.dumps({"code": _exit_code(status)}).encode("utf-8") + b"\n")
+                except OSError:
+                    pass
+                conn.close()
+
+
+if __name__ == "__main__":
+    serve(sys.argv[1], sys.argv[2])
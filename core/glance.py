@@ -0,0 +1,186 @@
+"""Single-pass image upload to the Image API v2 (`ossc image-upload`).
+
+`openstack image create --file` reads the file once to hash it and again to
+send it. Here the file is memory-mapped and each block of the mapping is
+hashed (md5 ``checksum`` plus the ``os_hash_algo`` multihash) and then
+passed to the socket as the same memoryview, so the data is read from the
+page cache once and never copied into Python objects.
+
+When the upload finishes, the hashes are compared with the ones Glance
+computed for the image. If an upload fails, the image is left ``queued`` and
+the data can be sent again into it with ``image_id``.
+"""
+import hashlib
+import http.client
+import json
+import mmap
+import os
+import time
+from urllib.parse import urlparse
+
+from core import keystone
+from core.regions import endpoint_url
+
+CHUNK_SIZE = 4 * 1024 * 1024
+HASH_ALGOS = ("sha256", "sha384", "sha512")
+# file extension -> disk_format
+DISK_FORMATS = {
+    ".qcow2": "qcow2",
+    ".img": "raw",
+    ".raw": "raw",
+    ".iso": "iso",
+    ".vmdk": "vmdk",
+    ".vhd": "vhd",
+    ".vhdx": "vhdx",
+    ".vdi": "vdi",
+    ".ami": "ami",
+    ".ari": "ari",
+    ".aki": "aki",
+}
+
+
+class GlanceError(Exception):
+    pass
+
+
+def guess_disk_format(path) -> str:
+    return DISK_FORMATS.get(os.path.splitext(str(path))[1].lower(), "raw")
+
+
+def _error_message(raw: bytes) -> str:
+    try:
+        data = json.loads(raw.decode("utf-8"))
+        return data.get("message") or next(iter(data.values()))["message"]
+    except Exception:
+        return raw.decode("utf-8", "replace").strip()[:200]
+
+
+class HashingReader:
+    """File-like view of a mapped file that hashes every block it hands out."""
+
+    def __init__(self, view, hash_algo="sha512", progress=None):
+        self.view = view
+        self.size = len(view)
+        self.offset = 0
+        self.md5 = hashlib.md5()
+        self.multihash = hashlib.new(hash_algo)
+        self.progress = progress
+
+    def read(self, n=-1):
+        end = self.size if n is None or n < 0 else min(self.size, self.offset + n)
+        block = self.view[self.offset:end]
+        self.offset = end
+        if block:
+            self.md5.update(block)
+            self.multihash.update(block)
+            if self.progress:
+                self.progress(self.offset, self.size)
+        return block
+
+
+class ImageClient:
+    def __init__(self, env: dict, timeout: float = 60, chunk_size: int = CHUNK_SIZE):
+        self.env = env
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        token = keystone.authenticate(env, timeout=timeout)
+        url = endpoint_url(env, token["catalog"], "image")
+        if not url:
+            region = env.get("OS_REGION_NAME") or "any region"
+            raise keystone.KeystoneError(f"no image endpoint for {region} in the service catalog")
+        self.token = token["id"]
+        self.url = urlparse(url.rstrip("/"))
+        self.base = self.url.path[: -len("/v2")] if self.url.path.endswith("/v2") else self.url.path
+        self._conn = None
+
+    def _connection(self):
+        if self._conn is None:
+            if self.url.scheme == "https":
+                self._conn = http.client.HTTPSConnection(
+                    self.url.netloc, timeout=self.timeout, context=keystone.ssl_context(self.env),
+                    blocksize=self.chunk_size,
+                )
+            else:
+                self._conn = http.client.HTTPConnection(
+                    self.url.netloc, timeout=self.timeout, blocksize=self.chunk_size
+                )
+        return self._conn
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def request(self, method, path, body=None, headers=None):
+        all_headers = {"X-Auth-Token": self.token, "Accept": "application/json"}
+        all_headers.update(headers or {})
+        if isinstance(body, dict):
+            body = json.dumps(body).encode("utf-8")
+            all_headers["Content-Type"] = "application/json"
+        conn = self._connection()
+        try:
+            conn.request(method, self.base + "/v2" + path, body=body, headers=all_headers)
+            resp = conn.getresponse()
+            raw = resp.read()
+        except (http.client.HTTPException, OSError) as e:
+            self.close()
+            raise GlanceError(f"{method} {path}: connection failed: {e}") from e
+        if resp.status >= 400:
+            raise GlanceError(f"{method} {path}: HTTP {resp.status}: {_error_message(raw)}")
+        return json.loads(raw.decode("utf-8")) if raw else None
+
+    def create_image(self, name, disk_format, container_format="bare", visibility=None, properties=None):
+        body = {"name": name, "disk_format": disk_format, "container_format": container_format}
+        if visibility:
+            body["visibility"] = visibility
+        body.update(properties or {})
+        return self.request("POST", "/images", body)
+
+    def get_image(self, image_id):
+        return self.request("GET", f"/images/{image_id}")
+
+    def upload_file(self, image_id, path, hash_algo="sha512", progress=None) -> dict:
+        """Stream ``path`` into the image; returns size, hashes and timing of the transfer."""
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+            try:
+                view = memoryview(mapped) if mapped is not None else memoryview(b"")
+                try:
+                    reader = HashingReader(view, hash_algo, progress)
+                    started = time.monotonic()
+                    self.request(
+                        "PUT",
+                        f"/images/{image_id}/file",
+                        reader,
+                        {"Content-Type": "application/octet-stream", "Content-Length": str(size)},
+                    )
+                    elapsed = time.monotonic() - started
+                finally:
+                    view.release()
+            finally:
+                if mapped is not None:
+                    try:
+                        mapped.close()
+                    except BufferError:
+                        pass  # a block is still referenced by a traceback; unmapped when collected
+        return {
+            "size": size,
+            "checksum": reader.md5.hexdigest(),
+            "os_hash_algo": hash_algo,
+            "os_hash_value": reader.multihash.hexdigest(),
+            "elapsed": elapsed,
+            "throughput": size / elapsed if elapsed > 0 else 0.0,
+        }
+
+
+def verify(local: dict, image: dict):
+    """Mismatches between the hashes computed here and the ones Glance stored, as messages."""
+    problems = []
+    if image.get("size") is not None and image["size"] != local["size"]:
+        problems.append(f"size {image['size']} != {local['size']}")
+    if image.get("checksum") and image["checksum"] != local["checksum"]:
+        problems.append(f"checksum {image['checksum']} != {local['checksum']}")
+    if image.get("os_hash_algo") == local["os_hash_algo"] and image.get("os_hash_value") != local["os_hash_value"]:
+        problems.append(f"{local['os_hash_algo']} {image.get('os_hash_value')} != {local['os_hash_value']}")
+    return problems
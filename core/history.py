@@ -0,0 +1,141 @@
+"""Content-addressed history of report runs.
+
+Layout under the history root:
+  objects/<aa>/<sha256>.gz   gzip-compressed blobs, stored once per content hash
+  runs/<run_id>.json         per-run manifest: relative path -> ordered blob hashes
+
+Report files start with a per-run header (timestamp, command) followed by the
+server list output. The header and body are stored as separate blobs so that
+runs with unchanged server lists share the large body blob.
+"""
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+
+def split_parts(data: bytes):
+    """Split a report into (header, body) when it starts with a '#' header block."""
+    if data.startswith(b"#"):
+        idx = data.find(b"\n\n")
+        if idx != -1 and idx + 2 < len(data):
+            return [data[: idx + 2], data[idx + 2:]]
+    return [data]
+
+
+class HistoryStore:
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.objects = self.root / "objects"
+        self.runs = self.root / "runs"
+
+    def _object_path(self, digest: str) -> Path:
+        return self.objects / digest[:2] / (digest + ".gz")
+
+    def put_bytes(self, data: bytes):
+        """Store a blob if not present; return (digest, newly_stored)."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        if path.exists():
+            return digest, False
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=str(path.parent), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw:
+                with gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as gz:
+                    gz.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        return digest, True
+
+    def get_bytes(self, digest: str) -> bytes:
+        with gzip.open(self._object_path(digest), "rb") as f:
+            return f.read()
+
+    def record_run(self, base: Path, files, meta=None, now=None):
+        """Store ``files`` (paths under ``base``) and write a run manifest.
+
+        Returns (run_id, stats) where stats counts files, new blobs and bytes.
+        """
+        now = now or datetime.now(timezone.utc)
+        run_id = now.strftime("%Y%m%dT%H%M%S%fZ")
+        base = Path(base)
+        entries = {}
+        stats = {"files": 0, "new_objects": 0, "bytes": 0}
+        for path in sorted(Path(p) for p in files):
+            data = path.read_bytes()
+            digests = []
+            for part in split_parts(data):
+                digest, new = self.put_bytes(part)
+                digests.append(digest)
+                stats["new_objects"] += int(new)
+            entries[path.relative_to(base).as_posix()] = {"parts": digests, "size": len(data)}
+            stats["files"] += 1
+            stats["bytes"] += len(data)
+        manifest = {"run_id": run_id, "created": now.isoformat(), "files": entries}
+        manifest.update(meta or {})
+        self.runs.mkdir(parents=True, exist_ok=True)
+        tmp = self.runs / (run_id + ".json.tmp")
+        tmp.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+        os.replace(tmp, self.runs / (run_id + ".json"))
+        return run_id, stats
+
+    def list_runs(self):
+        """Return run manifests, oldest first."""
+        if not self.runs.is_dir():
+            return []
+        return [json.loads(p.read_text(encoding="utf-8")) for p in sorted(self.runs.glob("*.json"))]
+
+    def load_run(self, run_id: str):
+        path = self.runs / (run_id + ".json")
+        if not path.exists():
+            raise LookupError(f"Run not found in history: {run_id}")
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def restore(self, run_id: str, dest: Path) -> int:
+        manifest = self.load_run(run_id)
+        dest = Path(dest)
+        for rel, entry in manifest["files"].items():
+            target = dest / rel
+            target.parent.mkdir(parents=True, exist_ok=True)
+            with open(target, "wb") as out:
+                for digest in entry["parts"]:
+                    out.write(self.get_bytes(digest))
+        return len(manifest["files"])
+
+    def prune(self, keep_days=None, keep_runs=None, now=None):
+        """Drop runs older than keep_days or beyond the newest keep_runs, then
+        delete blobs no remaining run references. Returns (runs, objects) removed."""
+        runs = self.list_runs()
+        now = now or datetime.now(timezone.utc)
+        drop = set()
+        if keep_runs is not None:
+            drop.update(r["run_id"] for r in runs[: max(0, len(runs) - keep_runs)])
+        if keep_days is not None:
+            cutoff = now - timedelta(days=keep_days)
+            drop.update(r["run_id"] for r in runs if datetime.fromisoformat(r["created"]) < cutoff)
+        for run_id in drop:
+            (self.runs / (run_id + ".json")).unlink()
+
+        live = set()
+        for r in runs:
+            if r["run_id"] not in drop:
+                for entry in r["files"].values():
+                    live.update(entry["parts"])
+        removed = 0
+        if self.objects.is_dir():
+            for path in self.objects.glob("*/*.gz"):
+                if path.name[: -len(".gz")] not in live:
+                    path.unlink()
+                    removed += 1
+            for sub in self.objects.iterdir():
+                if sub.is_dir() and not any(sub.iterdir()):
+                    shutil.rmtree(sub, ignore_errors=True)
+        return len(drop), removed
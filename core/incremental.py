@@ -0,0 +1,98 @@
+"""Incremental `server list`: fetch only servers changed since the last sync.
+
+Each catalog keeps a local server map (rows keyed by ID, as printed by
+`server list -f json`) plus the time of its last successful sync. The next
+run asks Nova for ``--changes-since`` that time. Nova then also returns
+servers deleted since, which are dropped from the map.
+"""
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from core.summary import iter_json_rows
+
+SYNC_FILE = "servers.sync.json"
+# Changes-since is compared with the server's clock; re-fetching a few minutes of
+# overlap is harmless (merging is idempotent) and hides clock skew.
+OVERLAP = timedelta(minutes=5)
+DELETED_STATUSES = {"DELETED"}
+KEY_COLUMNS = ("ID", "Status")
+SCOPE_VARS = ("OS_AUTH_URL", "OS_PROJECT_ID", "OS_PROJECT_NAME", "OS_TENANT_ID", "OS_TENANT_NAME", "OS_REGION_NAME")
+
+
+def fetch_columns(columns):
+    """Columns to request so rows can be keyed (ID) and deletions seen (Status)."""
+    if not columns:
+        return columns
+    lower = {c.lower() for c in columns}
+    return list(columns) + [c for c in KEY_COLUMNS if c.lower() not in lower]
+
+
+def signature(list_args, env) -> str:
+    """Identify the query a server map belongs to; any change forces a full sync."""
+    scope = [env.get(k) or "" for k in SCOPE_VARS]
+    return hashlib.sha256(json.dumps([list(list_args), scope]).encode("utf-8")).hexdigest()
+
+
+def _iso(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class ServerMap:
+    def __init__(self, path: Path, sig: str, synced_at=None, servers=None):
+        self.path = Path(path)
+        self.signature = sig
+        self.synced_at = synced_at
+        self.servers = servers if servers is not None else {}
+
+    @classmethod
+    def load(cls, path: Path, sig: str):
+        """Load the stored map; an unreadable map or another query's map starts empty."""
+        path = Path(path)
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return cls(path, sig)
+        if data.get("signature") != sig or not data.get("synced_at"):
+            return cls(path, sig)
+        return cls(path, sig, data["synced_at"], data.get("servers", {}))
+
+    def fetch_args(self):
+        """Extra `server list` arguments: empty for a full sync."""
+        if not self.synced_at:
+            return []
+        since = datetime.fromisoformat(self.synced_at.replace("Z", "+00:00")) - OVERLAP
+        return ["--changes-since", _iso(since)]
+
+    def apply(self, stdout: str, started: datetime):
+        """Merge one fetch into the map; return (changed, deleted) counts."""
+        incremental = bool(self.synced_at)
+        servers = self.servers if incremental else {}
+        changed = deleted = 0
+        for row in iter_json_rows(stdout.splitlines(keepends=True)):
+            sid = row.get("ID")
+            if not sid:
+                continue
+            if str(row.get("Status", "")).upper() in DELETED_STATUSES:
+                deleted += servers.pop(sid, None) is not None
+                continue
+            servers[sid] = row
+            changed += 1
+        self.servers = servers
+        self.synced_at = _iso(started)
+        return changed, deleted
+
+    def save(self):
+        data = {"signature": self.signature, "synced_at": self.synced_at, "servers": self.servers}
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def render(self, columns=None) -> str:
+        """The full map as `server list -f json` would print it."""
+        rows = list(self.servers.values())
+        if columns:
+            rows = [{c: row.get(c, "") for c in columns} for row in rows]
+        return json.dumps(rows, ensure_ascii=False, indent=2) + "\n"
@@ -0,0 +1,244 @@
+"""In-memory server inventory served over HTTP (`ossc serve-http`).
+
+Every catalog has one cache entry, refreshed in the background when its TTL
+expires. Readers never trigger fetches of their own:
+- Before the first fetch completes, they wait for it (single flight).
+- After that, they are served the last good data, stale or not.
+Response bodies and ETags are computed once per refresh, so any number of
+readers is served from one fetch. ETags depend on the data only, so a
+refresh that brings no change still answers If-None-Match with a 304.
+
+Endpoints (JSON):
+    GET /healthz
+    GET /catalogs                                 status of every catalog
+    GET /catalogs/<profile>/<catalog>/servers     cached `server list --long`
+    GET /catalogs/<profile>/<catalog>/summary     counts by status/flavor/image/AZ
+    GET /summary                                  totals across catalogs
+"""
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+from core.summary import ReportSummary, ServerCounts
+
+
+def _encode(data, key=None):
+    """(body, ETag). With ``key`` (the data without its timestamps) the ETag is a weak
+    one of ``key``, so a refresh that returns the same data keeps the same ETag."""
+    body = json.dumps(data, ensure_ascii=False, indent=1).encode("utf-8")
+    if key is None:
+        return body, '"%s"' % hashlib.sha256(body).hexdigest()[:32]
+    raw = json.dumps(key, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    return body, 'W/"%s"' % hashlib.sha256(raw).hexdigest()[:32]
+
+
+def _now_iso():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class Entry:
+    def __init__(self, profile, catalog, ttl):
+        self.profile = profile
+        self.catalog = catalog
+        self.ttl = ttl
+        self.ready = threading.Event()  # set once the first fetch finished (ok or not)
+        self.refreshing = False
+        self.expires = 0.0
+        self.fetched_at = None
+        self.fetches = 0
+        self.error = None
+        self.counts = None
+        # name -> (body, etag)
+        self.bodies = {}
+
+    @property
+    def name(self):
+        return f"{self.profile}/{self.catalog}"
+
+    def status(self, now):
+        return {
+            "profile": self.profile,
+            "catalog": self.catalog,
+            "ttl": self.ttl,
+            "fetched_at": self.fetched_at,
+            "expires_in": round(max(0.0, self.expires - now), 1) if self.fetched_at else None,
+            "servers": self.counts.servers if self.counts else None,
+            "error": self.error,
+        }
+
+
+class Inventory:
+    """Per-catalog cache around ``fetch(profile, catalog) -> list of server rows``."""
+
+    def __init__(self, fetch, catalogs, ttl=300, ttls=None, jobs=4, error_ttl=None):
+        self.fetch = fetch
+        self.error_ttl = error_ttl if error_ttl is not None else min(ttl, 60)
+        ttls = ttls or {}
+        self.entries = {(p, c): Entry(p, c, ttls.get(f"{p}/{c}", ttl)) for p, c in catalogs}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=jobs)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._summary = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join()
+        self._pool.shutdown(wait=True)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            now = time.monotonic()
+            next_due = now + 60
+            with self._lock:
+                for entry in self.entries.values():
+                    if entry.refreshing:
+                        continue
+                    if entry.expires <= now:
+                        entry.refreshing = True
+                        self._pool.submit(self._refresh, entry)
+                    else:
+                        next_due = min(next_due, entry.expires)
+            self._wake.wait(max(0.05, next_due - time.monotonic()))
+            self._wake.clear()
+
+    def _refresh(self, entry):
+        try:
+            rows = self.fetch(entry.profile, entry.catalog)
+        except Exception as e:  # keep serving the last good data
+            with self._lock:
+                entry.error = str(e) or e.__class__.__name__
+                entry.expires = time.monotonic() + self.error_ttl
+        else:
+            counts = ServerCounts()
+            for row in rows:
+                counts.add(row)
+            fetched_at = _now_iso()
+            head = {"profile": entry.profile, "catalog": entry.catalog, "fetched_at": fetched_at}
+            key = {"profile": entry.profile, "catalog": entry.catalog}
+            bodies = {
+                "servers": _encode(dict(head, servers=rows), dict(key, servers=rows)),
+                "summary": _encode(dict(head, **counts.to_dict()), dict(key, **counts.to_dict())),
+            }
+            with self._lock:
+                entry.bodies = bodies
+                entry.counts = counts
+                entry.fetched_at = fetched_at
+                entry.error = None
+                entry.expires = time.monotonic() + entry.ttl
+                self._summary = None
+        finally:
+            with self._lock:
+                entry.fetches += 1
+                entry.refreshing = False
+            entry.ready.set()
+            self._wake.set()
+
+    def get(self, profile, catalog, kind, timeout=None):
+        """(body, etag) for an entry, waiting for its first fetch; LookupError if unknown."""
+        entry = self.entries.get((profile, catalog))
+        if entry is None:
+            raise LookupError(f"Unknown catalog: {profile}/{catalog}")
+        entry.ready.wait(timeout)
+        with self._lock:
+            return entry.bodies.get(kind), entry.error
+
+    def catalogs(self):
+        now = time.monotonic()
+        with self._lock:
+            return _encode([e.status(now) for e in self.entries.values()])
+
+    def summary(self, timeout=None):
+        for entry in self.entries.values():
+            entry.ready.wait(timeout)
+        with self._lock:
+            if self._summary is None:
+                summary = ReportSummary()
+                for entry in self.entries.values():
+                    summary.add_catalog(entry.name, entry.counts, 0 if entry.counts else 1, note=entry.error)
+                self._summary = _encode(summary.to_dict(_now_iso()), summary.to_dict(None))
+            return self._summary
+
+
+class InventoryHandler(BaseHTTPRequestHandler):
+    inventory = None
+    wait_timeout = 120
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=b"", etag=None, max_age=None):
+        self.send_response(status)
+        if body:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+        if max_age is not None:
+            self.send_header("Cache-Control", "max-age=%d" % max_age)
+        self.end_headers()
+        if body and self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _json(self, status, data):
+        self._send(status, _encode(data)[0])
+
+    def _cached(self, body, etag, max_age=None):
+        match = [t.strip() for t in (self.headers.get("If-None-Match") or "").split(",")]
+        if etag in match or "*" in match:
+            return self._send(304, etag=etag, max_age=max_age)
+        self._send(200, body, etag=etag, max_age=max_age)
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        parts = [unquote(p) for p in self.path.split("?", 1)[0].split("/") if p]
+        inv = self.inventory
+        if parts == ["healthz"]:
+            return self._json(200, {"ok": True})
+        if parts == ["catalogs"]:
+            return self._cached(*inv.catalogs())
+        if parts == ["summary"]:
+            return self._cached(*inv.summary(self.wait_timeout))
+        if len(parts) == 4 and parts[0] == "catalogs" and parts[3] in ("servers", "summary"):
+            try:
+                cached, error = inv.get(parts[1], parts[2], parts[3], self.wait_timeout)
+            except LookupError as e:
+                return self._json(404, {"error": str(e)})
+            if cached is None:
+                return self._json(502 if error else 503, {"error": error or "Not fetched yet"})
+            entry = inv.entries[(parts[1], parts[2])]
+            return self._cached(*cached, max_age=max(0, entry.expires - time.monotonic()))
+        self._json(404, {"error": "Not found: %s" % self.path})
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+def make_server(inventory, host, port):
+    handler = type("Handler", (InventoryHandler,), {"inventory": inventory})
+    return _Server((host, port), handler)
+
+
+def parse_bind(value):
+    host, sep, port = (value or "").rpartition(":")
+    if not sep or not port.isdigit():
+        raise ValueError(f"Invalid --bind '{value}': expected HOST:PORT")
+    return host.strip("[]") or "127.0.0.1", int(port)
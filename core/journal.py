@@ -0,0 +1,134 @@
+"""Run journal for resumable reports (`report --resume`).
+
+Every report run keeps ``run.journal`` at the top of ``--out``: a header
+line with the options that shape the output, then one line per written
+report. Each report line holds the report's exit code, the sha256 of its
+report.txt and, with --summary, its server counts. A line is appended with
+a single write and fsynced right after its report.txt is written. After a
+crash the journal therefore lists only reports that are complete on disk,
+and a torn last line is ignored.
+
+``--resume`` reuses reports whose last line has exit code 0 and whose
+report.txt still has the recorded hash. Everything else runs again.
+"""
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+JOURNAL_FILE = "run.journal"
+# report options that change what a report contains
+SIGNATURE_OPTIONS = ("format", "filter", "columns", "summary", "regions", "incremental", "profile_child", "shard")
+
+
+def signature(args) -> dict:
+    return {name: getattr(args, name, None) for name in SIGNATURE_OPTIONS}
+
+
+def digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def digest_file(path) -> str:
+    """sha256 of a file's bytes (same as ``digest`` of its UTF-8 text), read in blocks."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class RunJournal:
+    def __init__(self, out_root: Path):
+        self.out_root = Path(out_root)
+        self.path = self.out_root / JOURNAL_FILE
+        self.header = None
+
+    def load(self):
+        """(header, {name: last record}); (None, {}) when there is no journal."""
+        header, records = None, {}
+        try:
+            f = open(self.path, encoding="utf-8")
+        except OSError:
+            return None, {}
+        with f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue  # torn line from a crash
+                if rec.get("type") == "run":
+                    header = rec
+                elif rec.get("type") == "report":
+                    records[rec["name"]] = rec
+        return header, records
+
+    def completed(self, records):
+        """Records of successful reports whose report.txt is intact."""
+        done = {}
+        for name, rec in records.items():
+            if rec.get("code") != 0:
+                continue
+            try:
+                sha256 = digest_file(self.out_root / name / "report.txt")
+            except OSError:
+                continue
+            if sha256 == rec.get("sha256"):
+                done[name] = rec
+        return done
+
+    def begin(self, sig: dict, resume: bool = False):
+        """Start (or with ``resume`` continue) the journal; return the reusable records.
+
+        Raises ValueError when resuming a run that used different output options.
+        """
+        if resume:
+            header, records = self.load()
+            if header is not None:
+                # Options added since the journal was written count as unset
+                changed = sorted(k for k in sig if header.get("options", {}).get(k) != sig[k])
+                if changed:
+                    raise ValueError(
+                        f"Cannot resume: {self.path} is from a run with different {', '.join(changed)}; "
+                        "run without --resume"
+                    )
+                self.header = header
+                self._end_torn_line()
+                return self.completed(records)
+        self.header = {"type": "run", "started": round(time.time(), 3), "options": sig}
+        self.out_root.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(JOURNAL_FILE + ".tmp")
+        tmp.write_text(json.dumps(self.header) + "\n", encoding="utf-8")
+        os.replace(tmp, self.path)
+        return {}
+
+    def _end_torn_line(self):
+        # New records must not be glued to a line a crash cut short
+        with open(self.path, "rb+") as f:
+            if f.seek(0, os.SEEK_END) == 0:
+                return
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+
+    def record(self, name, code, text=None, counts=None, counted=True, note=None, sha256=None):
+        """Append one report's completion; call after its report.txt is written.
+
+        Pass the report's ``text``, or its ``sha256`` when it was written without
+        being held in memory.
+        """
+        sha256 = sha256 or digest(text)
+        rec = {"type": "report", "name": name, "code": code, "sha256": sha256, "finished": round(time.time(), 3)}
+        if counts is not None:
+            rec["counts"] = counts
+        if not counted:
+            rec["counted"] = False
+        if note:
+            rec["note"] = note
+        fd = os.open(str(self.path), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, (json.dumps(rec, separators=(",", ":")) + "\n").encode("utf-8"))
+            os.fsync(fd)
+        finally:
+            os.close(fd)
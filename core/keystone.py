@@ -0,0 +1,271 @@
+"""Minimal Keystone v3 client (stdlib only) for direct auth calls."""
+import functools
+import json
+import ssl
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+import urllib.error
+import urllib.request
+
+from core import authurls
+
+
+class KeystoneError(Exception):
+    pass
+
+
+class KeystoneConnectionError(KeystoneError):
+    """The auth URL did not answer (as opposed to an HTTP error from Keystone)."""
+
+
+def identity_url(auth_url: str) -> str:
+    url = (auth_url or "").rstrip("/")
+    if url.endswith("/v3"):
+        return url
+    if url.endswith("/v2.0"):
+        url = url[: -len("/v2.0")]
+    return url + "/v3"
+
+
+def _is_true(value) -> bool:
+    return str(value or "").strip().lower() in ("1", "true", "yes", "on")
+
+
+@functools.lru_cache(maxsize=32)
+def _ssl_context(cacert, insecure, cert, key):
+    ctx = ssl.create_default_context(cafile=cacert)
+    if insecure:
+        ctx.check_hostname = False
+        ctx.verify_mode = ssl.CERT_NONE
+    if cert:
+        ctx.load_cert_chain(cert, key)
+    return ctx
+
+
+def ssl_context(env: dict):
+    # Loading the CA bundle costs tens of ms of CPU; share one context per TLS setting
+    return _ssl_context(
+        env.get("OS_CACERT") or None,
+        _is_true(env.get("OS_INSECURE")),
+        env.get("OS_CERT") or None,
+        env.get("OS_KEY") or None,
+    )
+
+
+def select_auth_url(env: dict) -> dict:
+    """``env`` pointed at the fastest healthy of its auth URLs (see core.authurls)."""
+    if len(authurls.candidates(env)) < 2:
+        return env
+    return authurls.select(env, ssl_context(env))
+
+
+def fail_over(env: dict, tried: set):
+    """``env`` for the next auth URL after a failed run, or None (see authurls.failover)."""
+    if len(authurls.candidates(env)) < 2:
+        return None
+    return authurls.failover(env, tried, ssl_context(env))
+
+
+def _domain(env: dict, prefix: str):
+    if env.get(prefix + "_DOMAIN_ID"):
+        return {"id": env[prefix + "_DOMAIN_ID"]}
+    if env.get(prefix + "_DOMAIN_NAME"):
+        return {"name": env[prefix + "_DOMAIN_NAME"]}
+    if env.get("OS_DEFAULT_DOMAIN_ID"):
+        return {"id": env["OS_DEFAULT_DOMAIN_ID"]}
+    if env.get("OS_DEFAULT_DOMAIN_NAME"):
+        return {"name": env["OS_DEFAULT_DOMAIN_NAME"]}
+    return {"id": "default"}
+
+
+def scope_from_env(env: dict):
+    project_id = env.get("OS_PROJECT_ID") or env.get("OS_TENANT_ID")
+    if project_id:
+        return {"project": {"id": project_id}}
+    project_name = env.get("OS_PROJECT_NAME") or env.get("OS_TENANT_NAME")
+    if project_name:
+        return {"project": {"name": project_name, "domain": _domain(env, "OS_PROJECT")}}
+    if env.get("OS_DOMAIN_ID"):
+        return {"domain": {"id": env["OS_DOMAIN_ID"]}}
+    if env.get("OS_DOMAIN_NAME"):
+        return {"domain": {"name": env["OS_DOMAIN_NAME"]}}
+    return None
+
+
+def password_auth_body(env: dict, scoped: bool = True) -> dict:
+    if env.get("OS_USER_ID"):
+        user = {"id": env["OS_USER_ID"]}
+    else:
+        user = {"name": env.get("OS_USERNAME"), "domain": _domain(env, "OS_USER")}
+    user["password"] = env.get("OS_PASSWORD")
+    auth = {"identity": {"methods": ["password"], "password": {"user": user}}}
+    scope = scope_from_env(env) if scoped else None
+    if scope:
+        auth["scope"] = scope
+    return {"auth": auth}
+
+
+def token_auth_body(token: str, scope) -> dict:
+    auth = {"identity": {"methods": ["token"], "token": {"id": token}}}
+    if scope:
+        auth["scope"] = scope
+    return {"auth": auth}
+
+
+def _error_message(raw: bytes) -> str:
+    try:
+        return json.loads(raw.decode("utf-8"))["error"]["message"]
+    except Exception:
+        return raw.decode("utf-8", "replace").strip()[:200]
+
+
+def _post_tokens(env: dict, body: dict, timeout: float, catalog: bool):
+    urls = authurls.order(env)
+    if len(urls) < 2:
+        return _post_tokens_to(env.get("OS_AUTH_URL"), env, body, timeout, catalog)
+    # Equivalent auth URLs: try them fastest first, failing over on connection errors
+    cache = authurls.shared_cache()
+    for i, auth_url in enumerate(urls):
+        try:
+            token = _post_tokens_to(auth_url, env, body, timeout, catalog)
+        except KeystoneConnectionError:
+            # A URL going down is saved at once, so other processes skip it
+            if cache.record(auth_url, None):
+                cache.save()
+            if i == len(urls) - 1:
+                raise
+            continue
+        if cache.record(auth_url, token["elapsed"]):
+            cache.save()
+        return token
+
+
+def _post_tokens_to(auth_url, env: dict, body: dict, timeout: float, catalog: bool):
+    url = identity_url(auth_url) + "/auth/tokens"
+    if not catalog:
+        url += "?nocatalog"
+    req = urllib.request.Request(
+        url,
+        data=json.dumps(body).encode("utf-8"),
+        headers={"Content-Type": "application/json", "Accept": "application/json"},
+        method="POST",
+    )
+    started = time.monotonic()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout, context=ssl_context(env)) as resp:
+            token_id = resp.headers.get("X-Subject-Token")
+            payload = json.loads(resp.read().decode("utf-8") or "{}")
+    except urllib.error.HTTPError as e:
+        raise KeystoneError("HTTP %s: %s" % (e.code, _error_message(e.read()))) from e
+    except (urllib.error.URLError, OSError) as e:
+        raise KeystoneConnectionError("connection failed: %s" % getattr(e, "reason", e)) from e
+    except ValueError as e:
+        raise KeystoneError("connection failed: %s" % e) from e
+    elapsed = time.monotonic() - started
+    if not token_id:
+        raise KeystoneError("no X-Subject-Token in response")
+    token = payload.get("token", {})
+    return {
+        "id": token_id,
+        "expires_at": token.get("expires_at"),
+        "project": token.get("project"),
+        "user": token.get("user"),
+        "catalog": token.get("catalog", []),
+        "elapsed": elapsed,
+        "auth_url": auth_url,
+    }
+
+
+def authenticate(env: dict, timeout: float = 30, scoped: bool = True, catalog: bool = True) -> dict:
+    """Password-authenticate against Keystone and return the issued token.
+
+    The result holds ``id``, ``expires_at``, ``project``, ``user``,
+    ``catalog``, ``elapsed`` (request wall time in seconds) and ``auth_url``
+    (the one that answered, see core.authurls).
+    """
+    return _post_tokens(env, password_auth_body(env, scoped=scoped), timeout, catalog)
+
+
+def rescope(env: dict, token: str, scope=None, timeout: float = 30, catalog: bool = True) -> dict:
+    """Exchange ``token`` for one scoped to ``scope`` (default: from env)."""
+    if scope is None:
+        scope = scope_from_env(env)
+    return _post_tokens(env, token_auth_body(token, scope), timeout, catalog)
+
+
+# Variables that identify the authenticating user (everything except scope)
+PASSWORD_VARS = (
+    "OS_USERNAME",
+    "OS_USER_ID",
+    "OS_PASSWORD",
+    "OS_USER_DOMAIN_NAME",
+    "OS_USER_DOMAIN_ID",
+)
+
+
+def identity_key(env: dict):
+    """Key of the credentials in env; catalogs sharing it can share one unscoped token."""
+    return (
+        identity_url(env.get("OS_AUTH_URL")),
+        env.get("OS_USER_ID") or "",
+        env.get("OS_USERNAME") or "",
+        json.dumps(_domain(env, "OS_USER"), sort_keys=True),
+        env.get("OS_PASSWORD") or "",
+        env.get("OS_CACERT") or "",
+        env.get("OS_INSECURE") or "",
+    )
+
+
+def token_env(env: dict, token_id: str) -> dict:
+    """Return env that makes openstackclient rescope ``token_id`` instead of using the password."""
+    new_env = {k: v for k, v in env.items() if k not in PASSWORD_VARS}
+    new_env["OS_AUTH_TYPE"] = "v3token"
+    new_env["OS_TOKEN"] = token_id
+    return new_env
+
+
+def _parse_expiry(value):
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+class UnscopedTokens:
+    """Thread-safe cache of unscoped tokens, one password auth per identity.
+
+    Failures are cached too so a bad identity is not retried for every catalog.
+    Tokens are renewed when they expire within ``margin`` seconds.
+    """
+
+    def __init__(self, timeout: float = 30, margin: float = 300):
+        self.timeout = timeout
+        self.margin = margin
+        self._lock = threading.Lock()
+        self._locks = {}
+        self._entries = {}
+
+    def get(self, env: dict) -> dict:
+        key = identity_key(env)
+        with self._lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            entry = self._entries.get(key)
+            if isinstance(entry, KeystoneError):
+                raise entry
+            if entry and not self._expiring(entry):
+                return entry
+            try:
+                entry = authenticate(env, timeout=self.timeout, scoped=False, catalog=False)
+            except KeystoneError as e:
+                self._entries[key] = e
+                raise
+            self._entries[key] = entry
+            return entry
+
+    def _expiring(self, entry) -> bool:
+        expires = _parse_expiry(entry.get("expires_at"))
+        if expires is None:
+            return False
+        return expires - timedelta(seconds=self.margin) <= datetime.now(timezone.utc)
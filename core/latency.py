@@ -0,0 +1,163 @@
+"""Append-only latency log for proxied commands and report tasks, and its statistics.
+
+One compact JSON line per invocation:
+    {"ts": 1760000000.12, "src": "proxy", "profile": "dev", "catalog": "app",
+     "cmd": "server list", "endpoint": "keystone.example.com:5000/RegionOne",
+     "rc": 0, "wall": 2.41, "child": 2.18}
+
+``wall`` is the time ossc spent on the invocation, and ``child`` the time
+spent in the `openstack` process. Each record is a single O_APPEND write, so
+concurrent writers do not interleave. The log rotates to .1 .. .N when it
+grows past ``MAX_BYTES``.
+
+Location: $OSSC_LATENCY_LOG, else $XDG_STATE_HOME/ossc/latency.log
+(~/.local/state/...). Set OSSC_LATENCY_LOG=off to disable it.
+"""
+import json
+import os
+import re
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+MAX_BYTES = 5 * 1024 * 1024
+KEEP_FILES = 3
+GROUP_FIELDS = ("catalog", "endpoint", "command")
+RE_WINDOW = re.compile(r"^(\d+(?:\.\d+)?)([smhdw])$")
+WINDOW_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+
+def log_path():
+    value = os.getenv("OSSC_LATENCY_LOG")
+    if value:
+        return None if value.strip().lower() in ("off", "0", "none") else Path(value)
+    base = os.getenv("XDG_STATE_HOME")
+    return (Path(base) if base else Path.home() / ".local" / "state") / "ossc" / "latency.log"
+
+
+def endpoint(env) -> str:
+    """Auth endpoint host plus region: the unit a degraded cloud shows up in."""
+    host = urlparse(env.get("OS_AUTH_URL") or "").netloc or "-"
+    region = env.get("OS_REGION_NAME")
+    return f"{host}/{region}" if region else host
+
+
+def command_name(argv) -> str:
+    words = []
+    for tok in argv:
+        if tok.startswith("-") or len(words) == 3:
+            break
+        words.append(tok)
+    return " ".join(words) or "-"
+
+
+def record(src, profile, catalog, cmd, env, rc, wall, child, path=None):
+    """Append one record; never raises (a broken log must not break a command)."""
+    path = path or log_path()
+    if path is None:
+        return
+    line = json.dumps(
+        {
+            "ts": round(time.time(), 2),
+            "src": src,
+            "profile": profile,
+            "catalog": catalog,
+            "cmd": cmd,
+            "endpoint": endpoint(env),
+            "rc": rc,
+            "wall": round(wall, 3),
+            "child": round(child, 3) if child is not None else None,
+        },
+        separators=(",", ":"),
+    )
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(str(path), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        try:
+            os.write(fd, (line + "\n").encode("utf-8"))
+            size = os.fstat(fd).st_size
+        finally:
+            os.close(fd)
+        if size > MAX_BYTES:
+            rotate(path)
+    except OSError:
+        pass
+
+
+def rotate(path: Path, keep: int = KEEP_FILES):
+    for i in range(keep - 1, 0, -1):
+        older = path.with_name(f"{path.name}.{i}")
+        if older.exists():
+            os.replace(older, path.with_name(f"{path.name}.{i + 1}"))
+    if path.exists():
+        os.replace(path, path.with_name(f"{path.name}.1"))
+
+
+def read_records(path: Path, since: float = None):
+    """Yield records from the rotated files (oldest first) and the live log."""
+    files = [path.with_name(f"{path.name}.{i}") for i in range(KEEP_FILES, 0, -1)] + [path]
+    for f in files:
+        try:
+            handle = open(f, encoding="utf-8", errors="replace")
+        except OSError:
+            continue
+        with handle:
+            for line in handle:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue  # torn line from a crash
+                if since is None or rec.get("ts", 0) >= since:
+                    yield rec
+
+
+def parse_window(value, now=None) -> float:
+    """'30m', '24h', '7d' -> cutoff timestamp."""
+    m = RE_WINDOW.match((value or "").strip())
+    if not m:
+        raise ValueError(f"Invalid window '{value}': expected e.g. 30m, 24h, 7d")
+    now = time.time() if now is None else now
+    return now - float(m.group(1)) * WINDOW_UNITS[m.group(2)]
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def aggregate(records, by="catalog"):
+    """Group records and compute count, errors, error rate and wall/child p50/p95/p99."""
+    if by not in GROUP_FIELDS:
+        raise ValueError(f"Cannot group by '{by}'; use one of: {', '.join(GROUP_FIELDS)}")
+    groups = {}
+    for rec in records:
+        if by == "catalog":
+            key = f"{rec.get('profile')}/{rec.get('catalog')}"
+        elif by == "command":
+            key = rec.get("cmd") or "-"
+        else:
+            key = rec.get("endpoint") or "-"
+        groups.setdefault(key, []).append(rec)
+    rows = []
+    for key, recs in groups.items():
+        wall = sorted(r.get("wall") or 0.0 for r in recs)
+        child = sorted(r["child"] for r in recs if r.get("child") is not None)
+        errors = sum(1 for r in recs if r.get("rc"))
+        rows.append(
+            {
+                by: key,
+                "count": len(recs),
+                "errors": errors,
+                "error_rate": round(errors / len(recs), 4),
+                "p50": percentile(wall, 50),
+                "p95": percentile(wall, 95),
+                "p99": percentile(wall, 99),
+                "child_p50": percentile(child, 50),
+                "child_p95": percentile(child, 95),
+            }
+        )
+    rows.sort(key=lambda r: (-(r["p95"] or 0), r[by]))
+    return rows
@@ -0,0 +1,115 @@
+"""Prometheus textfile-collector metrics for report runs (`report --metrics-file`).
+
+The file is rewritten atomically at the end of every run, so node_exporter
+never reads a partial file and a run that stops writing it shows up as a
+stale ``ossc_report_run_timestamp_seconds``. Per-catalog series are
+labelled ``profile``, ``catalog`` and ``region`` (empty without --regions).
+"""
+import os
+from pathlib import Path
+
+DURATION_BUCKETS = (0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+BYTES_BUCKETS = (1024, 16384, 131072, 1048576, 8388608, 67108864)
+
+
+def escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _number(value) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class RunMetrics:
+    """Per-catalog results of one report run, rendered in the text exposition format."""
+
+    def __init__(self):
+        self.catalogs = {}
+
+    def add_catalog(self, name, exit_code, bytes_written, duration=None, counts=None, reused=False, counted=True):
+        """``name`` is the report path (profile/catalog[/region]); ``counts`` a summary.ServerCounts.
+
+        ``counted=False`` keeps a catalog that repeats another one's query out of the histograms.
+        """
+        profile, catalog, *region = name.split("/")
+        self.catalogs[name] = {
+            "labels": {"profile": profile, "catalog": catalog, "region": "/".join(region)},
+            "exit_code": exit_code,
+            "bytes": bytes_written,
+            "duration": duration,
+            "counts": counts,
+            "reused": reused,
+            "counted": counted,
+        }
+
+    def render(self, exit_code, finished, elapsed) -> str:
+        lines = []
+
+        def family(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(f"{sample}{_labels(labels)} {_number(value)}" for sample, labels, value in samples)
+
+        entries = [self.catalogs[name] for name in sorted(self.catalogs)]
+        ran = [e for e in entries if not e["reused"]]
+        queries = [e for e in ran if e["counted"]]
+        family("ossc_report_run_timestamp_seconds", "gauge", "Unix time the last report run finished.",
+               [("ossc_report_run_timestamp_seconds", None, round(finished, 3))])
+        family("ossc_report_run_duration_seconds", "gauge", "Wall time of the last report run.",
+               [("ossc_report_run_duration_seconds", None, round(elapsed, 3))])
+        family("ossc_report_run_exit_code", "gauge", "Exit code of the last report run.",
+               [("ossc_report_run_exit_code", None, exit_code)])
+        results = {
+            "ok": sum(1 for e in ran if e["exit_code"] == 0),
+            "failed": sum(1 for e in ran if e["exit_code"] != 0),
+            "reused": len(entries) - len(ran),
+        }
+        family("ossc_report_catalogs", "gauge", "Catalog reports of the last run by result.",
+               [("ossc_report_catalogs", {"result": k}, v) for k, v in results.items()])
+
+        family("ossc_report_catalog_exit_code", "gauge", "Exit code of the catalog's query.",
+               [("ossc_report_catalog_exit_code", e["labels"], e["exit_code"]) for e in entries])
+        family("ossc_report_catalog_duration_seconds", "gauge", "Wall time of the catalog's query.",
+               [("ossc_report_catalog_duration_seconds", e["labels"], round(e["duration"], 3))
+                for e in ran if e["duration"] is not None])
+        family("ossc_report_catalog_bytes", "gauge", "Size of the catalog's report.txt.",
+               [("ossc_report_catalog_bytes", e["labels"], e["bytes"]) for e in entries])
+        servers = []
+        for e in entries:
+            if e["counts"] is not None:
+                for status, count in sorted(e["counts"].counts["status"].items()):
+                    servers.append(("ossc_report_catalog_servers", dict(e["labels"], status=status), count))
+        family("ossc_report_catalog_servers", "gauge", "Servers in the catalog's report by status.", servers)
+
+        self._histogram(family, "ossc_report_query_duration_seconds", "Wall time of the catalog queries of the last run.",
+                        DURATION_BUCKETS, [e["duration"] for e in queries if e["duration"] is not None])
+        self._histogram(family, "ossc_report_report_bytes", "Size of the reports of the queries run in the last run.",
+                        BYTES_BUCKETS, [e["bytes"] for e in queries])
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _histogram(family, name, help_text, buckets, values):
+        samples = [(f"{name}_bucket", {"le": _number(b)}, sum(1 for v in values if v <= b)) for b in buckets]
+        samples.append((f"{name}_bucket", {"le": "+Inf"}, len(values)))
+        samples.append((f"{name}_sum", None, round(sum(values), 3)))
+        samples.append((f"{name}_count", None, len(values)))
+        family(name, "histogram", help_text, samples)
+
+
+def write(path, text):
+    """Replace ``path`` atomically (node_exporter skips the temporary, non-.prom name)."""
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, path)
+    return path
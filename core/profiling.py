@@ -0,0 +1,181 @@
+"""Run the `openstack` child under cProfile or -X importtime and summarize the results."""
+import os
+import pstats
+import re
+import subprocess
+import sys
+import threading
+from collections import defaultdict
+from pathlib import Path
+
+PROFILE_MODES = ("cprofile", "importtime")
+
+# Runs a console script under cProfile, dumps stats to argv[1] and keeps the
+# script's exit code (`python -m cProfile` swallows SystemExit).
+_CPROFILE_BOOTSTRAP = """\
+import cProfile, os, runpy, sys
+out, script = sys.argv[1], sys.argv[2]
+sys.argv = sys.argv[2:]
+sys.path[0] = os.path.dirname(os.path.abspath(script))
+prof = cProfile.Profile()
+code = 0
+try:
+    prof.runcall(runpy.run_path, script, run_name="__main__")
+except SystemExit as e:
+    code = e.code
+finally:
+    prof.dump_stats(out)
+sys.exit(code)
+"""
+
+RE_IMPORTTIME = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+def artifact_name(mode: str) -> str:
+    return "profile.pstats" if mode == "cprofile" else "importtime.log"
+
+
+def child_python(openstack_exe: str) -> str:
+    """Interpreter that runs the `openstack` console script (from its shebang)."""
+    try:
+        with open(openstack_exe, "rb") as f:
+            first = f.readline().decode("utf-8", "replace").strip()
+    except OSError:
+        return sys.executable
+    if not first.startswith("#!"):
+        return sys.executable
+    parts = first[2:].split()
+    if parts and os.path.basename(parts[0]) == "env" and len(parts) > 1:
+        parts = parts[1:]
+    if parts and "python" in os.path.basename(parts[0]):
+        return parts[0]
+    return sys.executable
+
+
+def profiled_command(cmd, mode: str, artifact: Path):
+    """Wrap an `openstack ...` command line so the child runs under the profiler."""
+    python = child_python(cmd[0])
+    if mode == "cprofile":
+        return [python, "-c", _CPROFILE_BOOTSTRAP, str(artifact), cmd[0]] + list(cmd[1:])
+    if mode == "importtime":
+        return [python, "-X", "importtime", cmd[0]] + list(cmd[1:])
+    raise ValueError(f"Unknown profile mode: {mode}")
+
+
+def split_importtime(stderr: str):
+    """Separate -X importtime lines from the child's real stderr; return (log, rest)."""
+    log, rest = [], []
+    for line in (stderr or "").splitlines(keepends=True):
+        (log if line.startswith("import time:") else rest).append(line)
+    return "".join(log), "".join(rest)
+
+
+def _copy_lines(src, write):
+    for line in src:
+        write(line)
+
+
+def _fileno(stream):
+    try:
+        return stream.fileno()
+    except (AttributeError, OSError, ValueError):
+        return subprocess.PIPE
+
+
+def run_profiled(cmd, env, mode: str, artifact: Path) -> int:
+    """Run interactively (stdout and stderr inherited) and write the profile artifact.
+
+    When ``sys.stdout`` or ``sys.stderr`` has no file descriptor (replaced
+    in-process), the child's output is copied into it instead.
+    """
+    artifact.parent.mkdir(parents=True, exist_ok=True)
+    full = profiled_command(cmd, mode, artifact)
+    stdout = _fileno(sys.stdout)
+    stderr = subprocess.PIPE if mode == "importtime" else _fileno(sys.stderr)
+    sys.stdout.flush()
+    sys.stderr.flush()
+
+    log = open(artifact, "w", encoding="utf-8") if mode == "importtime" else None
+
+    def pump_stderr(line):
+        if line.startswith("import time:"):
+            log.write(line)
+        else:
+            sys.stderr.write(line)
+
+    proc = subprocess.Popen(full, env=env, stdout=stdout, stderr=stderr, text=True)
+    readers = []
+    if proc.stdout:
+        readers.append(threading.Thread(target=_copy_lines, args=(proc.stdout, sys.stdout.write), daemon=True))
+    if proc.stderr:
+        copy = pump_stderr if mode == "importtime" else sys.stderr.write
+        readers.append(threading.Thread(target=_copy_lines, args=(proc.stderr, copy), daemon=True))
+    try:
+        for reader in readers:
+            reader.start()
+        code = proc.wait()
+        for reader in readers:
+            reader.join()
+    finally:
+        for f in (proc.stdout, proc.stderr, log):
+            if f:
+                f.close()
+    return code
+
+
+def summarize_importtime(text: str, top: int = 20):
+    """Return (modules, packages) from an importtime log.
+
+    modules: top entries by cumulative import time as (module, self_us, cumulative_us)
+    packages: top-level packages by summed self time as (package, self_us, modules)
+    """
+    modules = []
+    packages = defaultdict(lambda: [0, 0])
+    for line in text.splitlines():
+        m = RE_IMPORTTIME.match(line)
+        if not m:
+            continue
+        self_us, cum_us, name = int(m.group(1)), int(m.group(2)), m.group(4)
+        modules.append((name, self_us, cum_us))
+        pkg = packages[name.split(".")[0]]
+        pkg[0] += self_us
+        pkg[1] += 1
+    modules.sort(key=lambda r: r[2], reverse=True)
+    pkg_rows = sorted(((k, v[0], v[1]) for k, v in packages.items()), key=lambda r: r[1], reverse=True)
+    return modules[:top], pkg_rows[:top]
+
+
+def summarize_pstats(path: Path, top: int = 20):
+    """Return top functions by cumulative time as (function, ncalls, tottime, cumtime)."""
+    stats = pstats.Stats(str(path))
+    rows = []
+    for (filename, lineno, func), (cc, nc, tt, ct, _) in stats.stats.items():
+        label = f"{func} ({filename}:{lineno})" if filename != "~" else func
+        rows.append((label, nc, tt, ct))
+    rows.sort(key=lambda r: r[3], reverse=True)
+    return rows[:top]
+
+
+def format_summary(path: Path, top: int = 20) -> str:
+    path = Path(path)
+    lines = []
+    with open(path, "rb") as f:
+        is_pstats = not f.read(64).startswith(b"import time:")
+    if is_pstats:
+        lines.append(f"Top {top} functions by cumulative time: {path}")
+        lines.append("%10s %10s %10s  %s" % ("ncalls", "tottime", "cumtime", "function"))
+        for label, nc, tt, ct in summarize_pstats(path, top):
+            lines.append("%10d %10.3f %10.3f  %s" % (nc, tt, ct, label))
+        return "\n".join(lines)
+
+    modules, packages = summarize_importtime(path.read_text(encoding="utf-8", errors="replace"), top)
+    lines.append(f"Top {top} modules by cumulative import time: {path}")
+    lines.append("%12s %12s  %s" % ("cumul_ms", "self_ms", "module"))
+    for name, self_us, cum_us in modules:
+        lines.append("%12.1f %12.1f  %s" % (cum_us / 1000, self_us / 1000, name))
+    lines.append("")
+    lines.append(f"Top {top} packages by total self import time:")
+    lines.append("%12s %8s  %s" % ("self_ms", "modules", "package"))
+    for name, self_us, count in packages:
+        lines.append("%12.1f %8d  %s" % (self_us / 1000, count, name))
+    return "\n".join(lines)
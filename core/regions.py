@@ -0,0 +1,73 @@
+"""Fan a catalog out over the regions in its Keystone service catalog.
+
+One password authentication per catalog yields a project-scoped token and the
+service catalog. Every region then gets an env that points openstackclient at
+that token (v3token) with ``OS_REGION_NAME`` set, so no region re-sends the
+password.
+"""
+from core import keystone
+
+
+def parse_regions(value):
+    """``None`` -> None, ``"all"`` -> "all", ``"r1,r2"`` -> ["r1", "r2"]."""
+    if value is None:
+        return None
+    value = value.strip()
+    if value.lower() == "all":
+        return "all"
+    regions = [r.strip() for r in value.split(",") if r.strip()]
+    if not regions:
+        raise ValueError("--regions needs 'all' or a comma-separated list of regions")
+    return list(dict.fromkeys(regions))
+
+
+def _interface(env) -> str:
+    value = (env.get("OS_INTERFACE") or env.get("OS_ENDPOINT_TYPE") or "public").lower()
+    return value[:-3] if value.endswith("url") else value
+
+
+def catalog_regions(catalog, service_type: str = "compute", interface: str = "public"):
+    """Regions that have a ``service_type`` endpoint on ``interface``, in catalog order."""
+    regions = []
+    for service in catalog or []:
+        if service.get("type") != service_type:
+            continue
+        for ep in service.get("endpoints", []):
+            region = ep.get("region_id") or ep.get("region")
+            if ep.get("interface") == interface and region and region not in regions:
+                regions.append(region)
+    return regions
+
+
+def endpoint_url(env: dict, catalog, service_type: str):
+    """URL of ``service_type`` on env's interface in OS_REGION_NAME (or the first region), else None."""
+    interface = _interface(env)
+    region = env.get("OS_REGION_NAME")
+    for service in catalog or []:
+        if service.get("type") != service_type:
+            continue
+        for ep in service.get("endpoints", []):
+            if ep.get("interface") != interface:
+                continue
+            if not region or region in (ep.get("region_id"), ep.get("region")):
+                return ep.get("url")
+    return None
+
+
+def region_envs(env: dict, regions, timeout: float = 30):
+    """Authenticate once and return [(region, env)] for the requested regions.
+
+    ``env`` is None for a requested region without a compute endpoint.
+    Raises keystone.KeystoneError when authentication fails.
+    """
+    token = keystone.authenticate(env, timeout=timeout)
+    available = catalog_regions(token["catalog"], interface=_interface(env))
+    result = []
+    for region in available if regions == "all" else regions:
+        if region not in available:
+            result.append((region, None))
+            continue
+        region_env = keystone.token_env(env, token["id"])
+        region_env["OS_REGION_NAME"] = region
+        result.append((region, region_env))
+    return result
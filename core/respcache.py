@@ -0,0 +1,154 @@
+"""Read-through cache for read-only proxied commands (`ossc --cache ...`).
+
+Only allowlisted commands are cached, and only their successful output, keyed
+by the catalog identity (its OS_* variables minus secrets) plus the exact
+argv. Any mutating command on a catalog (create, delete, set, ...) drops that
+catalog's cached responses, whether or not caching is enabled for the call.
+
+Layout: $XDG_CACHE_HOME/ossc/responses/<identity>/<argv hash>.bin, where a
+.bin file is a JSON header line followed by the raw stdout bytes.
+"""
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+# Command words -> TTL in seconds
+CACHEABLE = {
+    ("flavor", "list"): 3600,
+    ("flavor", "show"): 3600,
+    ("availability", "zone", "list"): 3600,
+    ("region", "list"): 3600,
+    ("image", "list"): 900,
+    ("image", "show"): 900,
+    ("network", "list"): 900,
+    ("network", "show"): 900,
+    ("subnet", "list"): 900,
+    ("keypair", "list"): 900,
+    ("security", "group", "list"): 300,
+    ("quota", "show"): 300,
+}
+MUTATING_VERBS = {
+    "create", "delete", "set", "unset", "add", "remove", "update", "import", "rebuild", "resize",
+    "migrate", "evacuate", "restore", "shelve", "unshelve", "lock", "unlock", "pause", "unpause",
+    "suspend", "resume", "start", "stop", "reboot", "rescue", "unrescue", "attach", "detach", "save",
+    "purge", "cleanup", "accept", "revert", "confirm", "abort",
+}
+# openstack global options that take no value
+GLOBAL_FLAGS = {"-v", "--verbose", "-q", "--quiet", "--debug", "--insecure", "--os-beta-command", "--timing"}
+# Verbs of commands that only read
+READ_VERBS = {"list", "show"}
+SECRET_VARS = {"OS_PASSWORD", "OS_TOKEN"}
+
+
+def cache_root() -> Path:
+    base = os.getenv("XDG_CACHE_HOME")
+    return (Path(base) if base else Path.home() / ".cache") / "ossc" / "responses"
+
+
+def command_words(argv):
+    """Leading words of an openstack command line (up to the first option)."""
+    words = []
+    for tok in argv:
+        if tok.startswith("-"):
+            break
+        words.append(tok)
+    return words
+
+
+def cache_ttl(argv):
+    """TTL for a cacheable command, else None (commands starting with options are never cached)."""
+    words = tuple(command_words(argv))
+    for n in (3, 2):
+        if words[:n] in CACHEABLE:
+            return CACHEABLE[words[:n]]
+    return None
+
+
+def skip_options(argv):
+    """``argv`` without its leading global options (``--os-region-name r``, ``--debug``, ...)."""
+    i = 0
+    while i < len(argv) and argv[i].startswith("-"):
+        tok = argv[i]
+        i += 1
+        if tok != "--" and "=" not in tok and tok not in GLOBAL_FLAGS:
+            i += 1  # its value
+    return argv[i:]
+
+
+def is_mutating(argv) -> bool:
+    rest = skip_options(argv)
+    # Past options whose arity was guessed, the noun may be gone too; a false positive only drops the cache
+    start = 1 if len(rest) == len(argv) else 0
+    return any(w in MUTATING_VERBS for w in command_words(rest)[start:4])
+
+
+def is_read_only(argv) -> bool:
+    """True only for commands known not to change anything: safe to run again.
+
+    That is a cacheable command, or ``<noun...> list|show`` with the verb as
+    the second or third word and no mutating verb before it. Commands
+    starting with options are never read-only.
+    """
+    if cache_ttl(argv):
+        return True
+    words = command_words(argv)
+    for i in (1, 2):
+        if i < len(words) and words[i] in READ_VERBS:
+            return not any(w in MUTATING_VERBS for w in words[1:i])
+    return False
+
+
+def identity(env) -> str:
+    items = sorted((k, v) for k, v in env.items() if k.startswith("OS_") and k not in SECRET_VARS)
+    return hashlib.sha256(json.dumps(items).encode("utf-8")).hexdigest()[:32]
+
+
+def enabled(args, env=None) -> bool:
+    if getattr(args, "no_cache", False):
+        return False
+    value = (env if env is not None else os.environ).get("OSSC_CACHE", "")
+    return bool(getattr(args, "cache", False)) or value.strip().lower() in ("1", "true", "yes", "on")
+
+
+class ResponseCache:
+    def __init__(self, root: Path = None):
+        self.root = Path(root) if root else cache_root()
+
+    def _path(self, env, argv) -> Path:
+        key = hashlib.sha256(json.dumps(list(argv)).encode("utf-8")).hexdigest()[:32]
+        return self.root / identity(env) / (key + ".bin")
+
+    def get(self, env, argv, now=None):
+        """Cached (stdout bytes, age seconds) or None if missing/expired."""
+        path = self._path(env, argv)
+        try:
+            with open(path, "rb") as f:
+                header = json.loads(f.readline().decode("utf-8"))
+                stdout = f.read()
+        except (OSError, ValueError):
+            return None
+        age = (now if now is not None else time.time()) - header.get("created", 0)
+        if header.get("argv") != list(argv) or not 0 <= age < header.get("ttl", 0):
+            return None
+        return stdout, age
+
+    def put(self, env, argv, ttl, stdout: bytes, now=None):
+        path = self._path(env, argv)
+        path.parent.mkdir(parents=True, exist_ok=True, mode=0o700)
+        header = {"argv": list(argv), "ttl": ttl, "created": now if now is not None else time.time()}
+        tmp = path.with_name(path.name + ".%d.tmp" % os.getpid())
+        with open(tmp, "wb") as f:
+            f.write(json.dumps(header).encode("utf-8") + b"\n")
+            f.write(stdout)
+        os.replace(tmp, path)
+
+    def invalidate(self, env) -> bool:
+        """Drop every cached response for env's catalog; True if anything was removed."""
+        path = self.root / identity(env)
+        if not path.exists():
+            return False
+        shutil.rmtree(path, ignore_errors=True)
+        return True
@@ -0,0 +1,61 @@
+"""Longest-expected-first ordering of report queries.
+
+``durations.json`` in ``--out`` keeps a smoothed duration per query (named
+after its report directory, e.g. ``prod/app`` or ``prod/app/RegionOne``).
+Queries are started longest first (LPT), so a slow catalog does not start
+last and hold up the end of the run. A query with no history is predicted
+to take the median of the known ones.
+"""
+import heapq
+import json
+import os
+import statistics
+from pathlib import Path
+
+DURATIONS_FILE = "durations.json"
+# Prediction when nothing is known yet, in seconds
+DEFAULT_DURATION = 30.0
+# Weight of the newest observation in the moving average
+ALPHA = 0.5
+
+
+class DurationHistory:
+    def __init__(self, out_root: Path):
+        self.path = Path(out_root) / DURATIONS_FILE
+        try:
+            self.durations = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self.durations = {}
+        known = [d["seconds"] for d in self.durations.values()]
+        self.default = statistics.median(known) if known else DEFAULT_DURATION
+
+    def predict(self, name: str) -> float:
+        entry = self.durations.get(name)
+        return entry["seconds"] if entry else self.default
+
+    def known(self, name: str) -> bool:
+        return name in self.durations
+
+    def update(self, name: str, seconds: float):
+        entry = self.durations.get(name)
+        if entry:
+            seconds = ALPHA * seconds + (1 - ALPHA) * entry["seconds"]
+        self.durations[name] = {"seconds": round(seconds, 3), "runs": (entry or {}).get("runs", 0) + 1}
+
+    def save(self):
+        tmp = self.path.with_name(DURATIONS_FILE + ".tmp")
+        tmp.write_text(json.dumps(self.durations, indent=1, sort_keys=True) + "\n", encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+def lpt_order(items, predict):
+    """Items sorted by predicted duration, longest first (stable for ties)."""
+    return sorted(items, key=predict, reverse=True)
+
+
+def makespan(durations, workers: int) -> float:
+    """Finish time of list-scheduling ``durations`` in order on ``workers`` identical workers."""
+    finish = [0.0] * max(1, workers)
+    for duration in durations:
+        heapq.heapreplace(finish, finish[0] + duration)
+    return max(finish)
@@ -0,0 +1,119 @@
+"""Split a report run across machines (`report --shard i/N`) and merge the parts.
+
+Every query group (catalogs that share one query) goes to the shard with
+the highest rendezvous hash of its query: the OS_* environment its members
+share, without secrets. The assignment depends only on that key and N, not
+on which catalogs are in the group: a catalog that joins or leaves a group
+does not move it, adding or removing a catalog never moves another group,
+and going from N to N+1 shards moves only about 1/(N+1) of them.
+
+Each shard writes ``shard.json`` at the top of its output tree, listing the
+reports it wrote. `report merge` checks that the shards form one complete
+1..N set, copies those report directories together and adds up their
+summaries.
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+from pathlib import Path
+
+from core.summary import ReportSummary, ServerCounts
+
+MANIFEST = "shard.json"
+MERGED_MANIFEST = "shards.json"
+RE_SHARD = re.compile(r"^\s*(\d+)\s*/\s*(\d+)\s*$")
+
+
+def parse_shard(value):
+    """``"2/8"`` -> (2, 8); shards are numbered from 1."""
+    m = RE_SHARD.match(value or "")
+    if not m or not 1 <= int(m.group(1)) <= int(m.group(2)):
+        raise ValueError(f"Invalid --shard '{value}': expected I/N with 1 <= I <= N")
+    return int(m.group(1)), int(m.group(2))
+
+
+def _weight(key: str, shard: int) -> int:
+    return int.from_bytes(hashlib.sha256(f"{shard}\0{key}".encode("utf-8")).digest()[:8], "big")
+
+
+def shard_of(key: str, count: int) -> int:
+    """Shard (1..count) that owns ``key`` (rendezvous / highest-random-weight hashing)."""
+    return max(range(1, count + 1), key=lambda s: _weight(key, s))
+
+
+def write_manifest(out_root: Path, index, count, exit_code, catalogs, generated):
+    """``catalogs`` is {"profile/catalog[/region]": exit code} for the reports this shard wrote."""
+    data = {
+        "shard": index,
+        "shards": count,
+        "exit_code": exit_code,
+        "generated": generated,
+        "catalogs": catalogs,
+    }
+    path = out_root / MANIFEST
+    tmp = out_root / (MANIFEST + ".tmp")
+    tmp.write_text(json.dumps(data, indent=2) + "\n", encoding="utf-8")
+    os.replace(tmp, path)
+    return path
+
+
+def read_manifests(dirs):
+    """Load and check the shard manifests; return them ordered by shard. Raises ValueError."""
+    manifests = []
+    for d in dirs:
+        path = Path(d) / MANIFEST
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            raise ValueError(f"Not a shard output (no readable {MANIFEST}): {d}") from e
+        data["dir"] = Path(d)
+        manifests.append(data)
+    counts = {m["shards"] for m in manifests}
+    if len(counts) != 1:
+        raise ValueError(f"Shards come from runs with different N: {', '.join(map(str, sorted(counts)))}")
+    count = counts.pop()
+    seen = {}
+    for m in manifests:
+        if m["shard"] in seen:
+            raise ValueError(f"Shard {m['shard']}/{count} given twice: {seen[m['shard']]} and {m['dir']}")
+        seen[m["shard"]] = m["dir"]
+    missing = sorted(set(range(1, count + 1)) - set(seen))
+    if missing:
+        raise ValueError(f"Missing shard(s) of {count}: {', '.join(map(str, missing))}")
+    return sorted(manifests, key=lambda m: m["shard"])
+
+
+def copy_tree(src: Path, dest: Path, owners: dict, catalogs):
+    """Copy the report directories ``catalogs`` lists from a shard's tree into dest.
+
+    ``owners`` maps copied paths to their shard dir. Anything else in the
+    shard's tree (leftovers of earlier runs, other catalogs) is not copied.
+    """
+    copied = 0
+    for name in sorted(catalogs):
+        for root, dirs, files in os.walk(src / name):
+            rel_root = Path(root).relative_to(src)
+            # Listed region reports of a catalog are copied on their own
+            dirs[:] = [d for d in dirs if (rel_root / d).as_posix() not in catalogs]
+            for file in files:
+                rel = rel_root / file
+                if rel in owners:
+                    raise ValueError(f"{rel.as_posix()} is in both {owners[rel]} and {src}")
+                owners[rel] = src
+                target = dest / rel
+                target.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(Path(root) / file, target)
+                copied += 1
+    return copied
+
+
+def merge_summaries(paths) -> ReportSummary:
+    """Add up summary.json files of disjoint shards."""
+    summary = ReportSummary()
+    for path in paths:
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        summary.total.merge(ServerCounts.from_dict(data.get("total", {})))
+        summary.catalogs.update(data.get("catalogs", {}))
+    return summary
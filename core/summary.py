@@ -0,0 +1,195 @@
+"""Aggregation of `server list` output into counters.
+
+Rows are parsed one at a time from the child's output (json, csv, table or
+yaml) and folded into counters; no list of rows is built. The report keeps
+only the counters per catalog, so a run's summary grows with the number of
+distinct statuses/flavors/images/zones. The report streams the child's output
+into report.txt and reads it back from there, so memory does not grow with
+the server count; --incremental and --executor fork still capture it.
+"""
+import csv
+import json
+import re
+from collections import Counter
+
+# Summary dimension -> `server list` column names that carry it
+DIMENSIONS = {
+    "status": ("Status",),
+    "flavor": ("Flavor", "Flavor Name"),
+    "image": ("Image", "Image Name"),
+    "availability_zone": ("Availability Zone",),
+}
+SUMMARY_FORMATS = ("json", "csv", "table", "yaml")
+RE_SPACE = re.compile(r"\s*")
+RE_SEPARATOR = re.compile(r"[\s,]*")
+
+
+def iter_json_rows(lines):
+    """Yield objects from a JSON array without loading the whole array.
+
+    Objects are decoded in place at an offset, so a long single-line array
+    (``--noindent``) is not copied once per object.
+    """
+    decoder = json.JSONDecoder()
+    buf, pos = "", 0
+    started = False
+    for line in lines:
+        buf = buf[pos:] + line  # keeps only the unparsed tail
+        pos = 0
+        while True:
+            pos = (RE_SEPARATOR if started else RE_SPACE).match(buf, pos).end()
+            if pos == len(buf):
+                break
+            if not started:
+                if buf[pos] != "[":
+                    return
+                started = True
+                pos += 1
+                continue
+            if buf[pos] == "]":
+                return
+            try:
+                obj, pos = decoder.raw_decode(buf, pos)
+            except ValueError:
+                break  # incomplete object; read more lines
+            if isinstance(obj, dict):
+                yield obj
+
+
+def iter_csv_rows(lines):
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if not header:
+        return
+    for row in reader:
+        if row:
+            yield dict(zip(header, row))
+
+
+def iter_table_rows(lines):
+    header = None
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if not line.startswith("|"):
+            continue
+        cells = [c.strip() for c in line.strip("|").split("|")]
+        if header is None:
+            header = cells
+            continue
+        # Continuation lines of multi-line cells leave the first column empty
+        if not cells[0]:
+            continue
+        yield dict(zip(header, cells))
+
+
+def iter_yaml_rows(lines):
+    row = None
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if line.startswith("- "):
+            if row is not None:
+                yield row
+            row = {}
+            line = "  " + line[2:]
+        if row is None or not line.startswith("  ") or line.startswith("   "):
+            continue
+        key, sep, value = line[2:].partition(":")
+        if sep:
+            value = value.strip()
+            if len(value) >= 2 and value[0] == value[-1] and value[0] in "'\"":
+                value = value[1:-1]
+            row[key.strip()] = value
+    if row is not None:
+        yield row
+
+
+def iter_rows(lines, fmt):
+    parsers = {"json": iter_json_rows, "csv": iter_csv_rows, "table": iter_table_rows, "yaml": iter_yaml_rows}
+    if fmt not in parsers:
+        raise ValueError(f"Cannot summarize '{fmt}' output; use one of: {', '.join(SUMMARY_FORMATS)}")
+    return parsers[fmt](lines)
+
+
+class ServerCounts:
+    """Counters for one scope (a catalog or the global total)."""
+
+    def __init__(self):
+        self.servers = 0
+        self.counts = {dim: Counter() for dim in DIMENSIONS}
+
+    def add(self, row):
+        self.servers += 1
+        for dim, columns in DIMENSIONS.items():
+            for col in columns:
+                if col in row:
+                    value = row[col]
+                    self.counts[dim][str(value) if value not in (None, "") else "(none)"] += 1
+                    break
+
+    @classmethod
+    def from_dict(cls, data):
+        """Inverse of to_dict()."""
+        counts = cls()
+        counts.servers = data.get("servers", 0)
+        for dim in DIMENSIONS:
+            counts.counts[dim].update(data.get(dim, {}))
+        return counts
+
+    def merge(self, other):
+        self.servers += other.servers
+        for dim in DIMENSIONS:
+            self.counts[dim].update(other.counts[dim])
+
+    def to_dict(self):
+        data = {"servers": self.servers}
+        for dim in DIMENSIONS:
+            data[dim] = dict(sorted(self.counts[dim].items(), key=lambda kv: (-kv[1], kv[0])))
+        return data
+
+
+class ReportSummary:
+    """Per-catalog and global server counts, filled as catalogs finish."""
+
+    def __init__(self):
+        self.total = ServerCounts()
+        self.catalogs = {}
+        # Predicted vs actual makespan of the run (see core.schedule), if known
+        self.schedule = None
+
+    def add_catalog(self, name, counts, exit_code, counted=True, note=None):
+        """Record a catalog; ``counted=False`` keeps it out of the global total
+        (used for catalogs that repeat another catalog's query)."""
+        entry = {"exit_code": exit_code}
+        if counts is not None:
+            entry.update(counts.to_dict())
+            if counted:
+                self.total.merge(counts)
+        if note:
+            entry["note"] = note
+        self.catalogs[name] = entry
+
+    def to_dict(self, generated):
+        data = {"generated": generated, "total": self.total.to_dict(), "catalogs": dict(sorted(self.catalogs.items()))}
+        if self.schedule:
+            data["schedule"] = self.schedule
+        return data
+
+    def to_markdown(self, generated):
+        lines = ["# Server summary", "", f"Generated: {generated}", ""]
+        lines.append(f"Total servers: {self.total.servers} across {len(self.catalogs)} catalog(s)")
+        if self.schedule:
+            lines.append(
+                f"Makespan: predicted {self.schedule['predicted_makespan']}s, actual {self.schedule['actual_makespan']}s "
+                f"({self.schedule['queries']} queries on {self.schedule['workers']} worker(s))"
+            )
+        for dim in DIMENSIONS:
+            counts = self.total.to_dict()[dim]
+            lines += ["", f"## By {dim.replace('_', ' ')}", "", f"| {dim} | servers |", "| --- | ---: |"]
+            lines += [f"| {k} | {v} |" for k, v in counts.items()] or ["| (no data) | 0 |"]
+        lines += ["", "## Per catalog", "", "| catalog | exit | servers | status |", "| --- | ---: | ---: | --- |"]
+        for name, entry in sorted(self.catalogs.items()):
+            status = ", ".join(f"{k}={v}" for k, v in entry.get("status", {}).items())
+            if entry.get("note"):
+                status = (status + " " if status else "") + f"({entry['note']})"
+            lines.append(f"| {name} | {entry['exit_code']} | {entry.get('servers', '-')} | {status} |")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,140 @@
+"""Wait for many servers to reach a status with one listing per poll (`ossc wait`).
+
+`openstack server show` in a loop, or `server create --wait`, polls Nova
+once per server. The waiter lists the catalog's servers once to take the
+targets' initial state, then polls ``GET /servers/detail?changes-since=``:
+one request per interval returns only the servers that changed, however
+many targets there are. The interval grows while nothing changes and drops
+back to --interval after a transition. ``changes-since`` is derived from the
+cloud's Date header and overlaps the previous window, so a skewed local
+clock loses no updates; servers seen twice simply show no transition.
+"""
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+
+from core.bulk import ComputeError
+
+# Final states unless waited for
+FAILED = {"ERROR"}
+GONE = {"DELETED", "SOFT_DELETED"}
+# Interval growth per poll without a transition
+BACKOFF = 1.5
+# Seconds each changes-since window reaches back into the previous one
+OVERLAP = 5
+
+
+def server_state(server) -> str:
+    """``ACTIVE``, or ``BUILD(spawning)`` while a task is running."""
+    status = (server.get("status") or "UNKNOWN").upper()
+    task = server.get("OS-EXT-STS:task_state")
+    return f"{status}({task})" if task else status
+
+
+def _status(state: str) -> str:
+    return state.split("(", 1)[0]
+
+
+def _cloud_time(date, elapsed):
+    """Cloud time when a listing that took ``elapsed`` seconds started."""
+    try:
+        now = parsedate_to_datetime(date) if date else None
+    except (TypeError, ValueError):
+        now = None
+    if now is None or now.tzinfo is None:
+        now = datetime.now(timezone.utc)
+    return now - timedelta(seconds=elapsed)
+
+
+class Waiter:
+    """Track target servers of one ComputeSession until they reach ``wanted`` statuses."""
+
+    def __init__(self, session, wanted, interval=2.0, max_interval=30.0, clock=time.monotonic, sleep=time.sleep):
+        self.session = session
+        self.wanted = {w.upper() for w in wanted}
+        self.interval = interval
+        self.max_interval = max(interval, max_interval)
+        self.clock = clock
+        self.sleep = sleep
+        self.states = {}
+        self.names = {}
+        self.polls = 0
+        self.since = None
+
+    def _list(self, filters):
+        started = self.clock()
+        servers = list(self.session.list_servers(filters, detail=True))
+        self.polls += 1
+        since = _cloud_time(self.session.date, self.clock() - started) - timedelta(seconds=OVERLAP)
+        self.since = since.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        return servers
+
+    def listing(self, filters=()):
+        """The first, full listing (narrowed by Nova ``filters``); starts the changes-since window."""
+        return self._list(list(filters))
+
+    def track(self, server_ids, servers):
+        """Start tracking ``server_ids`` from ``servers``; IDs not listed count as deleted."""
+        by_id = {s["id"]: s for s in servers}
+        for server_id in server_ids:
+            server = by_id.get(server_id)
+            self.states[server_id] = server_state(server) if server else "DELETED"
+            self.names[server_id] = (server or {}).get("name") or ""
+
+    def outcome(self, server_id):
+        """"ok", "failed", or None while the target is still pending."""
+        status = _status(self.states[server_id])
+        if status in self.wanted:
+            return "ok"
+        if status in FAILED or status in GONE:
+            return "failed"
+        return None
+
+    def pending(self) -> list:
+        return [sid for sid in self.states if self.outcome(sid) is None]
+
+    def failed(self) -> list:
+        return [sid for sid in self.states if self.outcome(sid) == "failed"]
+
+    def poll(self, on_change=None) -> int:
+        """One changes-since listing; report and count the transitions of pending targets."""
+        moved = 0
+        for server in self._list([("changes-since", self.since)]):
+            server_id = server["id"]
+            if server_id not in self.states or self.outcome(server_id) is not None:
+                continue
+            old, new = self.states[server_id], server_state(server)
+            if new != old:
+                self.states[server_id] = new
+                moved += 1
+                if on_change:
+                    on_change(server_id, old, new)
+        return moved
+
+    def run(self, timeout, on_change=None, on_error=None, fail_fast=False) -> bool:
+        """Poll until no target is pending; False if ``timeout`` seconds passed first.
+
+        Transient errors (429, 5xx, dropped connections) back off and poll
+        again, honouring Retry-After; others raise ComputeError.
+        """
+        deadline = self.clock() + timeout
+        delay = self.interval
+        while self.pending():
+            if fail_fast and self.failed():
+                return True
+            remaining = deadline - self.clock()
+            if remaining <= 0:
+                return False
+            self.sleep(min(delay * random.uniform(1.0, 1.1), remaining))
+            try:
+                moved = self.poll(on_change)
+            except ComputeError as e:
+                if not e.transient:
+                    raise
+                if on_error:
+                    on_error(e)
+                delay = max(min(delay * 2, self.max_interval), e.retry_after or 0)
+                continue
+            delay = self.interval if moved else min(delay * BACKOFF, self.max_interval)
+        return True
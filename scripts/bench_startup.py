@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Startup benchmark for the OSSC container image.
+
+Times fresh `docker run --rm` invocations, the way ossc-docker.sh runs them:
+
+  help         ossc --help (wrapper only)
+  server-list  openstack server list against a closed local port, so the
+               full client/plugin startup runs but no cloud is contacted
+
+Usage: scripts/bench_startup.py [--image ossc:latest] [-n 10] [--max-median-ms N]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+STUB_ENV = {
+    "OS_AUTH_URL": "http://127.0.0.1:9/v3",
+    "OS_USERNAME": "bench",
+    "OS_PASSWORD": "bench",
+    "OS_PROJECT_ID": "bench",
+    "OS_USER_DOMAIN_NAME": "Default",
+}
+
+
+def scenarios(image):
+    base = ["docker", "run", "--rm", "--user", "65534:65534", "-e", "HOME=/tmp", "--network", "none"]
+    stub = [tok for k, v in STUB_ENV.items() for tok in ("-e", "%s=%s" % (k, v))]
+    return {
+        "help": base + [image, "--help"],
+        "server-list": base + stub + ["--entrypoint", "openstack", image, "server", "list"],
+    }
+
+
+def time_once(cmd):
+    started = time.monotonic()
+    subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return (time.monotonic() - started) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure container startup latency")
+    parser.add_argument("--image", default="ossc:latest")
+    parser.add_argument("-n", "--runs", type=int, default=10, help="Timed runs per scenario")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed runs per scenario")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    parser.add_argument("--max-median-ms", type=float, help="Exit 1 if any scenario median exceeds this")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name, cmd in scenarios(args.image).items():
+        for _ in range(args.warmup):
+            time_once(cmd)
+        samples = sorted(time_once(cmd) for _ in range(args.runs))
+        results[name] = {
+            "runs": len(samples),
+            "min_ms": round(samples[0], 1),
+            "median_ms": round(statistics.median(samples), 1),
+            "p90_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.9))], 1),
+            "max_ms": round(samples[-1], 1),
+        }
+
+    if args.json:
+        print(json.dumps({"image": args.image, "results": results}, indent=2))
+    else:
+        print("image: %s" % args.image)
+        print("%-12s %6s %9s %9s %9s %9s" % ("scenario", "runs", "min_ms", "median_ms", "p90_ms", "max_ms"))
+        for name, r in results.items():
+            print("%-12s %6d %9.1f %9.1f %9.1f %9.1f" % (name, r["runs"], r["min_ms"], r["median_ms"], r["p90_ms"], r["max_ms"]))
+
+    if args.max_median_ms is not None:
+        slow = [n for n, r in results.items() if r["median_ms"] > args.max_median_ms]
+        if slow:
+            print("Median above %.0f ms: %s" % (args.max_median_ms, ", ".join(slow)), file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
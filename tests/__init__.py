@@ -1,2 +1,6 @@
 # Make tests a package for unittest discovery
+import os
 
+# Keep the suite from appending to the user's real latency log; tests that
+# exercise it point OSSC_LATENCY_LOG at a temporary file.
+os.environ.setdefault("OSSC_LATENCY_LOG", "off")
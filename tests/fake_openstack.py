@@ -0,0 +1,157 @@
+"""Stand-in for the `openstack` CLI that talks to tests.fakeos over real HTTP.
+
+It implements just `server list` (json/csv/value/table/yaml, --long, -c,
+--status/--name/--changes-since) with password or v3token auth from OS_*
+variables, so end-to-end tests exercise real processes, auth and payloads
+when python-openstackclient is not installed. ``install(bin_dir)`` writes an
+executable `openstack` shim that runs this module.
+"""
+import csv
+import io
+import json
+import os
+import sys
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from core import keystone  # noqa: E402
+
+
+def install(bin_dir: Path) -> Path:
+    bin_dir = Path(bin_dir)
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    exe = bin_dir / "openstack"
+    exe.write_text(
+        "#!%s\nimport runpy, sys\nsys.argv[0] = %r\nrunpy.run_path(%r, run_name='__main__')\n"
+        % (sys.executable, str(exe), __file__),
+        encoding="utf-8",
+    )
+    exe.chmod(0o755)
+    return exe
+
+
+def _endpoint(catalog, service_type, region, interface):
+    for service in catalog:
+        if service.get("type") != service_type:
+            continue
+        for ep in service.get("endpoints", []):
+            if ep.get("interface") == interface and (not region or ep.get("region") == region):
+                return ep["url"].rstrip("/")
+    raise SystemExit("public endpoint for %s service in %s region not found" % (service_type, region or "any"))
+
+
+def _get(url, token):
+    req = urllib.request.Request(url, headers={"X-Auth-Token": token, "Accept": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=60) as resp:
+            return json.loads(resp.read().decode("utf-8"))
+    except urllib.error.HTTPError as e:
+        raise SystemExit("%s (HTTP %s)" % (keystone._error_message(e.read()), e.code))
+
+
+def _parse(argv):
+    opts = {"format": "table", "long": False, "columns": [], "query": {}}
+    it = iter(argv)
+    for arg in it:
+        if arg in ("-f", "--format"):
+            opts["format"] = next(it)
+        elif arg == "--long":
+            opts["long"] = True
+        elif arg in ("-c", "--column"):
+            opts["columns"].append(next(it))
+        elif arg in ("--status", "--name", "--changes-since"):
+            opts["query"][arg[2:]] = next(it)
+        elif arg in ("--no-name-lookup", "-n"):
+            pass
+        else:
+            raise SystemExit("unrecognized arguments: %s" % arg)
+    return opts
+
+
+def _rows(servers, long):
+    rows = []
+    for s in servers:
+        networks = "; ".join(
+            "%s=%s" % (net, ", ".join(a["addr"] for a in addrs)) for net, addrs in sorted(s.get("addresses", {}).items())
+        )
+        image = s.get("image") or {}
+        row = {
+            "ID": s["id"],
+            "Name": s["name"],
+            "Status": s["status"],
+            "Networks": networks,
+            "Image": image.get("id", "N/A (booted from volume)") if image else "N/A (booted from volume)",
+            "Flavor": s.get("flavor", {}).get("original_name", ""),
+        }
+        if long:
+            row["Availability Zone"] = s.get("OS-EXT-AZ:availability_zone", "")
+            row["Host"] = s.get("OS-EXT-SRV-ATTR:host", "")
+        rows.append(row)
+    return rows
+
+
+def _render(rows, headers, fmt):
+    if fmt == "json":
+        return json.dumps([{h: r[h] for h in headers} for r in rows], indent=2) + "\n"
+    if fmt == "csv":
+        buf = io.StringIO()
+        writer = csv.writer(buf, quoting=csv.QUOTE_NONNUMERIC, lineterminator="\n")
+        writer.writerow(headers)
+        writer.writerows([[r[h] for h in headers] for r in rows])
+        return buf.getvalue()
+    if fmt == "value":
+        return "".join(" ".join(str(r[h]) for h in headers) + "\n" for r in rows)
+    if fmt == "yaml":
+        out = []
+        for r in rows:
+            for i, h in enumerate(headers):
+                out.append("%s%s: %s" % ("- " if i == 0 else "  ", h, json.dumps(r[h])))
+        return "\n".join(out) + ("\n" if out else "[]\n")
+    widths = [max([len(h)] + [len(str(r[h])) for r in rows]) for h in headers]
+    sep = "+" + "+".join("-" * (w + 2) for w in widths) + "+"
+    lines = [sep, "| " + " | ".join(h.ljust(w) for h, w in zip(headers, widths)) + " |", sep]
+    lines += ["| " + " | ".join(str(r[h]).ljust(w) for h, w in zip(headers, widths)) + " |" for r in rows]
+    return "\n".join(lines + [sep]) + "\n" if rows else ""
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:2] != ["server", "list"]:
+        print("fake openstack supports only 'server list'", file=sys.stderr)
+        return 2
+    opts = _parse(argv[2:])
+    env = os.environ
+    try:
+        if env.get("OS_AUTH_TYPE") == "v3token":
+            token = keystone.rescope(env, env["OS_TOKEN"])
+        else:
+            token = keystone.authenticate(env)
+    except keystone.KeystoneError as e:
+        print(e, file=sys.stderr)
+        return 1
+    base = _endpoint(token["catalog"], "compute", env.get("OS_REGION_NAME"), env.get("OS_INTERFACE", "public"))
+    query = "&".join("%s=%s" % (k, urllib.request.quote(v)) for k, v in opts["query"].items())
+    url = base + "/servers/detail" + ("?" + query if query else "")
+    servers = []
+    while url:
+        page = _get(url, token["id"])
+        servers.extend(page.get("servers", []))
+        url = next((link["href"] for link in page.get("servers_links", []) if link.get("rel") == "next"), None)
+    rows = _rows(servers, opts["long"])
+    headers = opts["columns"] or (list(rows[0]) if rows else ["ID", "Name", "Status", "Networks", "Image", "Flavor"])
+    sys.stdout.write(_render(rows, headers, opts["format"]))
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except SystemExit as e:
+        if isinstance(e.code, str):
+            print(e.code, file=sys.stderr)
+            sys.exit(1)
+        raise
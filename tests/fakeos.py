@@ -0,0 +1,505 @@
+"""Hermetic fake OpenStack (Keystone v3 + Nova v2.1) for end-to-end tests.
+
+Usage:
+    with FakeOpenStack(servers_per_project=50, latency={"compute": 0.02}) as cloud:
+        env = cloud.catalog_env("proj-001")   # OS_* variables for a catalog
+        ...
+
+Everything is served from one local ThreadingHTTPServer:
+    /identity/...                 Keystone v3 (password and token auth, scoping)
+    /compute/<region>/v2.1/...    Nova (servers, flavors, version discovery)
+    /image/<region>/v2/...        Glance (image create/show/delete, data upload)
+
+Knobs (float for every service, or a dict keyed by "identity"/"compute"/"image"):
+    latency        seconds added to each request
+    error_rate     probability of a 500 response
+    throttle_rate  probability of a 429 response with Retry-After
+    payload_bytes  extra metadata per server, to simulate large payloads
+
+``requests`` and ``bytes_sent`` count requests and response bytes per service;
+``images`` holds the image records (uploaded data is hashed, not kept).
+The real openstackclient works against it via OS_AUTH_URL=cloud.auth_url.
+"""
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlencode, urlparse
+
+STATUSES = ("ACTIVE", "ACTIVE", "ACTIVE", "SHUTOFF", "ERROR", "BUILD")
+FLAVORS = {
+    "f-small": {"name": "m1.small", "vcpus": 1, "ram": 2048, "disk": 20},
+    "f-medium": {"name": "m1.medium", "vcpus": 2, "ram": 4096, "disk": 40},
+    "f-large": {"name": "m1.large", "vcpus": 4, "ram": 8192, "disk": 80},
+}
+IMAGES = {"img-ubuntu": "ubuntu-22.04", "img-debian": "debian-12"}
+BASE_TIME = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def _iso(dt):
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _parse_time(value):
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 512  # listen backlog; hundreds of clients connect at once
+
+
+class FakeOpenStack:
+    def __init__(
+        self,
+        servers_per_project=5,
+        regions=("RegionOne",),
+        users=None,
+        latency=0.0,
+        error_rate=0.0,
+        throttle_rate=0.0,
+        payload_bytes=0,
+        seed=0,
+    ):
+        self.servers_per_project = servers_per_project
+        self.regions = tuple(regions)
+        self.users = dict(users or {"admin": "secret"})
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.payload_bytes = payload_bytes
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._tokens = {}
+        self._servers = {}
+        self.images = {}
+        self.requests = {}
+        self.bytes_sent = {}
+        self._server = None
+        self._thread = None
+
+    # -- lifecycle -----------------------------------------------------------
+
+    def start(self):
+        handler = type("Handler", (_Handler,), {"cloud": self})
+        self._server = _Server(("127.0.0.1", 0), handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def base_url(self):
+        return "http://127.0.0.1:%d" % self._server.server_address[1]
+
+    @property
+    def auth_url(self):
+        return self.base_url + "/identity/v3"
+
+    def catalog_env(self, project_id, user="admin", region=None):
+        env = {
+            "OS_AUTH_URL": self.auth_url,
+            "OS_USERNAME": user,
+            "OS_PASSWORD": self.users.get(user, ""),
+            "OS_USER_DOMAIN_NAME": "Default",
+            "OS_PROJECT_ID": project_id,
+            "OS_IDENTITY_API_VERSION": "3",
+            "OS_INTERFACE": "public",
+        }
+        if region or len(self.regions) == 1:
+            env["OS_REGION_NAME"] = region or self.regions[0]
+        return env
+
+    # -- data ----------------------------------------------------------------
+
+    def servers(self, project_id, region=None):
+        """Server map for a project/region, generated deterministically on first use."""
+        region = region or self.regions[0]
+        key = (project_id, region)
+        with self._lock:
+            if key not in self._servers:
+                count = self.servers_per_project
+                if callable(count):
+                    count = count(project_id)
+                self._servers[key] = {s["id"]: s for s in (self._make_server(project_id, region, i) for i in range(count))}
+            return self._servers[key]
+
+    def _make_server(self, project_id, region, i):
+        sid = str(uuid.uuid5(uuid.NAMESPACE_URL, "%s/%s/%d" % (project_id, region, i)))
+        h = int(sid[:8], 16)
+        flavor_id = sorted(FLAVORS)[h % len(FLAVORS)]
+        image_id = sorted(IMAGES)[h % len(IMAGES)] if h % 5 else ""
+        server = {
+            "id": sid,
+            "name": "%s-vm-%03d" % (project_id, i),
+            "status": STATUSES[h % len(STATUSES)],
+            "tenant_id": project_id,
+            "user_id": "u-admin",
+            "created": _iso(BASE_TIME),
+            "updated": _iso(BASE_TIME),
+            "flavor": {"id": flavor_id, "original_name": FLAVORS[flavor_id]["name"]},
+            "image": {"id": image_id} if image_id else "",
+            "addresses": {"net": [{"addr": "10.%d.%d.%d" % (h % 250, (h >> 8) % 250, i % 250), "version": 4}]},
+            "OS-EXT-AZ:availability_zone": "az%d" % (h % 3 + 1),
+            "OS-EXT-STS:power_state": 1,
+            "OS-EXT-STS:task_state": None,
+            "OS-EXT-STS:vm_state": "active",
+            "metadata": {"pad": "x" * self.payload_bytes} if self.payload_bytes else {},
+            "key_name": None,
+            "security_groups": [{"name": "default"}],
+            "tags": [],
+            "links": [],
+        }
+        return server
+
+    def set_status(self, project_id, server_id, status, region=None):
+        servers = self.servers(project_id, region)
+        with self._lock:
+            servers[server_id]["status"] = status
+            servers[server_id]["updated"] = _iso(datetime.now(timezone.utc))
+
+    def delete_server(self, project_id, server_id, region=None):
+        self.set_status(project_id, server_id, "DELETED", region)
+
+    def add_server(self, project_id, name, status="BUILD", region=None):
+        servers = self.servers(project_id, region)
+        server = self._make_server(project_id, region or self.regions[0], len(servers) + 10000)
+        server.update(name=name, status=status, updated=_iso(datetime.now(timezone.utc)))
+        with self._lock:
+            servers[server["id"]] = server
+        return server
+
+    # -- helpers for the handler ---------------------------------------------
+
+    def _knob(self, value, service):
+        if isinstance(value, dict):
+            return value.get(service, 0)
+        return value or 0
+
+    def _count(self, service, nbytes=None):
+        with self._lock:
+            if nbytes is None:
+                self.requests[service] = self.requests.get(service, 0) + 1
+            else:
+                self.bytes_sent[service] = self.bytes_sent.get(service, 0) + nbytes
+
+    def _roll(self, rate):
+        with self._lock:
+            return rate and self._rng.random() < rate
+
+    def issue_token(self, user, project_id):
+        token = uuid.uuid4().hex
+        with self._lock:
+            self._tokens[token] = {"user": user, "project_id": project_id}
+        return token
+
+    def token_info(self, token):
+        with self._lock:
+            return self._tokens.get(token)
+
+    def catalog(self):
+        base = self.base_url
+        endpoints = [
+            {"id": uuid.uuid4().hex, "interface": iface, "region": r, "region_id": r,
+             "url": "%s/compute/%s/v2.1" % (base, r)}
+            for r in self.regions for iface in ("public", "internal")
+        ]
+        image = [
+            {"id": uuid.uuid4().hex, "interface": iface, "region": r, "region_id": r,
+             "url": "%s/image/%s" % (base, r)}
+            for r in self.regions for iface in ("public", "internal")
+        ]
+        identity = [
+            {"id": uuid.uuid4().hex, "interface": iface, "region": r, "region_id": r, "url": base + "/identity"}
+            for r in self.regions for iface in ("public", "internal")
+        ]
+        return [
+            {"type": "identity", "name": "keystone", "id": "svc-identity", "endpoints": identity},
+            {"type": "compute", "name": "nova", "id": "svc-compute", "endpoints": endpoints},
+            {"type": "image", "name": "glance", "id": "svc-image", "endpoints": image},
+        ]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    cloud = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    # -- plumbing ------------------------------------------------------------
+
+    def _send(self, status, body=None, headers=None):
+        data = b"" if body is None else json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        if data:
+            self.wfile.write(data)
+        self.cloud._count(self._service, len(data))
+
+    def _error(self, status, message):
+        self._send(status, {"error": {"code": status, "message": message}})
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}") if length else {}
+
+    def _dispatch(self, method):
+        url = urlparse(self.path)
+        parts = [unquote(p) for p in url.path.split("/") if p]
+        service = self._service = parts[0] if parts else ""
+        # Image data is streamed by its handler; only JSON bodies are read up front
+        is_json = "json" in (self.headers.get("Content-Type") or "")
+        self._body_cache = self._body() if method in ("POST", "PUT") and is_json else {}
+        if method == "PUT" and not is_json:
+            self.close_connection = True  # in case we answer without reading the data
+        cloud = self.cloud
+        cloud._count(service)
+        delay = cloud._knob(cloud.latency, service)
+        if delay:
+            time.sleep(delay)
+        discovery = len(parts) <= (1 if service == "identity" else 3)
+        if not discovery:
+            if cloud._roll(cloud._knob(cloud.throttle_rate, service)):
+                return self._send(429, {"error": {"code": 429, "message": "Too many requests"}}, {"Retry-After": "1"})
+            if cloud._roll(cloud._knob(cloud.error_rate, service)):
+                return self._error(500, "Injected failure")
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if service == "identity":
+            return self._identity(method, parts[1:], query)
+        if service == "compute" and len(parts) >= 2:
+            return self._compute(method, parts[1], parts[2:], query)
+        if service == "image" and len(parts) >= 2:
+            return self._image(method, parts[1], parts[2:])
+        return self._error(404, "Not found: %s" % url.path)
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    # -- keystone ------------------------------------------------------------
+
+    def _identity_version(self):
+        return {
+            "id": "v3.14",
+            "status": "stable",
+            "updated": "2020-04-07T00:00:00Z",
+            "links": [{"rel": "self", "href": self.cloud.base_url + "/identity/v3/"}],
+            "media-types": [{"base": "application/json", "type": "application/vnd.openstack.identity-v3+json"}],
+        }
+
+    def _identity(self, method, parts, query):
+        if method == "GET" and not parts:
+            return self._send(300, {"versions": {"values": [self._identity_version()]}})
+        if method == "GET" and parts == ["v3"]:
+            return self._send(200, {"version": self._identity_version()})
+        if method == "POST" and parts == ["v3", "auth", "tokens"]:
+            return self._issue_token(self._body_cache.get("auth", {}), "nocatalog" not in query)
+        return self._error(404, "Not found")
+
+    def _issue_token(self, auth, with_catalog):
+        cloud = self.cloud
+        identity = auth.get("identity", {})
+        methods = identity.get("methods", [])
+        if "password" in methods:
+            user = identity.get("password", {}).get("user", {})
+            name = user.get("name") or user.get("id")
+            if cloud.users.get(name) != user.get("password"):
+                return self._error(401, "The request you have made requires authentication.")
+        elif "token" in methods:
+            info = cloud.token_info(identity.get("token", {}).get("id"))
+            if not info:
+                return self._error(404, "Could not find token.")
+            name = info["user"]
+        else:
+            return self._error(400, "Unsupported auth method")
+        project = (auth.get("scope") or {}).get("project")
+        project_id = (project or {}).get("id") or (project or {}).get("name")
+        token_id = cloud.issue_token(name, project_id)
+        expires = datetime.now(timezone.utc) + timedelta(hours=1)
+        token = {
+            "methods": methods,
+            "expires_at": expires.strftime("%Y-%m-%dT%H:%M:%S.000000Z"),
+            "issued_at": _iso(datetime.now(timezone.utc)),
+            "user": {"id": "u-" + name, "name": name, "domain": {"id": "default", "name": "Default"}},
+            "audit_ids": [token_id[:8]],
+        }
+        if project_id:
+            token["project"] = {"id": project_id, "name": project_id, "domain": {"id": "default", "name": "Default"}}
+            token["roles"] = [{"id": "r-member", "name": "member"}]
+            if with_catalog:
+                token["catalog"] = cloud.catalog()
+        self._send(201, {"token": token}, {"X-Subject-Token": token_id})
+
+    # -- nova ----------------------------------------------------------------
+
+    def _compute_version(self, region):
+        return {
+            "id": "v2.1",
+            "status": "CURRENT",
+            "version": "2.96",
+            "min_version": "2.1",
+            "updated": "2013-07-23T11:33:21Z",
+            "links": [{"rel": "self", "href": "%s/compute/%s/v2.1/" % (self.cloud.base_url, region)}],
+        }
+
+    def _compute(self, method, region, parts, query):
+        if region not in self.cloud.regions:
+            return self._error(404, "Unknown region")
+        if not parts:
+            return self._send(200, {"versions": [self._compute_version(region)]})
+        if parts == ["v2.1"]:
+            return self._send(200, {"version": self._compute_version(region)})
+        info = self.cloud.token_info(self.headers.get("X-Auth-Token"))
+        if not info or not info.get("project_id"):
+            return self._error(401, "Authentication required")
+        project_id = info["project_id"]
+        rest = parts[1:]
+        if method == "GET" and rest in (["servers"], ["servers", "detail"]):
+            return self._list_servers(region, project_id, query, detail=rest[-1] == "detail")
+        if rest[:1] == ["servers"] and len(rest) >= 2:
+            servers = self.cloud.servers(project_id, region)
+            server = servers.get(rest[1])
+            if not server or server["status"] == "DELETED":
+                return self._error(404, "Instance %s could not be found." % rest[1])
+            if method == "GET" and len(rest) == 2:
+                return self._send(200, {"server": server})
+            if method == "DELETE" and len(rest) == 2:
+                self.cloud.delete_server(project_id, server["id"], region)
+                return self._send(204)
+            if method == "POST" and rest[2:] == ["action"]:
+                return self._server_action(project_id, region, server, self._body_cache)
+            if method == "PUT" and len(rest) == 4 and rest[2] == "tags":
+                with self.cloud._lock:
+                    if rest[3] not in server["tags"]:
+                        server["tags"].append(rest[3])
+                return self._send(201)
+        if method == "GET" and rest[:1] == ["flavors"]:
+            flavors = [dict(FLAVORS[f], id=f, links=[]) for f in sorted(FLAVORS)]
+            if len(rest) == 2 and rest[1] == "detail":
+                return self._send(200, {"flavors": flavors})
+            if len(rest) == 2:
+                match = [f for f in flavors if f["id"] == rest[1]]
+                return self._send(200, {"flavor": match[0]}) if match else self._error(404, "Flavor not found")
+            return self._send(200, {"flavors": [{"id": f["id"], "name": f["name"], "links": []} for f in flavors]})
+        return self._error(404, "Not found")
+
+    def _server_action(self, project_id, region, server, body):
+        transitions = {"os-stop": "SHUTOFF", "os-start": "ACTIVE", "reboot": "ACTIVE"}
+        for action, status in transitions.items():
+            if action in body:
+                self.cloud.set_status(project_id, server["id"], status, region)
+                return self._send(202)
+        for action in ("lock", "unlock"):
+            if action in body:
+                server["locked"] = action == "lock"
+                return self._send(202)
+        return self._error(400, "Unsupported action")
+
+    # -- glance ----------------------------------------------------------------
+
+    def _image(self, method, region, parts):
+        if region not in self.cloud.regions:
+            return self._error(404, "Unknown region")
+        if not parts:
+            version = {"id": "v2.16", "status": "CURRENT",
+                       "links": [{"rel": "self", "href": "%s/image/%s/v2/" % (self.cloud.base_url, region)}]}
+            return self._send(200, {"versions": [version]})
+        info = self.cloud.token_info(self.headers.get("X-Auth-Token"))
+        if not info or not info.get("project_id"):
+            return self._error(401, "Authentication required")
+        rest = parts[1:] if parts[0] == "v2" else None
+        images = self.cloud.images
+        if method == "POST" and rest == ["images"]:
+            body = self._body_cache
+            now = _iso(datetime.now(timezone.utc))
+            image = dict(body, id=str(uuid.uuid4()), status="queued", owner=info["project_id"],
+                         visibility=body.get("visibility", "shared"), size=None, checksum=None,
+                         os_hash_algo=None, os_hash_value=None, created_at=now, updated_at=now)
+            with self.cloud._lock:
+                images[image["id"]] = image
+            return self._send(201, image)
+        image = images.get(rest[1]) if rest and len(rest) >= 2 and rest[0] == "images" else None
+        if image is None:
+            return self._error(404, "No image found")
+        if method == "GET" and len(rest) == 2:
+            return self._send(200, image)
+        if method == "DELETE" and len(rest) == 2:
+            with self.cloud._lock:
+                images.pop(image["id"], None)
+            return self._send(204)
+        if method == "PUT" and rest[2:] == ["file"]:
+            return self._upload(image)
+        return self._error(404, "Not found")
+
+    def _upload(self, image):
+        if image["status"] not in ("queued", "saving"):
+            return self._error(409, "Image status transition from %s to saving is not allowed" % image["status"])
+        remaining = int(self.headers.get("Content-Length") or 0)
+        md5, sha512, size = hashlib.md5(), hashlib.sha512(), 0
+        image["status"] = "saving"
+        while remaining:
+            chunk = self.rfile.read(min(remaining, 1 << 20))
+            if not chunk:
+                image["status"] = "queued"  # client went away; Glance reverts to queued
+                return
+            md5.update(chunk)
+            sha512.update(chunk)
+            size += len(chunk)
+            remaining -= len(chunk)
+        self.close_connection = False
+        image.update(status="active", size=size, checksum=md5.hexdigest(), os_hash_algo="sha512",
+                     os_hash_value=sha512.hexdigest(), updated_at=_iso(datetime.now(timezone.utc)))
+        self._send(204)
+
+    def _list_servers(self, region, project_id, query, detail):
+        servers = list(self.cloud.servers(project_id, region).values())
+        since = query.get("changes-since") or query.get("changes_since")
+        if since:
+            cutoff = _parse_time(since)
+            servers = [s for s in servers if _parse_time(s["updated"]) >= cutoff]
+        else:
+            servers = [s for s in servers if s["status"] != "DELETED"]
+        if query.get("status"):
+            servers = [s for s in servers if s["status"] == query["status"].upper()]
+        if query.get("name"):
+            servers = [s for s in servers if query["name"].lstrip("^") in s["name"]]
+        servers.sort(key=lambda s: s["id"])
+        if query.get("marker"):
+            servers = [s for s in servers if s["id"] > query["marker"]]
+        limit = int(query.get("limit") or 1000)
+        page = servers[:limit]
+        body = {"servers": page if detail else [{"id": s["id"], "name": s["name"], "links": []} for s in page]}
+        if len(servers) > limit:
+            params = dict(query, marker=page[-1]["id"], limit=str(limit))
+            href = "%s/compute/%s/v2.1/servers%s?%s" % (
+                self.cloud.base_url, region, "/detail" if detail else "", urlencode(params))
+            body["servers_links"] = [{"rel": "next", "href": href}]
+        self._send(200, body)
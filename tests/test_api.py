@@ -0,0 +1,132 @@
+import io
+import json
+import os
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from core import api, respcache
+from core.commands import report_cmd
+from tests import fake_openstack
+from tests.fakeos import FakeOpenStack
+
+
+class TestApi(unittest.TestCase):
+    def setUp(self):
+        self._env = os.environ.copy()
+        self.td = tempfile.TemporaryDirectory()
+        for key in list(os.environ):
+            if key.startswith(('OS_', 'OSS_')):
+                del os.environ[key]
+        bin_dir = fake_openstack.install(Path(self.td.name) / 'bin')
+        os.environ['PATH'] = str(bin_dir.parent) + os.pathsep + os.environ.get('PATH', '')
+        self.cloud = FakeOpenStack(servers_per_project=3).start()
+        self.addCleanup(self.cloud.stop)
+        catalogs = {}
+        for name in ('app', 'db'):
+            env = self.cloud.catalog_env('proj-' + name)
+            env.pop('OS_PASSWORD')
+            catalogs[name] = env
+        self.profiles = {'profiles': {'dev': {'password': 'secret', 'catalogs': catalogs}}}
+
+    def tearDown(self):
+        os.environ.clear()
+        os.environ.update(self._env)
+        self.td.cleanup()
+
+    def test_session_reuses_config_across_calls(self):
+        with mock.patch('core.api.load_profiles_config', return_value=(self.profiles, Path('x'), False)) as m_load:
+            session = api.Session()
+            self.assertEqual(session.catalogs('dev'), [('dev', 'app'), ('dev', 'db')])
+            env = session.resolve_env('dev', 'app')
+            self.assertEqual(env['OS_PASSWORD'], 'secret')
+            self.assertEqual(env['OS_PROJECT_ID'], 'proj-app')
+            for catalog in ('app', 'db', 'app'):
+                res = session.run('dev', catalog, ['server', 'list', '-f', 'json'])
+                self.assertEqual(res.code, 0, res.stderr)
+                rows = json.loads(res.stdout)
+                self.assertEqual(len(rows), 3)
+                self.assertTrue(rows[0]['Name'].startswith('proj-%s-vm' % catalog))
+        m_load.assert_called_once()
+        self.assertEqual(set(res.timings), {'env', 'bootstrap', 'command'})
+        self.assertTrue(res.cmd[0].endswith('openstack'))
+
+    def test_mutating_run_invalidates_response_cache(self):
+        os.environ['XDG_CACHE_HOME'] = str(Path(self.td.name) / 'cache')
+        session = api.Session(profiles=self.profiles)
+        cache = respcache.ResponseCache()
+        cache.put(session.resolve_env('dev', 'app'), ['flavor', 'list'], 60, b'stale\n')
+        session.run('dev', 'app', ['flavor', 'list'])
+        self.assertEqual(cache.get(session.resolve_env('dev', 'app'), ['flavor', 'list'])[0], b'stale\n')
+        session.run('dev', 'app', ['flavor', 'delete', 'm1.small'])
+        self.assertIsNone(cache.get(session.resolve_env('dev', 'app'), ['flavor', 'list']))
+
+    def test_popen_streams_stdout(self):
+        session = api.Session(profiles=self.profiles)
+        proc = session.popen('dev', 'db', ['server', 'list', '-f', 'value', '-c', 'Name'])
+        names = [line.decode().strip() for line in proc.stdout]
+        proc.stdout.close()
+        self.assertEqual(proc.wait(), 0)
+        self.assertEqual(len(names), 3)
+
+    def test_errors_are_raised(self):
+        session = api.Session(profiles=self.profiles)
+        with self.assertRaises(LookupError):
+            session.resolve_env('prod', 'app')
+        with self.assertRaises(LookupError):
+            session.catalogs('dev', 'nope')
+        with self.assertRaises(FileNotFoundError):
+            session.resolve_env('dev', 'nope')
+        session.profiles['profiles']['dev'].pop('password')
+        with self.assertRaises(ValueError):
+            session.resolve_env('dev', 'app')
+        self.assertNotIn('OS_PASSWORD', session.resolve_env('dev', 'app', check=False))
+        with self.assertRaises(ValueError):
+            session.report(out=self.td.name, colour=True)
+
+    def test_report_returns_files_and_summary(self):
+        session = api.Session(profiles=self.profiles)
+        out = Path(self.td.name) / 'out'
+        rep = session.report(out=out, format='json', summary=True)
+        self.assertEqual(rep.code, 0)
+        self.assertEqual(sorted(p.relative_to(out).as_posix() for p in rep.files),
+                         ['dev/app/report.txt', 'dev/db/report.txt', 'summary.json', 'summary.md'])
+        self.assertEqual(rep.summary['total']['servers'], 6)
+        self.assertIn('Summary: 6 server(s)', rep.messages)
+
+        rep = session.report(out=out, catalog='db', format='value')
+        self.assertEqual([p.relative_to(out).as_posix() for p in rep.files], ['dev/db/report.txt'])
+        self.assertIsNone(rep.summary)
+
+    def test_concurrent_reports_keep_their_messages(self):
+        session = api.Session(profiles=self.profiles)
+        outs = [Path(self.td.name) / ('out%d' % i) for i in range(4)]
+        results = {}
+
+        def run(out):
+            results[out] = session.report(out=out, format='json', summary=True)
+
+        stdout = io.StringIO()
+        with mock.patch('sys.stdout', new=stdout):
+            threads = [threading.Thread(target=run, args=(out,)) for out in outs]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        self.assertEqual(stdout.getvalue(), '')
+        for out in outs:
+            self.assertEqual(results[out].messages.count('Summary:'), 1)
+            self.assertIn(str(out / 'summary.json'), results[out].messages)
+
+    def test_report_args_accept_every_run_option(self):
+        names = report_cmd.run_option_names()
+        self.assertTrue({'format', 'summary', 'regions', 'profile_child', 'metrics_file'} <= names)
+        self.assertNotIn('report_action', names)
+        args = api.report_args(regions='all', jobs=4)
+        self.assertEqual((args.regions, args.jobs, args.format), ('all', 4, 'table'))
+
+
+if __name__ == '__main__':
+    unittest.main()
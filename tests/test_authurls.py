@@ -0,0 +1,115 @@
+import json
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from core import authurls
+
+
+class _VersionHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        time.sleep(self.server.delay)
+        self.server.hits += 1
+        self.send_response(300)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(b'{"versions": {"values": []}}')
+
+
+def _dead_url():
+    # A port nothing listens on
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _VersionHandler)
+    port = server.server_address[1]
+    server.server_close()
+    return 'http://127.0.0.1:%d/v3' % port
+
+
+class TestAuthUrls(unittest.TestCase):
+    def setUp(self):
+        self.td = tempfile.TemporaryDirectory()
+        self.addCleanup(self.td.cleanup)
+        self.cache = authurls.HealthCache(Path(self.td.name) / 'auth-urls.json')
+
+    def serve(self, delay):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), _VersionHandler)
+        server.delay, server.hits = delay, 0
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server, 'http://127.0.0.1:%d/v3' % server.server_address[1]
+
+    def test_candidates(self):
+        env = {'OS_AUTH_URL': 'https://a:5000/v3/', 'OSSC_AUTH_URLS': 'https://b:5000/v3, https://a:5000/v3\nhttps://c/v3'}
+        self.assertEqual(authurls.candidates(env), ['https://a:5000/v3', 'https://b:5000/v3', 'https://c/v3'])
+        self.assertEqual(authurls.candidates({'OS_AUTH_URL': 'https://a'}), ['https://a'])
+        self.assertEqual(authurls.order({'OS_AUTH_URL': 'https://a'}, self.cache), ['https://a'])
+
+    def test_record_reports_health_changes_and_flush_saves_once(self):
+        self.assertTrue(self.cache.record('a', 0.1, now=1000))
+        self.assertFalse(self.cache.record('a', 0.2, now=1001))
+        self.assertTrue(self.cache.record('a', None, now=1002))
+        self.assertFalse(self.cache.record('a', None, now=1003))
+        self.assertFalse(self.cache.path.exists())
+        self.cache.flush()
+        self.assertEqual(json.loads(self.cache.path.read_text())['a']['failures'], 2)
+        self.cache.path.unlink()
+        self.cache.flush()
+        self.assertFalse(self.cache.path.exists())
+
+    def test_cache_rank_stale_and_save(self):
+        self.cache.record('a', 0.5, now=1000)
+        self.cache.record('a', 0.1, now=1000)
+        self.cache.record('b', 0.2, now=1000)
+        self.cache.record('c', None, now=1000)
+        self.assertAlmostEqual(self.cache.get('a')['latency'], 0.38)
+        self.assertEqual(self.cache.rank(['c', 'new', 'a', 'b']), ['b', 'a', 'new', 'c'])
+        self.assertFalse(self.cache.stale('a', now=1000 + authurls.HEALTHY_TTL - 1))
+        self.assertTrue(self.cache.stale('c', now=1000 + authurls.DOWN_TTL))
+        self.assertTrue(self.cache.stale('new'))
+
+        # Another process measured 'b' more recently; its entry wins
+        other = authurls.HealthCache(self.cache.path)
+        other.record('b', None, now=2000)
+        other.save()
+        self.cache.save()
+        saved = json.loads(self.cache.path.read_text())
+        self.assertEqual(sorted(saved), ['a', 'b', 'c'])
+        self.assertFalse(saved['b']['ok'])
+
+    def test_select_prefers_fastest_healthy_url(self):
+        slow, slow_url = self.serve(0.2)
+        fast, fast_url = self.serve(0)
+        dead_url = _dead_url()
+        env = {'OS_AUTH_URL': dead_url, 'OSSC_AUTH_URLS': '%s,%s' % (slow_url, fast_url)}
+        self.assertEqual(authurls.select(env, cache=self.cache)['OS_AUTH_URL'], fast_url)
+        self.assertFalse(self.cache.get(dead_url)['ok'])
+        # Fresh measurements are reused without probing again
+        authurls.select(env, cache=self.cache)
+        self.assertEqual((slow.hits, fast.hits), (1, 1))
+        self.assertTrue(authurls.HealthCache(self.cache.path).get(fast_url)['ok'])
+
+        # No alternates: nothing is probed
+        single = {'OS_AUTH_URL': slow_url}
+        self.assertIs(authurls.select(single, cache=self.cache), single)
+        self.assertEqual(slow.hits, 1)
+
+    def test_failover(self):
+        _, live_url = self.serve(0)
+        dead_url = _dead_url()
+        env = {'OS_AUTH_URL': dead_url, 'OSSC_AUTH_URLS': live_url}
+        tried = set()
+        self.assertEqual(authurls.failover(env, tried, cache=self.cache)['OS_AUTH_URL'], live_url)
+        self.assertFalse(self.cache.get(dead_url)['ok'])
+        # The live URL answers, so its failure was not the endpoint's
+        self.assertIsNone(authurls.failover(dict(env, OS_AUTH_URL=live_url), tried, cache=self.cache))
+        self.assertIsNone(authurls.failover({'OS_AUTH_URL': dead_url}, set(), cache=self.cache))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+import io
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from core import bulk, keystone
+from tests.fakeos import FakeOpenStack
+
+
+class TestBulkHelpers(unittest.TestCase):
+    def test_read_targets(self):
+        lines = ['# header\n', 'a1  # HTTP 409: locked\n', '\n', 'web-1 extra\n', 'a1\n']
+        self.assertEqual(bulk.read_targets(lines), ['a1', 'web-1'])
+
+    def test_manifest_round_trip(self):
+        with tempfile.TemporaryDirectory() as td:
+            path = Path(td) / 'failed.txt'
+            bulk.write_manifest(path, {'id-1': 'HTTP 409: conflict', 'web': 'no server with this name'}, 'hdr')
+            self.assertEqual(bulk.read_targets(path.read_text().splitlines()), ['id-1', 'web'])
+
+    def test_read_lines_and_parse_filters(self):
+        with tempfile.TemporaryDirectory() as td:
+            path = Path(td) / 'targets.txt'
+            path.write_text('a1\nweb-1\n')
+            self.assertEqual(bulk.read_lines(str(path)), ['a1\n', 'web-1\n'])
+        with mock.patch('sys.stdin', io.StringIO('b2\n')):
+            self.assertEqual(bulk.read_lines('-'), ['b2\n'])
+        self.assertEqual(bulk.parse_filters(['Host=c1', 'changes_since=2026-10-19']),
+                         [('host', 'c1'), ('changes-since', '2026-10-19')])
+        with self.assertRaises(ValueError):
+            bulk.parse_filters(['project=x'])
+
+    def test_action_request(self):
+        self.assertEqual(bulk.action_request('delete', 'x'), ('DELETE', '/servers/x', None, None))
+        method, path, body, headers = bulk.action_request('tag', 'x', tag='keep')
+        self.assertEqual((method, path), ('PUT', '/servers/x/tags/keep'))
+        self.assertEqual(headers['OpenStack-API-Version'], 'compute 2.26')
+        self.assertEqual(bulk.action_request('tag', 'x', tag='a b?#%')[1], '/servers/x/tags/a%20b%3F%23%25')
+
+    def test_check_tag(self):
+        bulk.check_tag('expired 2026-10')
+        for tag in ('', 'a/b', 'a,b', 'x' * 61):
+            with self.assertRaises(ValueError):
+                bulk.check_tag(tag)
+
+    def test_run_action_retries_transient_only(self):
+        session = mock.Mock()
+        sleep = mock.Mock()
+        session.request.side_effect = [
+            bulk.ComputeError('HTTP 429', status=429, retry_after=2.0),
+            bulk.ComputeError('connection failed', sent=False),
+            None,
+        ]
+        self.assertEqual(bulk.run_action(session, 'stop', 'x', sleep=sleep), (None, 3))
+        self.assertGreaterEqual(sleep.call_args_list[0][0][0], 2.0)
+
+        session.request.side_effect = bulk.ComputeError('HTTP 409: locked', status=409)
+        self.assertEqual(bulk.run_action(session, 'stop', 'x', sleep=sleep), ('HTTP 409: locked', 1))
+        session.request.side_effect = bulk.ComputeError('HTTP 503', status=503)
+        self.assertEqual(bulk.run_action(session, 'stop', 'x', retries=2, sleep=sleep), ('HTTP 503', 3))
+        session.request.side_effect = bulk.ComputeError('HTTP 404', status=404)
+        self.assertEqual(bulk.run_action(session, 'delete', 'x', sleep=sleep), (None, 1))
+
+    def test_lost_response_checks_state_before_resending(self):
+        session = mock.Mock()
+        sleep = mock.Mock()
+        lost = bulk.ComputeError('connection failed: timed out')
+
+        def server(status, task=None):
+            return {'server': {'status': status, 'OS-EXT-STS:task_state': task}}
+
+        # The reboot was applied: no second POST (which Nova would answer with 409)
+        session.request.side_effect = [lost, server('REBOOT', 'rebooting')]
+        self.assertEqual(bulk.run_action(session, 'reboot', 'x', sleep=sleep), (None, 2))
+        self.assertEqual([c[0][0] for c in session.request.call_args_list], ['POST', 'GET'])
+
+        # The stop never took effect: sent again
+        session.reset_mock()
+        session.request.side_effect = [bulk.ComputeError('HTTP 502', status=502), server('ACTIVE'), None]
+        self.assertEqual(bulk.run_action(session, 'stop', 'x', sleep=sleep), (None, 2))
+        self.assertEqual([c[0][0] for c in session.request.call_args_list], ['POST', 'GET', 'POST'])
+
+        # The state cannot tell whether a reboot happened: reported, not resent
+        session.request.side_effect = [lost, server('ACTIVE')]
+        error, _ = bulk.run_action(session, 'reboot', 'x', sleep=sleep)
+        self.assertIn('does not show whether reboot took effect', error)
+
+        # Idempotent actions are simply sent again
+        session.reset_mock()
+        session.request.side_effect = [lost, None]
+        self.assertEqual(bulk.run_action(session, 'delete', 'x', sleep=sleep), (None, 2))
+        self.assertEqual(session.request.call_count, 2)
+
+    def test_progress_line(self):
+        stream = io.StringIO()
+        progress = bulk.Progress('stop p/c', 2, stream=stream, interval=0)
+        progress.update(True)
+        progress.update(False)
+        self.assertIn('stop p/c: 2/2 done, 1 failed', stream.getvalue().splitlines()[-1])
+
+
+class TestBulkFakeCloud(unittest.TestCase):
+    def setUp(self):
+        self.cloud = FakeOpenStack(servers_per_project=60).start()
+        self.addCleanup(self.cloud.stop)
+        self.session = bulk.ComputeSession(self.cloud.catalog_env('proj-1'))
+        self.addCleanup(self.session.close)
+        self.servers = self.cloud.servers('proj-1')
+
+    def test_one_auth_for_all_workers(self):
+        targets = [(sid, sid) for sid in self.servers]
+        failures = bulk.run_bulk(self.session, 'stop', targets, jobs=8)
+        self.assertEqual(failures, {})
+        self.assertEqual({s['status'] for s in self.servers.values()}, {'SHUTOFF'})
+        self.assertEqual(self.cloud.requests['identity'], 1)
+
+    def test_retries_injected_failures(self):
+        self.cloud.error_rate = {'compute': 0.3}
+        targets = [(sid, sid) for sid in self.servers]
+        failures = bulk.run_bulk(self.session, 'delete', targets, jobs=8, retries=8, backoff=0.001)
+        self.assertEqual(failures, {})
+        self.assertEqual({s['status'] for s in self.servers.values()}, {'DELETED'})
+
+    def test_expired_token_is_renewed(self):
+        self.cloud._tokens.clear()
+        sid = next(iter(self.servers))
+        self.assertEqual(bulk.run_bulk(self.session, 'tag', [(sid, sid)], tag='keep'), {})
+        self.assertEqual(self.servers[sid]['tags'], ['keep'])
+        self.assertEqual(self.cloud.requests['identity'], 2)
+
+    def test_list_and_resolve(self):
+        self.assertEqual(len(list(self.session.list_servers(page_size=7))), 60)
+        active = list(self.session.list_servers([('status', 'ACTIVE')]))
+        self.assertTrue(active)
+        self.assertTrue(all(self.servers[s['id']]['status'] == 'ACTIVE' for s in active))
+        sid = next(iter(self.servers))
+        resolved, errors = bulk.resolve_targets(self.session, ['proj-1-vm-003', sid, 'nope'])
+        self.assertEqual(resolved[1], (sid, sid))
+        self.assertEqual(self.servers[resolved[0][1]]['name'], 'proj-1-vm-003')
+        self.assertEqual(errors, {'nope': 'no server with this name'})
+
+    def test_bad_credentials(self):
+        with self.assertRaises(keystone.KeystoneError):
+            bulk.ComputeSession(dict(self.cloud.catalog_env('proj-1'), OS_PASSWORD='bad'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,14 @@
 import os
+import tempfile
 import unittest
 from unittest import mock
 from types import SimpleNamespace
 import io
+import json
+import shlex
+import sys
 
-from core import cli
+from core import cli, respcache
 
 
 class TestCLI(unittest.TestCase):
@@ -39,6 +43,42 @@ class TestCLI(unittest.TestCase):
         rc = cli.handle_default(args, cli.Path('.'))
         self.assertEqual(rc, 0)
 
+    @mock.patch('core.keystone.fail_over')
+    @mock.patch('core.keystone.select_auth_url', side_effect=lambda env: env)
+    @mock.patch('core.cli.ensure_openstack_available', side_effect=lambda root, env: (env, '/bin/openstack'))
+    @mock.patch('core.cli.subprocess.run')
+    @mock.patch('core.cli.get_catalog_env')
+    @mock.patch('core.cli.ensure_profiles_structure')
+    @mock.patch('core.cli.load_profiles_config')
+    def test_read_only_command_fails_over_to_alternate_auth_url(self, m_load, m_struct, m_getenv, m_run, _, __, m_fail):
+        m_load.return_value = ({'profiles': {'dev': {'password': 'p'}}}, None, False)
+        m_struct.side_effect = lambda x: x
+        m_getenv.return_value = {'OS_AUTH_URL': 'http://a/v3', 'OSSC_AUTH_URLS': 'http://b/v3', 'OS_USERNAME': 'user'}
+        m_fail.side_effect = lambda env, tried: dict(env, OS_AUTH_URL='http://b/v3')
+        m_run.side_effect = [SimpleNamespace(returncode=1), SimpleNamespace(returncode=0)]
+        parser = cli.build_default_parser()
+        args = parser.parse_args(['--profile', 'dev', '--catalog', 'app', 'server', 'list'])
+        with mock.patch('core.cli.latency.record'), mock.patch('sys.stderr', new=io.StringIO()) as err:
+            self.assertEqual(cli.handle_default(args, cli.Path('.')), 0)
+        self.assertEqual([c.kwargs['env']['OS_AUTH_URL'] for c in m_run.call_args_list], ['http://a/v3', 'http://b/v3'])
+        self.assertIn('http://a/v3 is not answering; retrying with http://b/v3', err.getvalue())
+
+        # A mutating command is never repeated
+        m_run.reset_mock(side_effect=True)
+        m_run.return_value = SimpleNamespace(returncode=1)
+        args = parser.parse_args(['--profile', 'dev', '--catalog', 'app', 'server', 'delete', 'vm1'])
+        with mock.patch('core.cli.latency.record'), mock.patch('core.cli.respcache.ResponseCache'):
+            self.assertEqual(cli.handle_default(args, cli.Path('.')), 1)
+        self.assertEqual(m_run.call_count, 1)
+
+        # Nor is one whose verbs cannot be read past leading options or are not known to be read-only
+        for command in (['--', '--os-region-name', 'r', 'server', 'create', 'vm1'], ['project', 'cleanup', 'p']):
+            m_run.reset_mock()
+            args = parser.parse_args(['--profile', 'dev', '--catalog', 'app'] + command)
+            with mock.patch('core.cli.latency.record'), mock.patch('core.cli.respcache.ResponseCache'):
+                self.assertEqual(cli.handle_default(args, cli.Path('.')), 1)
+            self.assertEqual(m_run.call_count, 1, command)
+
     @mock.patch('core.cli.ensure_openstack_available')
     @mock.patch('core.cli.get_catalog_env')
     @mock.patch('core.cli.ensure_profiles_structure')
@@ -117,6 +157,225 @@ class TestCLI(unittest.TestCase):
         self.assertEqual(rc, 0)
         self.assertIn('Command: openstack server list', out)
 
+    @mock.patch('core.cli.ensure_openstack_available')
+    @mock.patch('core.cli.get_catalog_env')
+    @mock.patch('core.cli.ensure_profiles_structure', side_effect=lambda x: x)
+    @mock.patch('core.cli.load_profiles_config')
+    def test_env_prints_shell_exports(self, m_load, m_struct, m_getenv, m_ensure):
+        m_load.return_value = ({'profiles': {'dev': {'password': "p'w"}}}, None, False)
+        m_getenv.return_value = {'OS_AUTH_URL': 'https://k/v3', 'OS_USERNAME': 'user', 'OS_PROJECT_ID': 'p1'}
+        m_ensure.side_effect = lambda root, env: (dict(env, PATH='/venv/bin:' + env.get('PATH', '')), '/venv/bin/openstack')
+        parser = cli.build_default_parser()
+        args = parser.parse_args(['--profile', 'dev', '--catalog', 'app', 'env'])
+        buf = io.StringIO()
+        with mock.patch.dict(os.environ, {'OS_REGION_NAME': 'stale', 'PATH': '/usr/bin'}):
+            os.environ.pop('OS_PASSWORD', None)
+            os.environ.pop('OSS_PASSWORD', None)
+            with mock.patch('sys.stdout', new=buf):
+                rc = cli.handle_default(args, cli.Path('.'))
+        self.assertEqual(rc, 0)
+        lines = buf.getvalue().splitlines()
+        self.assertIn('unset OS_REGION_NAME', lines)
+        self.assertIn("export OS_AUTH_URL=https://k/v3", lines)
+        self.assertIn("export OS_PASSWORD='p'\"'\"'w'", lines)
+        self.assertIn('export OSSC_CATALOG=app', lines)
+        self.assertIn("export PATH=/venv/bin:/usr/bin", lines)
+        self.assertFalse(any('First-time setup' in ln for ln in lines))
+
+    @mock.patch('core.cli.ensure_openstack_available', side_effect=lambda root, env: (env, '/bin/openstack'))
+    @mock.patch('core.cli.get_catalog_env')
+    @mock.patch('core.cli.ensure_profiles_structure', side_effect=lambda x: x)
+    @mock.patch('core.cli.load_profiles_config')
+    def test_env_switches_between_profiles(self, m_load, m_struct, m_getenv, m_ensure):
+        m_load.return_value = ({'profiles': {'a': {'password': 'pw-a'}, 'b': {'password': 'pw-b'}}}, None, False)
+        m_getenv.side_effect = lambda cfg, profile, catalog: {
+            'OS_AUTH_URL': 'https://%s/v3' % profile, 'OS_USERNAME': 'user-' + profile}
+        parser = cli.build_default_parser()
+
+        def run(profile, catalog, command):
+            args = parser.parse_args(['--profile', profile, '--catalog', catalog] + command)
+            buf = io.StringIO()
+            with mock.patch('sys.stdout', new=buf), mock.patch('sys.stderr', new=io.StringIO()):
+                self.assertEqual(cli.handle_default(args, cli.Path('.')), 0)
+            return buf.getvalue().splitlines()
+
+        def source(lines):
+            for line in lines:
+                verb, rest = line.split(' ', 1)
+                if verb == 'unset':
+                    os.environ.pop(rest, None)
+                else:
+                    key, value = rest.split('=', 1)
+                    os.environ[key] = shlex.split(value)[0]
+
+        with mock.patch.dict(os.environ, {'PATH': '/usr/bin'}):
+            for key in ('OS_PASSWORD', 'OSS_PASSWORD', 'OSSC_PROFILE', 'OSSC_CATALOG'):
+                os.environ.pop(key, None)
+            source(run('a', 'x', ['env']))
+            self.assertEqual(os.environ['OS_PASSWORD'], 'pw-a')
+            source(run('b', 'y', ['env']))
+            self.assertEqual((os.environ['OS_PASSWORD'], os.environ['OS_AUTH_URL']), ('pw-b', 'https://b/v3'))
+
+            # A proxied command for another catalog ignores the exported credentials too
+            out = run('a', 'x', ['--dry-run', 'server', 'list'])
+            self.assertIn('  OS_AUTH_URL=https://a/v3', out)
+            with mock.patch('core.cli.subprocess.run', return_value=SimpleNamespace(returncode=0)) as m_run, \
+                    mock.patch('core.cli.latency.record'):
+                run('a', 'x', ['server', 'list'])
+            self.assertEqual(m_run.call_args[1]['env']['OS_PASSWORD'], 'pw-a')
+
+    @mock.patch('core.cli.subprocess.run')
+    @mock.patch('core.cli.ensure_openstack_available')
+    @mock.patch('core.cli.get_catalog_env')
+    @mock.patch('core.cli.ensure_profiles_structure', side_effect=lambda x: x)
+    @mock.patch('core.cli.load_profiles_config')
+    def test_shell_spawns_subshell_with_env(self, m_load, m_struct, m_getenv, m_ensure, m_run):
+        m_load.return_value = ({'profiles': {'dev': {'password': 'p'}}}, None, False)
+        m_getenv.return_value = {'OS_AUTH_URL': 'u', 'OS_USERNAME': 'user'}
+        m_ensure.side_effect = lambda root, env: (env, '/bin/openstack')
+        m_run.return_value = SimpleNamespace(returncode=5)
+        parser = cli.build_default_parser()
+        args = parser.parse_args(['--profile', 'dev', '--catalog', 'app', 'shell', '-c', 'openstack server list'])
+        with mock.patch.dict(os.environ, {'SHELL': '/bin/bash'}):
+            with mock.patch('sys.stderr', new=io.StringIO()):
+                rc = cli.handle_default(args, cli.Path('.'))
+        self.assertEqual(rc, 5)
+        cmd = m_run.call_args[0][0]
+        env = m_run.call_args[1]['env']
+        self.assertEqual(cmd, ['/bin/bash', '-c', 'openstack server list'])
+        self.assertEqual(env['OS_PASSWORD'], 'p')
+        self.assertEqual(env['OSSC_PROFILE'], 'dev')
+
+    @mock.patch('core.cli.get_catalog_env')
+    @mock.patch('core.cli.ensure_profiles_structure', side_effect=lambda x: x)
+    @mock.patch('core.cli.load_profiles_config')
+    def test_double_dash_env_is_forwarded(self, m_load, m_struct, m_getenv):
+        m_load.return_value = ({'profiles': {'dev': {'password': 'p'}}}, None, False)
+        m_getenv.return_value = {'OS_AUTH_URL': 'u', 'OS_USERNAME': 'user'}
+        args = cli.build_default_parser().parse_args(['--profile', 'dev', '--catalog', 'app', '--dry-run', '--', 'env'])
+        buf = io.StringIO()
+        with mock.patch('sys.stdout', new=buf):
+            self.assertEqual(cli.handle_default(args, cli.Path('.')), 0)
+        self.assertIn('Command: openstack env', buf.getvalue())
+
+    @mock.patch('core.cli.region_envs')
+    @mock.patch('core.cli.subprocess.run')
+    @mock.patch('core.cli.ensure_openstack_available')
+    @mock.patch('core.cli.get_catalog_env')
+    @mock.patch('core.cli.ensure_profiles_structure', side_effect=lambda x: x)
+    @mock.patch('core.cli.load_profiles_config')
+    def test_regions_fan_out(self, m_load, m_struct, m_getenv, m_ensure, m_run, m_regions):
+        m_load.return_value = ({'profiles': {'dev': {'password': 'p'}}}, None, False)
+        m_getenv.return_value = {'OS_AUTH_URL': 'u', 'OS_USERNAME': 'user'}
+        m_ensure.side_effect = lambda root, env: (env, '/bin/openstack')
+        m_regions.return_value = [
+            ('r1', {'OS_TOKEN': 't', 'OS_REGION_NAME': 'r1'}),
+            ('r2', {'OS_TOKEN': 't', 'OS_REGION_NAME': 'r2'}),
+            ('r9', None),
+        ]
+        m_run.side_effect = lambda cmd, env, **kw: SimpleNamespace(
+            returncode=0, stdout='servers in %s\n' % env['OS_REGION_NAME'], stderr='')
+        args = cli.build_default_parser().parse_args(
+            ['--profile', 'dev', '--catalog', 'app', '--regions', 'r1,r2,r9', 'server', 'list'])
+        out = io.StringIO()
+        with mock.patch('sys.stdout', new=out), mock.patch('sys.stderr', new=io.StringIO()):
+            rc = cli.handle_default(args, cli.Path('.'))
+        self.assertEqual(rc, 2)
+        self.assertEqual(m_regions.call_args[0][1], ['r1', 'r2', 'r9'])
+        self.assertEqual(m_run.call_count, 2)
+        self.assertEqual(out.getvalue(), '==> r1 <==\nservers in r1\n==> r2 <==\nservers in r2\n==> r9 <==\n')
+
+    @mock.patch('core.cli.subprocess.run')
+    @mock.patch('core.cli.ensure_openstack_available')
+    @mock.patch('core.cli.get_catalog_env')
+    @mock.patch('core.cli.ensure_profiles_structure', side_effect=lambda x: x)
+    @mock.patch('core.cli.load_profiles_config')
+    def test_response_cache(self, m_load, m_struct, m_getenv, m_ensure, m_run):
+        m_load.return_value = ({'profiles': {'dev': {'password': 'p'}}}, None, False)
+        m_getenv.return_value = {'OS_AUTH_URL': 'u', 'OS_USERNAME': 'user'}
+        m_ensure.side_effect = lambda root, env: (env, '/bin/openstack')
+        m_run.return_value = SimpleNamespace(returncode=0, stdout=b'm1.small\n', stderr=b'')
+
+        def ossc(*argv):
+            out = io.BytesIO()
+            stdout = SimpleNamespace(buffer=out, flush=lambda: None, write=lambda s: out.write(s.encode()))
+            args = cli.build_default_parser().parse_args(['--profile', 'dev', '--catalog', 'app'] + list(argv))
+            with mock.patch('sys.stdout', new=stdout):
+                self.assertEqual(cli.handle_default(args, cli.Path('.')), 0)
+            return out.getvalue()
+
+        with tempfile.TemporaryDirectory() as td, mock.patch.dict(
+            os.environ, {'XDG_CACHE_HOME': td, 'OSSC_LATENCY_LOG': os.path.join(td, 'latency.log')}
+        ):
+            os.environ.pop('OSSC_CACHE', None)
+            self.assertEqual(ossc('--cache', 'flavor', 'list'), b'm1.small\n')
+            self.assertEqual(ossc('--cache', 'flavor', 'list'), b'm1.small\n')
+            self.assertEqual(m_run.call_count, 1)
+            self.assertEqual(m_run.call_args[1]['capture_output'], True)
+            ossc('--cache', '--no-cache', 'flavor', 'list')
+            self.assertEqual(m_run.call_count, 2)
+
+            m_run.return_value = SimpleNamespace(returncode=0)
+            ossc('flavor', 'create', '--ram', '512', 'tiny')
+            m_run.return_value = SimpleNamespace(returncode=0, stdout=b'tiny\n', stderr=b'')
+            self.assertEqual(ossc('--cache', 'flavor', 'list'), b'tiny\n')
+            self.assertEqual(m_run.call_count, 4)
+
+            with open(os.path.join(td, 'latency.log')) as f:
+                recs = [json.loads(line) for line in f]
+            self.assertEqual(len(recs), 5)
+            self.assertEqual({(r['src'], r['profile'], r['catalog']) for r in recs}, {('proxy', 'dev', 'app')})
+            self.assertEqual(recs[0]['cmd'], 'flavor list')
+            self.assertIsNone(recs[1]['child'])  # served from cache
+
+            # A listing cached while a mutation runs is dropped when it exits; leading options are skipped
+            def mutate(cmd, env):
+                respcache.ResponseCache().put(env, ['flavor', 'list'], 60, b'stale\n')
+                return SimpleNamespace(returncode=0)
+
+            m_run.side_effect = mutate
+            ossc('--', '--os-region-name', 'r', 'flavor', 'delete', 'tiny')
+            m_run.side_effect = None
+            self.assertEqual(ossc('--cache', 'flavor', 'list'), b'tiny\n')
+
+    @mock.patch('core.cli.region_envs')
+    @mock.patch('core.keystone.select_auth_url', side_effect=lambda env: dict(env, OS_AUTH_URL='http://b/v3'))
+    @mock.patch('core.cli.subprocess.run')
+    @mock.patch('core.cli.ensure_openstack_available', side_effect=lambda root, env: (env, '/bin/openstack'))
+    @mock.patch('core.cli.get_catalog_env')
+    @mock.patch('core.cli.ensure_profiles_structure', side_effect=lambda x: x)
+    @mock.patch('core.cli.load_profiles_config')
+    def test_mutation_invalidates_cache_of_configured_auth_url(self, m_load, m_struct, m_getenv, _, m_run, __, m_regions):
+        m_load.return_value = ({'profiles': {'dev': {'password': 'p'}}}, None, False)
+        m_getenv.return_value = {'OS_AUTH_URL': 'http://a/v3', 'OSSC_AUTH_URLS': 'http://b/v3', 'OS_USERNAME': 'user'}
+        m_regions.return_value = [('r1', {'OS_TOKEN': 't', 'OS_REGION_NAME': 'r1'})]
+
+        def ossc(*argv):
+            out = io.BytesIO()
+            stdout = SimpleNamespace(buffer=out, flush=lambda: None, write=lambda s: out.write(s.encode()))
+            args = cli.build_default_parser().parse_args(['--profile', 'dev', '--catalog', 'app'] + list(argv))
+            with mock.patch('sys.stdout', new=stdout), mock.patch('core.cli.latency.record'):
+                cli.handle_default(args, cli.Path('.'))
+            return out.getvalue()
+
+        with tempfile.TemporaryDirectory() as td, mock.patch.dict(os.environ, {'XDG_CACHE_HOME': td}):
+            m_run.return_value = SimpleNamespace(returncode=0, stdout=b'm1.small\n', stderr=b'')
+            self.assertEqual(ossc('--cache', 'flavor', 'list'), b'm1.small\n')
+            self.assertEqual(m_run.call_args.kwargs['env']['OS_AUTH_URL'], 'http://b/v3')
+            # A listing cached (under the configured auth URL) while the mutation runs
+            def mutate(cmd, env, **kwargs):
+                respcache.ResponseCache().put(dict(env, OS_AUTH_URL='http://a/v3'), ['flavor', 'list'], 60, b'stale\n')
+                return SimpleNamespace(returncode=0, stdout='', stderr='')
+
+            for mutation in (['flavor', 'delete', 'm1.small'], ['--regions', 'r1', 'flavor', 'delete', 'm1.tiny']):
+                m_run.side_effect = mutate
+                ossc(*mutation)
+                m_run.side_effect = None
+                m_run.reset_mock()
+                listing = ('after ' + mutation[-1] + '\n').encode()
+                m_run.return_value = SimpleNamespace(returncode=0, stdout=listing, stderr=b'')
+                self.assertEqual(ossc('--cache', 'flavor', 'list'), listing, mutation)
+                self.assertEqual(m_run.call_count, 1)
 
 if __name__ == '__main__':
     unittest.main()
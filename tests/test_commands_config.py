@@ -107,6 +107,41 @@ class TestConfigCmd(unittest.TestCase):
         code = config_cmd.handle(args, Path('.'))
         self.assertEqual(code, 2)
 
+    @mock.patch('core.commands.config_cmd.keystone.authenticate')
+    def test_check_reports_status_per_catalog(self, m_auth):
+        cfg_file = Path(os.environ['XDG_CONFIG_HOME']) / 'ossc' / 'profiles.json'
+        cfg_file.parent.mkdir(parents=True, exist_ok=True)
+        cfg_file.write_text(json.dumps({'profiles': {
+            'dev': {'password': 'pw', 'catalogs': {
+                'app': {'OS_AUTH_URL': 'http://k/v3', 'OS_USERNAME': 'u', 'OS_PROJECT_ID': 'a'},
+                'net': {'OS_AUTH_URL': 'http://k/v3', 'OS_USERNAME': 'u', 'OS_PROJECT_ID': 'bad'},
+                'db': {'OS_USERNAME': 'u'},
+            }},
+        }}), encoding='utf-8')
+        os.environ.pop('OSS_PASSWORD', None)
+        os.environ.pop('OS_PASSWORD', None)
+
+        def fake_auth(env, timeout, catalog):
+            self.assertEqual(env['OS_PASSWORD'], 'pw')
+            if env['OS_PROJECT_ID'] == 'bad':
+                raise config_cmd.keystone.KeystoneError('HTTP 401: denied')
+            return {'elapsed': 0.25, 'project': {'name': 'app'}}
+
+        m_auth.side_effect = fake_auth
+        args = mock.Mock(cfg_cmd='check', profile='dev', catalog=None, username=None, password=None,
+                         jobs=4, timeout=5, format='json')
+        buf = io.StringIO()
+        with mock.patch('sys.stdout', new=buf):
+            code = config_cmd.handle(args, Path('.'))
+        self.assertEqual(code, 1)
+        results = {r['catalog']: r for r in json.loads(buf.getvalue())}
+        self.assertEqual(results['app']['status'], 'ok')
+        self.assertEqual(results['app']['auth_ms'], 250.0)
+        self.assertEqual(results['net']['status'], 'failed')
+        self.assertIn('401', results['net']['detail'])
+        self.assertEqual(results['db']['status'], 'missing')
+        self.assertIn('OS_AUTH_URL', results['db']['detail'])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,4 +1,5 @@
 import io
+import json
 import os
 import shutil
 import tempfile
@@ -10,6 +11,25 @@ from types import SimpleNamespace
 from core.commands import report_cmd
 
 
+def child_run(result):
+    """subprocess.run stand-in for the `openstack` child.
+
+    ``result`` is a SimpleNamespace, a list of them (one per call) or a
+    function of (cmd, env). Its stdout goes to the report file when the
+    report passes one, as the real child's would.
+    """
+    results = list(result) if isinstance(result, list) else None
+
+    def run(cmd, env=None, **kwargs):
+        proc = results.pop(0) if results is not None else result(cmd, env) if callable(result) else result
+        if kwargs.get('stdout') is None:
+            return proc
+        kwargs['stdout'].write(proc.stdout or '')
+        return SimpleNamespace(returncode=proc.returncode, stdout=None, stderr=proc.stderr)
+
+    return run
+
+
 class TestReportCmd(unittest.TestCase):
     def setUp(self):
         self._env = os.environ.copy()
@@ -41,10 +61,15 @@ class TestReportCmd(unittest.TestCase):
             return profiles, Path('ignored'), False
 
         with mock.patch('core.commands.report_cmd.load_profiles_config', side_effect=fake_load):
-            m_run.return_value = SimpleNamespace(returncode=0, stdout='OK\n', stderr='')
+            m_run.side_effect = child_run(SimpleNamespace(returncode=0, stdout='OK\n', stderr=''))
             args = SimpleNamespace(out=str(Path(self.td.name) / 'out'), format='table', profile=None, catalog=None)
-            code = report_cmd.handle(args, Path('.'))
+            with mock.patch('sys.stdout', new_callable=io.StringIO) as out:
+                code = report_cmd.handle(args, Path('.'))
             self.assertEqual(code, 0)
+            # A sequential run without --summary has no schedule to show
+            self.assertNotIn('Schedule:', out.getvalue())
+            # The child writes straight into report.txt; its output is not captured
+            self.assertNotIn('capture_output', m_run.call_args.kwargs)
             report_file = Path(args.out) / 'dev' / 'app' / 'report.txt'
             self.assertTrue(report_file.exists())
             content = report_file.read_text(encoding='utf-8')
@@ -86,7 +111,7 @@ class TestReportCmd(unittest.TestCase):
         def fake_load(_):
             return profiles, Path('ignored'), False
 
-        m_run.return_value = SimpleNamespace(returncode=0, stdout='OK\n', stderr='')
+        m_run.side_effect = child_run(SimpleNamespace(returncode=0, stdout='OK\n', stderr=''))
 
         # profile+catalog
         with mock.patch('core.commands.report_cmd.load_profiles_config', side_effect=fake_load):
@@ -111,6 +136,287 @@ class TestReportCmd(unittest.TestCase):
             self.assertTrue((Path(args.out) / 'dev' / 'app' / 'report.txt').exists())
             self.assertTrue((Path(args.out) / 'prod' / 'app' / 'report.txt').exists())
 
+    @mock.patch('core.commands.report_cmd.resolve_username', return_value='user')
+    @mock.patch('core.commands.report_cmd.resolve_password', return_value='pass')
+    @mock.patch('core.commands.report_cmd.ensure_openstack_available', return_value=({}, '/bin/openstack'))
+    @mock.patch('core.commands.report_cmd.subprocess.run')
+    def test_report_history_store_and_restore(self, m_run, *_):
+        profiles = {'profiles': {'dev': {'catalogs': {'app': {'OS_AUTH_URL': 'u', 'OS_USERNAME': 'u'}}}}}
+        m_run.side_effect = child_run(SimpleNamespace(returncode=0, stdout='SERVERS\n', stderr=''))
+        hist = str(Path(self.td.name) / 'hist')
+        out = str(Path(self.td.name) / 'outh')
+        buf = io.StringIO()
+        with mock.patch('core.commands.report_cmd.load_profiles_config', return_value=(profiles, Path('x'), False)):
+            with mock.patch('sys.stdout', new=buf):
+                for _ in range(2):
+                    args = SimpleNamespace(out=out, format='table', profile=None, catalog=None,
+                                           history=True, history_dir=hist, keep_days=None, keep_runs=5)
+                    self.assertEqual(report_cmd.handle(args, Path('.')), 0)
+                args = SimpleNamespace(report_action='runs', history_dir=hist)
+                self.assertEqual(report_cmd.handle(args, Path('.')), 0)
+        lines = [ln for ln in buf.getvalue().splitlines() if ln.startswith('History: run')]
+        self.assertEqual(len(lines), 2)
+        self.assertIn('1 new object(s)', lines[1])
+        run_id = buf.getvalue().splitlines()[-1].split()[0]
+
+        dest = Path(self.td.name) / 'restored'
+        args = SimpleNamespace(report_action='restore', run_id=run_id, dest=str(dest), history_dir=hist)
+        with mock.patch('sys.stdout', new=io.StringIO()):
+            self.assertEqual(report_cmd.handle(args, Path('.')), 0)
+        self.assertEqual(
+            (dest / 'dev' / 'app' / 'report.txt').read_text(encoding='utf-8'),
+            (Path(out) / 'dev' / 'app' / 'report.txt').read_text(encoding='utf-8'),
+        )
+
+    def test_server_list_args(self):
+        filters = report_cmd.parse_filters(['status=ERROR', 'Name=web-', 'availability_zone=az1'])
+        self.assertEqual(filters, [('status', 'ERROR'), ('name', 'web-'), ('availability-zone', 'az1')])
+        argv = report_cmd.server_list_args(filters, ['ID', 'Name'])
+        self.assertEqual(argv, ['--status', 'ERROR', '--name', 'web-', '--availability-zone', 'az1',
+                                '-c', 'ID', '-c', 'Name', '--no-name-lookup'])
+        self.assertNotIn('--no-name-lookup', report_cmd.server_list_args([], ['ID', 'Flavor']))
+        self.assertEqual(report_cmd.server_list_args([], []), [])
+        with self.assertRaises(ValueError):
+            report_cmd.parse_filters(['bogus=1'])
+        with self.assertRaises(ValueError):
+            report_cmd.parse_filters(['status'])
+
+    @mock.patch('core.commands.report_cmd.resolve_username', return_value='user')
+    @mock.patch('core.commands.report_cmd.resolve_password', return_value='pass')
+    @mock.patch('core.commands.report_cmd.ensure_openstack_available', return_value=({}, '/bin/openstack'))
+    @mock.patch('core.commands.report_cmd.subprocess.run')
+    def test_report_filters_and_columns_in_command_and_header(self, m_run, *_):
+        profiles = {'profiles': {'dev': {'catalogs': {'app': {'OS_AUTH_URL': 'u', 'OS_USERNAME': 'u'}}}}}
+        m_run.side_effect = child_run(SimpleNamespace(returncode=0, stdout='OK\n', stderr=''))
+        args = SimpleNamespace(out=str(Path(self.td.name) / 'outc'), format='csv', profile=None, catalog=None,
+                               filter=['status=ERROR'], columns='ID,Name')
+        with mock.patch('core.commands.report_cmd.load_profiles_config', return_value=(profiles, Path('x'), False)):
+            self.assertEqual(report_cmd.handle(args, Path('.')), 0)
+        cmd = m_run.call_args[0][0]
+        self.assertEqual(cmd[1:], ['server', 'list', '-f', 'csv', '--status', 'ERROR', '-c', 'ID', '-c', 'Name',
+                                   '--no-name-lookup'])
+        content = (Path(args.out) / 'dev' / 'app' / 'report.txt').read_text(encoding='utf-8')
+        self.assertIn('# Filters: status=ERROR\n', content)
+        self.assertIn('# Columns: ID,Name\n', content)
+
+        args.filter = ['color=red']
+        with mock.patch('core.commands.report_cmd.load_profiles_config', return_value=(profiles, Path('x'), False)):
+            with mock.patch('sys.stdout', new=io.StringIO()):
+                self.assertEqual(report_cmd.handle(args, Path('.')), 2)
+
+    @mock.patch('core.commands.report_cmd.resolve_username', return_value='user')
+    @mock.patch('core.commands.report_cmd.resolve_password', return_value='pass')
+    @mock.patch('core.commands.report_cmd.ensure_openstack_available', side_effect=lambda root, env: (env, '/bin/openstack'))
+    @mock.patch('core.commands.report_cmd.subprocess.run')
+    @mock.patch('core.keystone.select_auth_url', side_effect=lambda env: env)
+    @mock.patch('core.keystone.fail_over')
+    def test_report_retries_on_alternate_auth_url(self, m_fail_over, m_select, m_run, *_):
+        env = {'OS_AUTH_URL': 'http://vip-a/v3', 'OSSC_AUTH_URLS': 'http://vip-b/v3', 'OS_PROJECT_ID': 'p1'}
+        profiles = {'profiles': {'dev': {'catalogs': {'app': env}}}}
+        m_fail_over.side_effect = lambda env, tried: dict(env, OS_AUTH_URL='http://vip-b/v3')
+        m_run.side_effect = child_run([
+            SimpleNamespace(returncode=1, stdout='partial\n', stderr='Unable to establish connection\n'),
+            SimpleNamespace(returncode=0, stdout='OK\n', stderr=''),
+        ])
+        args = SimpleNamespace(out=str(Path(self.td.name) / 'outf'), format='table', profile=None, catalog=None)
+        with mock.patch('core.commands.report_cmd.load_profiles_config', return_value=(profiles, Path('x'), False)):
+            self.assertEqual(report_cmd.handle(args, Path('.')), 0)
+        self.assertEqual([c.kwargs['env']['OS_AUTH_URL'] for c in m_run.call_args_list],
+                         ['http://vip-a/v3', 'http://vip-b/v3'])
+        content = (Path(args.out) / 'dev' / 'app' / 'report.txt').read_text(encoding='utf-8')
+        # The failed attempt's output is dropped from the streamed report
+        self.assertTrue(content.endswith('\n\nOK\n'))
+        self.assertEqual(content.count('# Report: server list'), 1)
+
+    @mock.patch('core.commands.report_cmd.resolve_username', return_value='user')
+    @mock.patch('core.commands.report_cmd.resolve_password', return_value='pass')
+    @mock.patch('core.commands.report_cmd.ensure_openstack_available', side_effect=lambda root, env: (env, '/bin/openstack'))
+    @mock.patch('core.commands.report_cmd.subprocess.run')
+    def test_report_dedupes_identical_envs(self, m_run, *_):
+        same = {'OS_AUTH_URL': 'http://k/v3', 'OS_PROJECT_ID': 'p1'}
+        profiles = {'profiles': {
+            'dev': {'catalogs': {'app': dict(same), 'app-alias': dict(same)}},
+            'prod': {'catalogs': {'net': {'OS_AUTH_URL': 'http://k/v3', 'OS_PROJECT_ID': 'p2'}}},
+        }}
+        m_run.side_effect = child_run(SimpleNamespace(returncode=0, stdout='OK\n', stderr=''))
+        args = SimpleNamespace(out=str(Path(self.td.name) / 'outd'), format='table', profile=None, catalog=None)
+        with mock.patch('core.commands.report_cmd.load_profiles_config', return_value=(profiles, Path('x'), False)):
+            self.assertEqual(report_cmd.handle(args, Path('.')), 0)
+        self.assertEqual(m_run.call_count, 2)
+        alias = (Path(args.out) / 'dev' / 'app-alias' / 'report.txt').read_text(encoding='utf-8')
+        self.assertIn('# Catalog: app-alias', alias)
+        self.assertIn('# Deduplicated: same query as dev/app', alias)
+        self.assertIn('OK', alias)
+
+    def test_shard_of_a_group_does_not_depend_on_its_members(self):
+        def owners(tasks):
+            owned = {}
+            for index in range(1, 5):
+                with mock.patch('core.commands.report_cmd.task_env', side_effect=lambda args, p, c, env, d: env):
+                    groups = report_cmd.plan_groups(SimpleNamespace(), Path(self.td.name), tasks, (index, 4))
+                owned.update({(p, c): index for members in groups.values() for p, c, _, _ in members})
+            return owned
+
+        tasks = [('p', 'c%02d' % i, {'OS_PROJECT_ID': str(i), 'OS_PASSWORD': 'pw'}, {}) for i in range(40)]
+        before = owners(tasks)
+        self.assertEqual(len(before), 40)
+        # A new catalog that sorts first joins a group; a rotated password changes no shard
+        joined = [('a', 'first', {'OS_PROJECT_ID': str(i), 'OS_PASSWORD': 'new'}, {}) for i in range(40)]
+        rotated = [(p, c, dict(env, OS_PASSWORD='new'), d) for p, c, env, d in tasks]
+        after = owners(rotated + joined)
+        self.assertEqual({k: v for k, v in after.items() if k[0] == 'p'}, before)
+
+    @mock.patch('core.commands.report_cmd.resolve_username', return_value='user')
+    @mock.patch('core.commands.report_cmd.ensure_openstack_available', side_effect=lambda root, env: (env, '/bin/openstack'))
+    @mock.patch('core.commands.report_cmd.subprocess.run')
+    def test_report_ignores_os_vars_exported_for_another_catalog(self, m_run, *_):
+        profiles = {'profiles': {
+            'dev': {'password': 'dev-pw', 'catalogs': {
+                'app': {'OS_AUTH_URL': 'http://k/v3', 'OS_PROJECT_ID': 'p1'},
+                'app-alias': {'OS_AUTH_URL': 'http://k/v3', 'OS_PROJECT_ID': 'p1'},
+            }},
+        }}
+        # Left behind by `eval "$(ossc -p prod -c net env)"`
+        os.environ.update(OSSC_PROFILE='prod', OSSC_CATALOG='net', OS_PASSWORD='prod-pw', OS_REGION_NAME='prod-r')
+        m_run.side_effect = child_run(SimpleNamespace(returncode=0, stdout='OK\n', stderr=''))
+        args = SimpleNamespace(out=str(Path(self.td.name) / 'oute'), format='table', profile=None, catalog=None)
+        with mock.patch('core.commands.report_cmd.load_profiles_config', return_value=(profiles, Path('x'), False)):
+            self.assertEqual(report_cmd.handle(args, Path('.')), 0)
+        self.assertEqual(m_run.call_count, 1)
+        env = m_run.call_args.kwargs['env']
+        self.assertEqual(env['OS_PASSWORD'], 'dev-pw')
+        self.assertNotIn('OS_REGION_NAME', env)
+
+        # Exported for one of the catalogs: that catalog keeps them, as the proxy does
+        os.environ.update(OSSC_PROFILE='dev', OSSC_CATALOG='app')
+        m_run.reset_mock()
+        with mock.patch('core.commands.report_cmd.load_profiles_config', return_value=(profiles, Path('x'), False)):
+            self.assertEqual(report_cmd.handle(args, Path('.')), 0)
+        self.assertEqual(sorted(c.kwargs['env']['OS_PASSWORD'] for c in m_run.call_args_list), ['dev-pw', 'prod-pw'])
+
+    @mock.patch('core.commands.report_cmd.resolve_username', return_value='user')
+    @mock.patch('core.commands.report_cmd.resolve_password', return_value='pass')
+    @mock.patch('core.commands.report_cmd.ensure_openstack_available', side_effect=lambda root, env: (env, '/bin/openstack'))
+    @mock.patch('core.commands.report_cmd.subprocess.run')
+    def test_report_child_profile_header_only_where_profiled(self, m_run, *_):
+        same = {'OS_AUTH_URL': 'http://k/v3', 'OS_PROJECT_ID': 'p1'}
+        profiles = {'profiles': {'dev': {'catalogs': {'app': dict(same), 'app-alias': dict(same)}}}}
+        m_run.side_effect = child_run(SimpleNamespace(returncode=0, stdout='OK\n', stderr=''))
+        out = Path(self.td.name) / 'outp'
+        args = SimpleNamespace(out=str(out), format='table', profile=None, catalog=None, profile_child='cprofile')
+        with mock.patch('core.commands.report_cmd.load_profiles_config', return_value=(profiles, Path('x'), False)):
+            self.assertEqual(report_cmd.handle(args, Path('.')), 0)
+        self.assertEqual(m_run.call_count, 1)
+        self.assertIn('# Child profile: cprofile', (out / 'dev' / 'app' / 'report.txt').read_text(encoding='utf-8'))
+        self.assertNotIn('# Child profile', (out / 'dev' / 'app-alias' / 'report.txt').read_text(encoding='utf-8'))
+
+    @mock.patch('core.commands.report_cmd.resolve_username', return_value='user')
+    @mock.patch('core.commands.report_cmd.resolve_password', return_value='pass')
+    @mock.patch('core.commands.report_cmd.ensure_openstack_available', side_effect=lambda root, env: (env, '/bin/openstack'))
+    @mock.patch('core.commands.report_cmd.subprocess.run')
+    @mock.patch('core.keystone.authenticate')
+    def test_report_rescope_authenticates_once_per_identity(self, m_auth, m_run, *_):
+        cats = {name: {'OS_AUTH_URL': 'http://k/v3', 'OS_PROJECT_ID': name} for name in ('a', 'b', 'c')}
+        profiles = {'profiles': {
+            'dev': {'catalogs': cats},
+            'solo': {'catalogs': {'x': {'OS_AUTH_URL': 'http://other/v3', 'OS_PROJECT_ID': 'x'}}},
+        }}
+        m_auth.return_value = {'id': 'unscoped-tok', 'expires_at': '2999-01-01T00:00:00Z'}
+        m_run.side_effect = child_run(SimpleNamespace(returncode=0, stdout='OK\n', stderr=''))
+        args = SimpleNamespace(out=str(Path(self.td.name) / 'outr'), format='table', profile=None, catalog=None,
+                               rescope=True)
+        with mock.patch('core.commands.report_cmd.load_profiles_config', return_value=(profiles, Path('x'), False)):
+            self.assertEqual(report_cmd.handle(args, Path('.')), 0)
+        m_auth.assert_called_once()
+        self.assertFalse(m_auth.call_args[1]['scoped'])
+        envs = {c[1]['env'].get('OS_PROJECT_ID'): c[1]['env'] for c in m_run.call_args_list}
+        for name in ('a', 'b', 'c'):
+            self.assertEqual(envs[name]['OS_AUTH_TYPE'], 'v3token')
+            self.assertEqual(envs[name]['OS_TOKEN'], 'unscoped-tok')
+            self.assertNotIn('OS_PASSWORD', envs[name])
+        # a single catalog on its identity keeps plain password auth
+        self.assertEqual(envs['x']['OS_PASSWORD'], 'pass')
+        self.assertNotIn('OS_TOKEN', envs['x'])
+
+        m_auth.reset_mock()
+        m_auth.side_effect = report_cmd.keystone.KeystoneError('HTTP 401: nope')
+        m_run.reset_mock()
+        with mock.patch('core.commands.report_cmd.load_profiles_config', return_value=(profiles, Path('x'), False)):
+            self.assertEqual(report_cmd.handle(args, Path('.')), 0)
+        m_auth.assert_called_once()
+        self.assertTrue(all(c[1]['env']['OS_PASSWORD'] == 'pass' for c in m_run.call_args_list))
+        content = (Path(args.out) / 'dev' / 'b' / 'report.txt').read_text(encoding='utf-8')
+        self.assertIn('# Auth: password (shared token unavailable: HTTP 401: nope)', content)
+
+    @mock.patch('core.commands.report_cmd.resolve_username', return_value='user')
+    @mock.patch('core.commands.report_cmd.resolve_password', return_value='pass')
+    @mock.patch('core.commands.report_cmd.ensure_openstack_available', side_effect=lambda root, env: (env, '/bin/openstack'))
+    @mock.patch('core.commands.report_cmd.subprocess.run')
+    def test_report_summary_files(self, m_run, *_):
+        profiles = {'profiles': {'dev': {'catalogs': {
+            'app': {'OS_AUTH_URL': 'u', 'OS_PROJECT_ID': 'a'},
+            'net': {'OS_AUTH_URL': 'u', 'OS_PROJECT_ID': 'n'},
+        }}}}
+        outputs = {
+            'a': '[{"ID": "1", "Status": "ACTIVE", "Flavor Name": "m1", "Availability Zone": "az1"},'
+                 ' {"ID": "2", "Status": "ERROR", "Flavor Name": "m1", "Availability Zone": "az1"}]',
+            'n': '[{"ID": "3", "Status": "ACTIVE", "Flavor Name": "m2", "Availability Zone": "az2"}]',
+        }
+        m_run.side_effect = child_run(lambda cmd, env: SimpleNamespace(
+            returncode=0, stdout=outputs[env['OS_PROJECT_ID']], stderr=''))
+        args = SimpleNamespace(out=str(Path(self.td.name) / 'outs'), format='json', profile=None, catalog=None,
+                               summary=True)
+        with mock.patch('core.commands.report_cmd.load_profiles_config', return_value=(profiles, Path('x'), False)):
+            with mock.patch('sys.stdout', new=io.StringIO()):
+                self.assertEqual(report_cmd.handle(args, Path('.')), 0)
+        self.assertIn('--long', m_run.call_args[0][0])
+        data = json.loads((Path(args.out) / 'summary.json').read_text(encoding='utf-8'))
+        self.assertEqual(data['total']['servers'], 3)
+        self.assertEqual(data['total']['status'], {'ACTIVE': 2, 'ERROR': 1})
+        self.assertEqual(data['catalogs']['dev/app']['flavor'], {'m1': 2})
+        self.assertTrue((Path(args.out) / 'summary.md').exists())
+
+        args.format = 'value'
+        with mock.patch('core.commands.report_cmd.load_profiles_config', return_value=(profiles, Path('x'), False)):
+            with mock.patch('sys.stdout', new=io.StringIO()):
+                self.assertEqual(report_cmd.handle(args, Path('.')), 2)
+
+    @mock.patch('core.commands.report_cmd.resolve_username', return_value='user')
+    @mock.patch('core.commands.report_cmd.resolve_password', return_value='pass')
+    @mock.patch('core.commands.report_cmd.ensure_openstack_available', side_effect=lambda root, env: (env, '/bin/openstack'))
+    @mock.patch('core.commands.report_cmd.subprocess.run')
+    def test_report_incremental(self, m_run, *_):
+        profiles = {'profiles': {'dev': {'catalogs': {'app': {'OS_AUTH_URL': 'u', 'OS_PROJECT_ID': 'a'}}}}}
+        args = SimpleNamespace(out=str(Path(self.td.name) / 'outs'), format='json', profile=None, catalog=None,
+                               incremental=True, columns='Name')
+
+        def run(stdout):
+            m_run.side_effect = child_run(SimpleNamespace(returncode=0, stdout=stdout, stderr=''))
+            with mock.patch('core.commands.report_cmd.load_profiles_config', return_value=(profiles, Path('x'), False)):
+                with mock.patch('sys.stdout', new=io.StringIO()):
+                    self.assertEqual(report_cmd.handle(args, Path('.')), 0)
+            return (Path(args.out) / 'dev' / 'app' / 'report.txt').read_text(encoding='utf-8')
+
+        content = run('[{"Name": "a", "ID": "1", "Status": "ACTIVE"}, {"Name": "b", "ID": "2", "Status": "ACTIVE"}]')
+        cmd = m_run.call_args[0][0]
+        self.assertEqual(cmd[-7:], ['-c', 'Name', '-c', 'ID', '-c', 'Status', '--no-name-lookup'])
+        self.assertIn('# Incremental: full sync, 2 server(s)', content)
+
+        content = run('[{"Name": "b", "ID": "2", "Status": "DELETED"}, {"Name": "c", "ID": "3", "Status": "BUILD"}]')
+        self.assertIn('--changes-since', m_run.call_args[0][0])
+        self.assertIn('# Incremental: 1 changed, 1 deleted since', content)
+        self.assertEqual(json.loads(content.split('\n\n', 1)[1]), [{'Name': 'a'}, {'Name': 'c'}])
+
+        m_run.reset_mock()
+        args.full_sync = True
+        run('[]')
+        self.assertNotIn('--changes-since', m_run.call_args[0][0])
+
+        args.filter = ['status=ACTIVE']
+        with mock.patch('core.commands.report_cmd.load_profiles_config', return_value=(profiles, Path('x'), False)):
+            with mock.patch('sys.stdout', new=io.StringIO()):
+                self.assertEqual(report_cmd.handle(args, Path('.')), 2)
+
     def test_report_filter_errors(self):
         profiles = {'profiles': {'dev': {'catalogs': {}}}}
 
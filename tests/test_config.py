@@ -25,6 +25,14 @@ class TestConfig(unittest.TestCase):
         self.assertTrue(str(p).startswith(self.td.name))
         self.assertTrue(str(p).endswith('ossc/profiles.json'))
 
+    def test_caller_environ_drops_os_vars_exported_for_another_catalog(self):
+        environ = {'OS_PASSWORD': 'pw', 'PATH': '/bin'}
+        self.assertEqual(config.caller_environ('dev', 'app', environ), environ)
+        environ.update(OSSC_PROFILE='dev', OSSC_CATALOG='app')
+        self.assertEqual(config.caller_environ('dev', 'app', environ), environ)
+        self.assertEqual(config.caller_environ('dev', 'other', environ),
+                         {'PATH': '/bin', 'OSSC_PROFILE': 'dev', 'OSSC_CATALOG': 'app'})
+
     def test_load_profiles_config_empty(self):
         data, path, _ = config.load_profiles_config(Path('.'))
         self.assertEqual(data, {})
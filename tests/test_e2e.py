@@ -0,0 +1,596 @@
+"""End-to-end tests against the hermetic fake cloud in tests.fakeos.
+
+Nothing is mocked: `ossc report` spawns real child processes that
+authenticate and list servers over HTTP. By default the child is the
+stand-in CLI from tests.fake_openstack; the last test uses the real
+python-openstackclient when it is installed.
+"""
+import hashlib
+import io
+import json
+import os
+import shlex
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+import urllib.request
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+from core import api, respcache
+from core.commands import bulk_cmd, config_cmd, image_cmd, report_cmd, serve_cmd, wait_cmd
+from core.inventory import Inventory, make_server
+from tests import fake_openstack
+from tests.fakeos import FakeOpenStack
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+class E2EBase(unittest.TestCase):
+    # Each catalog spawns a fake `openstack` child; OSSC_E2E_CATALOGS=200 runs the full scale
+    catalogs = int(os.environ.get('OSSC_E2E_CATALOGS', '40'))
+    cloud_kwargs = {}
+
+    def setUp(self):
+        self._env = os.environ.copy()
+        self.td = tempfile.TemporaryDirectory()
+        for key in list(os.environ):
+            if key.startswith(("OS_", "OSS_")):
+                del os.environ[key]
+        os.environ['XDG_CONFIG_HOME'] = self.td.name
+        self.cloud = FakeOpenStack(**self.cloud_kwargs).start()
+        self.addCleanup(self.cloud.stop)
+        self.out = Path(self.td.name) / 'out'
+
+    def tearDown(self):
+        os.environ.clear()
+        os.environ.update(self._env)
+        self.td.cleanup()
+
+    def use_fake_cli(self):
+        bin_dir = fake_openstack.install(Path(self.td.name) / 'bin')
+        os.environ['PATH'] = str(bin_dir.parent) + os.pathsep + os.environ.get('PATH', '')
+
+    def write_profiles(self, count, password='secret'):
+        catalogs = {}
+        for i in range(count):
+            env = self.cloud.catalog_env('proj-%03d' % i)
+            env.pop('OS_PASSWORD')
+            catalogs['cat%03d' % i] = env
+        cfg_file = Path(self.td.name) / 'ossc' / 'profiles.json'
+        cfg_file.parent.mkdir(parents=True, exist_ok=True)
+        cfg_file.write_text(json.dumps({'profiles': {'load': {'password': password, 'catalogs': catalogs}}}))
+
+    def report(self, **kwargs):
+        args = SimpleNamespace(out=str(self.out), format='json', profile=None, catalog=None,
+                               username=None, password=None, summary=True)
+        for key, value in kwargs.items():
+            setattr(args, key, value)
+        with mock.patch('sys.stdout', new=io.StringIO()):
+            return report_cmd.handle(args, REPO_ROOT)
+
+    def summary(self):
+        return json.loads((self.out / 'summary.json').read_text())
+
+
+class TestReportFakeCloud(E2EBase):
+    cloud_kwargs = {'servers_per_project': 5, 'latency': {'identity': 0.002, 'compute': 0.005}}
+
+    def test_report_many_catalogs(self):
+        self.use_fake_cli()
+        self.write_profiles(self.catalogs)
+        started = time.monotonic()
+        code = self.report()
+        self.assertLess(time.monotonic() - started, 60)
+        self.assertEqual(code, 0)
+        summary = self.summary()
+        self.assertEqual(len(summary['catalogs']), self.catalogs)
+        self.assertEqual(summary['total']['servers'], 5 * self.catalogs)
+        report = (self.out / 'load' / 'cat007' / 'report.txt').read_text()
+        self.assertIn('proj-007-vm-004', report)
+        self.assertNotIn('proj-008', report)
+
+    def test_report_rescope_shares_one_password_auth(self):
+        self.use_fake_cli()
+        self.write_profiles(20)
+        with mock.patch.object(report_cmd.keystone, 'authenticate', wraps=report_cmd.keystone.authenticate) as m_auth:
+            code = self.report(rescope=True)
+        self.assertEqual(code, 0)
+        self.assertEqual(m_auth.call_count, 1)
+        self.assertIn('shared unscoped token', (self.out / 'load' / 'cat003' / 'report.txt').read_text())
+        self.assertEqual(self.summary()['total']['servers'], 100)
+
+    def test_report_bad_password_fails_every_catalog(self):
+        self.use_fake_cli()
+        self.write_profiles(5, password='wrong')
+        self.assertEqual(self.report(), 1)
+        self.assertIn('HTTP 401', (self.out / 'load' / 'cat000' / 'report.txt').read_text())
+
+    def test_large_paginated_payload(self):
+        self.cloud.servers_per_project = 2500
+        self.cloud.payload_bytes = 512
+        self.use_fake_cli()
+        self.write_profiles(1)
+        self.assertEqual(self.report(), 0)
+        summary = self.summary()
+        self.assertEqual(summary['total']['servers'], 2500)
+        self.assertEqual(sum(summary['total']['status'].values()), 2500)
+
+    def test_incremental_report_fetches_only_changes(self):
+        self.cloud.servers_per_project = 500
+        self.use_fake_cli()
+        self.write_profiles(3)
+        self.assertEqual(self.report(incremental=True), 0)
+        full_bytes = self.cloud.bytes_sent['compute']
+
+        servers = list(self.cloud.servers('proj-001'))
+        self.cloud.set_status('proj-001', servers[0], 'SHUTOFF')
+        self.cloud.delete_server('proj-001', servers[1])
+        added = self.cloud.add_server('proj-001', 'fresh-vm', status='BUILD')
+        self.assertEqual(self.report(incremental=True), 0)
+        delta_bytes = self.cloud.bytes_sent['compute'] - full_bytes
+        self.assertLess(delta_bytes * 50, full_bytes)
+
+        report = (self.out / 'load' / 'cat001' / 'report.txt').read_text()
+        self.assertIn('# Incremental: 2 changed, 1 deleted since', report)
+        rows = {r['ID']: r for r in json.loads(report.split('\n\n', 1)[1])}
+        self.assertEqual(len(rows), 500)
+        self.assertEqual(rows[servers[0]]['Status'], 'SHUTOFF')
+        self.assertNotIn(servers[1], rows)
+        self.assertEqual(rows[added['id']]['Name'], 'fresh-vm')
+        self.assertEqual(self.summary()['total']['servers'], 1500)
+
+
+class TestReportResume(E2EBase):
+    cloud_kwargs = {'servers_per_project': 5}
+
+    def test_resume_reruns_only_unfinished_and_failed(self):
+        self.use_fake_cli()
+        self.write_profiles(20)
+        self.assertEqual(self.report(), 0)
+        self.assertEqual(self.cloud.requests['identity'], 20)
+
+        # Crash after 15 reports; one of them failed, and one report file was damaged
+        journal_file = self.out / 'run.journal'
+        lines = journal_file.read_text().splitlines()
+        failed = json.loads(lines[6])
+        self.assertEqual(failed['name'], 'load/cat005')
+        failed['code'] = 1
+        journal_file.write_text('\n'.join(lines[:6] + [json.dumps(failed)] + lines[7:16]) + '\n')
+        (self.out / 'load' / 'cat003' / 'report.txt').write_text('partial')
+
+        with mock.patch('sys.stdout', new=io.StringIO()) as buf:
+            args = SimpleNamespace(out=str(self.out), format='json', profile=None, catalog=None,
+                                   username=None, password=None, summary=True, resume=True)
+            self.assertEqual(report_cmd.handle(args, REPO_ROOT), 0)
+        self.assertIn('reused 13 completed report(s), ran 7', buf.getvalue())
+        self.assertEqual(self.cloud.requests['identity'], 27)
+        self.assertIn('proj-003-vm-000', (self.out / 'load' / 'cat003' / 'report.txt').read_text())
+        self.assertEqual(self.summary()['total']['servers'], 100)
+        self.assertEqual(len(self.summary()['catalogs']), 20)
+
+        self.assertEqual(self.report(resume=True, format='table'), 2)
+
+
+class TestReportSchedule(E2EBase):
+    cloud_kwargs = {'servers_per_project': 2}
+
+    def test_longest_expected_catalogs_start_first(self):
+        self.use_fake_cli()
+        self.write_profiles(8)
+        self.out.mkdir(parents=True)
+        history = {'load/cat005': {'seconds': 100, 'runs': 3}, 'load/cat002': {'seconds': 50, 'runs': 3}}
+        history.update({'load/cat00%d' % i: {'seconds': 1, 'runs': 3} for i in (0, 1, 3)})
+        (self.out / 'durations.json').write_text(json.dumps(history))
+
+        self.assertEqual(self.report(jobs=2), 0)
+        journal = [json.loads(line) for line in (self.out / 'run.journal').read_text().splitlines()[1:]]
+        self.assertEqual([r['name'] for r in journal[:2]], ['load/cat005', 'load/cat002'])
+        plan = self.summary()['schedule']
+        self.assertEqual((plan['queries'], plan['workers'], plan['without_history']), (8, 2, 3))
+        # cat005 alone on one worker; the rest, with unknowns at the median (1s), on the other
+        self.assertEqual(plan['predicted_makespan'], 100)
+        self.assertLess(plan['actual_makespan'], 60)
+
+        durations = json.loads((self.out / 'durations.json').read_text())
+        self.assertEqual(len(durations), 8)
+        self.assertEqual(durations['load/cat005']['runs'], 4)
+        self.assertLess(durations['load/cat005']['seconds'], 60)
+
+
+class TestReportAuthFailover(E2EBase):
+    cloud_kwargs = {'servers_per_project': 2}
+
+    def test_dead_primary_auth_url_is_skipped(self):
+        self.use_fake_cli()
+        os.environ['XDG_CACHE_HOME'] = str(Path(self.td.name) / 'cache')
+        dead = 'http://127.0.0.1:1/identity/v3'
+        self.write_profiles(6)
+        cfg_file = Path(self.td.name) / 'ossc' / 'profiles.json'
+        cfg = json.loads(cfg_file.read_text())
+        for env in cfg['profiles']['load']['catalogs'].values():
+            env['OSSC_AUTH_URLS'] = env['OS_AUTH_URL']
+            env['OS_AUTH_URL'] = dead
+        cfg_file.write_text(json.dumps(cfg))
+
+        self.assertEqual(self.report(), 0)
+        self.assertEqual(self.summary()['total']['servers'], 12)
+        health = json.loads((Path(self.td.name) / 'cache' / 'ossc' / 'auth-urls.json').read_text())
+        self.assertFalse(health[dead]['ok'])
+        self.assertTrue(health[self.cloud.auth_url]['ok'])
+        # Probed once up front, not once per catalog
+        self.assertEqual(health[dead]['failures'], 1)
+
+
+class TestReportForkExecutor(E2EBase):
+    cloud_kwargs = {'servers_per_project': 3}
+
+    def reports(self):
+        texts = {}
+        for path in sorted(self.out.rglob('report.txt')):
+            texts[path.relative_to(self.out).as_posix()] = ''.join(
+                line for line in path.read_text().splitlines(True) if not line.startswith('# Time:'))
+        return texts
+
+    def test_forked_children_write_identical_reports(self):
+        self.use_fake_cli()
+        for password, code in (('secret', 0), ('wrong', 1)):
+            self.write_profiles(12, password=password)
+            results = {}
+            for executor in ('subprocess', 'fork'):
+                shutil.rmtree(self.out, ignore_errors=True)
+                results[executor] = (self.report(executor=executor, jobs=4), self.reports())
+            self.assertEqual(results['fork'], results['subprocess'])
+            self.assertEqual(results['fork'][0], code)
+            self.assertEqual(len(results['fork'][1]), 12)
+        self.assertIn('HTTP 401', results['fork'][1]['load/cat000/report.txt'])
+
+
+class TestReportMetrics(E2EBase):
+    cloud_kwargs = {'servers_per_project': 6}
+
+    def test_metrics_file_tracks_durations_failures_and_counts(self):
+        self.use_fake_cli()
+        prom = Path(self.td.name) / 'textfile' / 'ossc.prom'
+        prom.parent.mkdir()
+        self.write_profiles(5)
+        self.assertEqual(self.report(metrics_file=str(prom)), 0)
+        text = prom.read_text()
+        self.assertIn('ossc_report_run_exit_code 0\n', text)
+        self.assertIn('ossc_report_catalogs{result="ok"} 5\n', text)
+        self.assertIn('ossc_report_query_duration_seconds_count 5\n', text)
+        servers = [line for line in text.splitlines() if line.startswith('ossc_report_catalog_servers{')]
+        self.assertEqual(sum(int(line.rsplit(' ', 1)[1]) for line in servers), 30)
+        self.assertIn('ossc_report_catalog_duration_seconds{profile="load",catalog="cat004",region=""}', text)
+
+        self.write_profiles(5, password='wrong')
+        self.assertEqual(self.report(metrics_file=str(prom)), 1)
+        text = prom.read_text()
+        self.assertIn('ossc_report_catalogs{result="failed"} 5\n', text)
+        self.assertIn('ossc_report_catalog_exit_code{profile="load",catalog="cat000",region=""} 1\n', text)
+        self.assertNotIn('ossc_report_catalog_servers{', text)
+        self.assertEqual(os.listdir(prom.parent), ['ossc.prom'])
+
+
+class TestReportShards(E2EBase):
+    cloud_kwargs = {'servers_per_project': 3}
+
+    def test_shards_merge_into_one_tree(self):
+        self.use_fake_cli()
+        self.write_profiles(30)
+        outs = [Path(self.td.name) / ('shard-%d' % i) for i in (1, 2, 3)]
+        for i, out in enumerate(outs, 1):
+            self.assertEqual(self.report(out=str(out), shard='%d/3' % i), 0)
+        per_shard = [len(json.loads((out / 'shard.json').read_text())['catalogs']) for out in outs]
+        self.assertEqual(sum(per_shard), 30)
+        self.assertTrue(all(per_shard))
+        self.assertEqual(self.cloud.requests['identity'], 30)
+
+        args = SimpleNamespace(report_action='merge', inputs=[str(o) for o in reversed(outs)], out=str(self.out))
+        with mock.patch('sys.stdout', new=io.StringIO()) as buf:
+            self.assertEqual(report_cmd.handle(args, REPO_ROOT), 0)
+        self.assertIn('Merged 3 shard(s): 30 report(s), 0 failed', buf.getvalue())
+        self.assertEqual(len(list(self.out.glob('load/*/report.txt'))), 30)
+        self.assertEqual(self.summary()['total']['servers'], 90)
+        self.assertEqual(len(self.summary()['catalogs']), 30)
+        self.assertEqual(json.loads((self.out / 'shards.json').read_text())['exit_code'], 0)
+
+        args.inputs = [str(outs[0]), str(outs[2])]
+        with mock.patch('sys.stdout', new=io.StringIO()) as buf:
+            self.assertEqual(report_cmd.handle(args, REPO_ROOT), 2)
+        self.assertIn('Missing shard(s) of 3: 2', buf.getvalue())
+
+
+class TestReportRegions(E2EBase):
+    cloud_kwargs = {'regions': ('r1', 'r2', 'r3'), 'servers_per_project': 4}
+
+    def test_regions_fan_out_with_one_auth_per_catalog(self):
+        self.use_fake_cli()
+        self.write_profiles(10)
+        with mock.patch.object(report_cmd.keystone, 'authenticate', wraps=report_cmd.keystone.authenticate) as m_auth:
+            self.assertEqual(self.report(regions='all'), 0)
+        self.assertEqual(m_auth.call_count, 10)
+        summary = self.summary()
+        self.assertEqual(len(summary['catalogs']), 30)
+        self.assertEqual(summary['total']['servers'], 120)
+        report = (self.out / 'load' / 'cat004' / 'r2' / 'report.txt').read_text()
+        self.assertIn('# Region: r2', report)
+        self.assertIn('proj-004-vm-003', report)
+
+        self.assertEqual(self.report(regions='r3,r7', profile='load', catalog='cat001'), 2)
+        self.assertIn('Region not found in service catalog: r7',
+                      (self.out / 'load' / 'cat001' / 'r7' / 'report.txt').read_text())
+
+
+class TestReportThrottledCloud(E2EBase):
+    cloud_kwargs = {'throttle_rate': {'compute': 0.3}, 'error_rate': {'compute': 0.1}, 'seed': 7}
+
+    def test_faults_are_reported_per_catalog(self):
+        self.use_fake_cli()
+        self.write_profiles(40)
+        self.assertEqual(self.report(), 1)
+        catalogs = self.summary()['catalogs']
+        failed = [name for name, entry in catalogs.items() if entry['exit_code']]
+        self.assertTrue(0 < len(failed) < 40)
+        text = (self.out / failed[0] / 'report.txt').read_text()
+        self.assertRegex(text, r'\[exit=1\] stderr:\n(Too many requests|Injected failure)')
+
+
+class TestConfigCheckFakeCloud(E2EBase):
+    cloud_kwargs = {'latency': {'identity': 0.05}}
+
+    def test_check_hundreds_of_catalogs_concurrently(self):
+        self.write_profiles(300)
+        args = SimpleNamespace(cfg_cmd='check', profile=None, catalog=None, username=None, password=None,
+                               jobs=64, timeout=10, format='json')
+        buf = io.StringIO()
+        started = time.monotonic()
+        with mock.patch('sys.stdout', new=buf):
+            code = config_cmd.handle(args, REPO_ROOT)
+        # 300 x 50ms sequentially would take 15s
+        self.assertLess(time.monotonic() - started, 5)
+        results = json.loads(buf.getvalue())
+        self.assertEqual(code, 0, [r for r in results if r['status'] != 'ok'][:3])
+        self.assertEqual(len(results), 300)
+        self.assertEqual({r['status'] for r in results}, {'ok'})
+        self.assertEqual(self.cloud.requests['identity'], 300)
+
+
+class TestServeHttpFakeCloud(E2EBase):
+    cloud_kwargs = {'servers_per_project': 5, 'latency': {'compute': 0.01}}
+
+    def test_inventory_serves_all_catalogs_from_one_fetch_each(self):
+        self.use_fake_cli()
+        self.write_profiles(30)
+        session = api.Session(REPO_ROOT)
+        inventory = Inventory(serve_cmd.session_fetch(session), session.catalogs(), ttl=300, jobs=8).start()
+        server = make_server(inventory, '127.0.0.1', 0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(inventory.stop)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        base = 'http://127.0.0.1:%d' % server.server_address[1]
+
+        for _ in range(3):
+            with urllib.request.urlopen(base + '/summary', timeout=30) as resp:
+                summary = json.loads(resp.read())
+        self.assertEqual(summary['total']['servers'], 150)
+        with urllib.request.urlopen(base + '/catalogs/load/cat012/servers', timeout=30) as resp:
+            servers = json.loads(resp.read())['servers']
+        self.assertEqual(sorted(s['Name'] for s in servers)[0], 'proj-012-vm-000')
+        self.assertEqual(self.cloud.requests['identity'], 30)
+
+
+class TestBulkFakeCloud(E2EBase):
+    cloud_kwargs = {'servers_per_project': 300, 'latency': {'compute': 0.02}, 'error_rate': {'compute': 0.05}}
+
+    def bulk(self, action, **kwargs):
+        args = SimpleNamespace(action=action, profile='load', catalog='cat000', username=None, password=None,
+                               file=None, filter=[], tag=None, jobs=32, retries=5, timeout=10, failed_out=None,
+                               yes=True)
+        for key, value in kwargs.items():
+            setattr(args, key, value)
+        buf = io.StringIO()
+        with mock.patch('sys.stdout', new=buf), mock.patch('sys.stderr', new=io.StringIO()), \
+                mock.patch('core.bulk.random.uniform', return_value=0.001):
+            code = bulk_cmd.handle(args, REPO_ROOT)
+        return code, buf.getvalue()
+
+    def test_bulk_stop_by_filter_with_one_token(self):
+        self.write_profiles(1)
+        servers = self.cloud.servers('proj-000')
+        active = [s['id'] for s in servers.values() if s['status'] == 'ACTIVE']
+        started = time.monotonic()
+        code, out = self.bulk('stop', filter=['status=ACTIVE'])
+        # 150 x 20ms one at a time would take 3s; transient 500s are retried
+        self.assertLess(time.monotonic() - started, 3)
+        self.assertEqual(code, 0, out)
+        self.assertIn('stop: %d ok, 0 failed' % len(active), out)
+        self.assertEqual({servers[sid]['status'] for sid in active}, {'SHUTOFF'})
+        self.assertEqual(self.cloud.requests['identity'], 1)
+
+    def test_bulk_delete_writes_refeedable_manifest(self):
+        self.write_profiles(1)
+        servers = self.cloud.servers('proj-000')
+        ids = sorted(servers)[:20]
+        targets = Path(self.td.name) / 'targets.txt'
+        targets.write_text('\n'.join(ids + ['proj-000-vm-299', 'no-such-vm']) + '\n')
+        failed = Path(self.td.name) / 'failed.txt'
+
+        code, out = self.bulk('delete', file=str(targets), dry_run=True)
+        self.assertEqual(code, 0)
+        self.assertIn('Would delete 21 server(s) in load/cat000', out)
+        self.assertNotIn('DELETED', {s['status'] for s in servers.values()})
+
+        code, out = self.bulk('delete', file=str(targets), failed_out=str(failed))
+        self.assertEqual(code, 1)
+        self.assertIn('delete: 21 ok, 1 failed', out)
+        self.assertEqual(sum(1 for s in servers.values() if s['status'] == 'DELETED'), 21)
+        self.assertIn('no-such-vm  # no server with this name', failed.read_text())
+        self.assertIn('--file %s' % shlex.quote(str(failed)), out)
+
+        # Deleted IDs count as done; the deleted name no longer resolves
+        code, out = self.bulk('delete', file=str(targets), failed_out=str(failed))
+        self.assertEqual(code, 1)
+        self.assertIn('delete: 20 ok, 2 failed', out)
+
+    def test_bulk_tag_is_quoted_and_checked(self):
+        self.write_profiles(1)
+        servers = self.cloud.servers('proj-000')
+        code, out = self.bulk('tag', tag='expired 2026?#%', filter=['name=proj-000-vm-00'])
+        self.assertEqual(code, 0, out)
+        tagged = [s for s in servers.values() if s['tags']]
+        self.assertEqual(len(tagged), 10)
+        self.assertEqual(tagged[0]['tags'], ['expired 2026?#%'])
+
+        # The printed retry command survives the shell
+        targets = Path(self.td.name) / 'targets.txt'
+        targets.write_text('no-such-vm\n')
+        failed = Path(self.td.name) / 'failed $(x).txt'
+        code, out = self.bulk('tag', tag="it's; rm", file=str(targets), failed_out=str(failed))
+        self.assertEqual(code, 1)
+        retry = shlex.split(out.splitlines()[-1])
+        self.assertEqual(retry[retry.index('--tag') + 1], "it's; rm")
+        self.assertEqual(retry[-1], str(failed))
+
+        requests = dict(self.cloud.requests)
+        code, out = self.bulk('tag', tag='a/b', filter=['name=proj-000-vm-00'])
+        self.assertEqual(code, 2)
+        self.assertIn("Tag must not contain '/'", out)
+        self.assertEqual(self.cloud.requests, requests)
+
+
+class TestWaitFakeCloud(E2EBase):
+    cloud_kwargs = {'servers_per_project': 100}
+
+    def wait(self, targets=(), **kwargs):
+        args = SimpleNamespace(profile='load', catalog='cat000', username=None, password=None, targets=list(targets),
+                               file=None, filter=[], status='ACTIVE', timeout=20, interval=0.05, max_interval=0.2,
+                               fail_fast=False, request_timeout=10, format='json')
+        for key, value in kwargs.items():
+            setattr(args, key, value)
+        buf = io.StringIO()
+        with mock.patch('sys.stdout', new=buf):
+            code = wait_cmd.handle(args, REPO_ROOT)
+        if args.format == 'table':
+            return code, buf.getvalue()
+        return code, [json.loads(line) for line in buf.getvalue().splitlines()]
+
+    def provision(self, count, final, delay=0.3):
+        servers = [self.cloud.add_server('proj-000', 'web-%02d' % i) for i in range(count)]
+
+        def settle():
+            for i, server in enumerate(servers):
+                time.sleep(delay / count)
+                self.cloud.set_status('proj-000', server['id'], final(i))
+
+        thread = threading.Thread(target=settle)
+        thread.start()
+        self.addCleanup(thread.join)
+        return servers
+
+    def test_wait_for_many_servers_with_one_listing_per_poll(self):
+        self.write_profiles(1)
+        self.provision(30, lambda i: 'ACTIVE')
+        code, events = self.wait(filter=['name=web-'])
+        self.assertEqual(code, 0, events[-1])
+        self.assertEqual(len(events[0]['servers']), 30)
+        changes = [e for e in events if e['event'] == 'change']
+        self.assertEqual(len(changes), 30)
+        self.assertEqual(changes[-1]['pending'], 0)
+        done = events[-1]
+        self.assertEqual((done['result'], set(done['servers'].values())), ('ok', {'ACTIVE'}))
+        # One request per poll, not per server and poll
+        self.assertEqual(self.cloud.requests['compute'], done['polls'])
+        self.assertLess(done['polls'], 30)
+
+    def test_error_fails_the_wait_and_names_resolve(self):
+        self.write_profiles(1)
+        servers = self.provision(5, lambda i: 'ERROR' if i == 2 else 'ACTIVE')
+        code, events = self.wait(['web-00', servers[2]['id'], 'web-04', 'no-such-vm'])
+        self.assertEqual(code, 1)
+        self.assertEqual(events[0], dict(events[0], event='skipped', target='no-such-vm'))
+        self.assertEqual(events[-1]['result'], 'failed')
+        self.assertEqual(sorted(events[-1]['servers'].values()), ['ACTIVE', 'ACTIVE', 'ERROR'])
+
+        code, out = self.wait([servers[0]['id']], status='SHUTOFF', timeout=0.3, format='table')
+        self.assertEqual(code, 1)
+        self.assertIn('Waiting for 1 server(s) in load/cat000 to be SHUTOFF: 1 ACTIVE', out)
+        self.assertIn('Timed out after 0s', out)
+        self.assertIn('1 still pending: web-00 (%s) ACTIVE' % servers[0]['id'], out)
+
+
+class TestImageUploadFakeCloud(E2EBase):
+    def upload(self, path, **kwargs):
+        args = SimpleNamespace(file=str(path), profile='load', catalog='cat000', username=None, password=None,
+                               name=None, disk_format=None, container_format='bare', visibility=None,
+                               property=['os_distro=ubuntu'], image=None, hash_algo='sha512', chunk_size=1,
+                               timeout=30, format='json')
+        for key, value in kwargs.items():
+            setattr(args, key, value)
+        buf = io.StringIO()
+        with mock.patch('sys.stdout', new=buf), mock.patch('sys.stderr', new=io.StringIO()):
+            code = image_cmd.handle(args, REPO_ROOT)
+        return code, buf.getvalue()
+
+    def test_upload_streams_and_verifies(self):
+        self.write_profiles(1)
+        path = Path(self.td.name) / 'jammy.qcow2'
+        data = os.urandom(12 * 1024 * 1024 + 5)
+        path.write_bytes(data)
+        code, out = self.upload(path)
+        self.assertEqual(code, 0, out)
+        result = json.loads(out)
+        self.assertTrue(result['verified'])
+        self.assertEqual(result['os_hash_value'], hashlib.sha512(data).hexdigest())
+        image = self.cloud.images[result['id']]
+        self.assertEqual((image['name'], image['disk_format'], image['status']), ('jammy', 'qcow2', 'active'))
+        self.assertEqual(image['os_distro'], 'ubuntu')
+
+    def test_upload_invalidates_cached_image_list(self):
+        self.write_profiles(1)
+        os.environ['XDG_CACHE_HOME'] = str(Path(self.td.name) / 'cache')
+        env = api.Session(REPO_ROOT).resolve_env('load', 'cat000')
+        cache = respcache.ResponseCache()
+        cache.put(env, ['image', 'list'], 900, b'old\n')
+        path = Path(self.td.name) / 'disk.raw'
+        path.write_bytes(b'x' * 4096)
+        self.assertEqual(self.upload(path)[0], 0)
+        self.assertIsNone(cache.get(env, ['image', 'list']))
+
+    def test_failed_upload_can_be_retried_into_the_same_image(self):
+        self.write_profiles(1)
+        path = Path(self.td.name) / 'disk.raw'
+        path.write_bytes(b'x' * 4096)
+        self.cloud.error_rate = {'image': 1.0}
+        code, out = self.upload(path)
+        self.assertEqual(code, 2)
+        self.assertIn('Creating image failed', out)
+
+        self.cloud.error_rate = 0
+        broken = image_cmd.glance.GlanceError('PUT: connection failed: reset by peer')
+        with mock.patch.object(image_cmd.glance.ImageClient, 'upload_file', side_effect=broken):
+            code, out = self.upload(path, format='table')
+        self.assertEqual(code, 1)
+        (image_id,) = self.cloud.images
+        self.assertIn('retry with --image %s' % image_id, out)
+        code, out = self.upload(path, image=image_id)
+        self.assertEqual(code, 0, out)
+        self.assertEqual(len(self.cloud.images), 1)
+
+
+@unittest.skipUnless(shutil.which('openstack'), 'python-openstackclient not installed')
+class TestReportRealClient(E2EBase):
+    catalogs = 20
+
+    def test_report_with_openstackclient(self):
+        self.write_profiles(self.catalogs)
+        self.assertEqual(self.report(), 0)
+        self.assertEqual(self.summary()['total']['servers'], 5 * self.catalogs)
+
+
+if __name__ == '__main__':
+    unittest.main()
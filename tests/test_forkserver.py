@@ -0,0 +1,86 @@
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from core import forkserver
+
+TOOL = textwrap.dedent('''\
+    #!{python}
+    import sys
+    preloaded = "zlib" in sys.modules
+    import json
+    import os
+    import zlib
+
+    if os.environ.get("X_PRELOADED"):
+        print("preloaded" if preloaded else "imported")
+    print(json.dumps({{"argv": sys.argv[1:], "var": os.environ.get("X_VAR"), "cwd": os.getcwd()}}))
+    print("line\\r\\nwarn", file=sys.stderr)
+    if os.environ.get("X_CODE") == "message":
+        sys.exit("bad things")
+    sys.exit(int(os.environ.get("X_CODE", "0")))
+''')
+
+
+class TestForkServer(unittest.TestCase):
+    def setUp(self):
+        self.td = tempfile.TemporaryDirectory()
+        self.addCleanup(self.td.cleanup)
+        self.exe = Path(self.td.name) / 'openstack'
+        self.exe.write_text(TOOL.format(python=sys.executable))
+        self.exe.chmod(0o755)
+        self.env = dict(os.environ, X_VAR='value', OS_PASSWORD='secret')
+
+    def test_interpreter_and_imports(self):
+        self.assertEqual(forkserver.interpreter(str(self.exe)), [sys.executable])
+        env_script = Path(self.td.name) / 'env-script'
+        env_script.write_text('#!/usr/bin/env python3\nfrom openstackclient.shell import main\n')
+        self.assertEqual(forkserver.interpreter(str(env_script)), ['python3'])
+        self.assertIn('openstackclient.compute.v2.server', forkserver.script_imports(str(env_script)))
+        shell = Path(self.td.name) / 'sh-script'
+        shell.write_text('#!/bin/sh\nexec true\n')
+        self.assertIsNone(forkserver.interpreter(str(shell)))
+        self.assertEqual(forkserver.script_imports(str(self.exe)), ['sys', 'json', 'os', 'zlib'])
+
+    def test_children_match_fresh_processes(self):
+        server = forkserver.ForkServer(str(self.exe), self.env)
+        self.addCleanup(server.close)
+        cmd = [str(self.exe), 'server', 'list', '--name', 'a b']
+        for code in ('0', '3', 'message'):
+            env = dict(self.env, X_CODE=code)
+            forked = server.run(cmd, env)
+            fresh = subprocess.run(cmd, env=env, capture_output=True, text=True)
+            self.assertEqual((forked.returncode, forked.stdout, forked.stderr),
+                             (fresh.returncode, fresh.stdout, fresh.stderr))
+        env = dict(self.env, X_PRELOADED='1')
+        self.assertTrue(server.run(cmd, env).stdout.startswith('preloaded\n'))
+        self.assertTrue(subprocess.run(cmd, env=env, capture_output=True, text=True).stdout.startswith('imported\n'))
+        self.assertEqual(forked.returncode, 1)
+        self.assertIn('bad things', forked.stderr)
+        # The server process itself holds no credentials
+        with open('/proc/%d/environ' % server.proc.pid, 'rb') as f:
+            self.assertNotIn(b'OS_PASSWORD', f.read())
+
+    def test_servers_fall_back_to_fresh_children(self):
+        shell = Path(self.td.name) / 'openstack-sh'
+        shell.write_text('#!/bin/sh\necho "$@"\nexit 4\n')
+        shell.chmod(0o755)
+        servers = forkserver.ForkServers()
+        with mock.patch('sys.stdout', new=io.StringIO()) as out:
+            result = servers.run([str(shell), 'server', 'list'], self.env)
+            self.assertEqual((result.returncode, result.stdout), (4, 'server list\n'))
+            self.assertIn('Fork server unavailable', out.getvalue())
+            result = servers.run([str(self.exe), 'x'], dict(self.env, X_PRELOADED='1'))
+        self.assertEqual(result.returncode, 0)
+        self.assertTrue(result.stdout.startswith('preloaded\n'))
+        servers.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
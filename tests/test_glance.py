@@ -0,0 +1,84 @@
+import hashlib
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from core import glance
+from tests.fakeos import FakeOpenStack
+
+
+class TestGlanceHelpers(unittest.TestCase):
+    def test_hashing_reader_single_pass(self):
+        data = os.urandom(10000)
+        seen = []
+        reader = glance.HashingReader(memoryview(data), 'sha256', progress=lambda done, total: seen.append(done))
+        blocks = []
+        while True:
+            block = reader.read(4096)
+            if not block:
+                break
+            self.assertIsInstance(block, memoryview)
+            blocks.append(bytes(block))
+        self.assertEqual(b''.join(blocks), data)
+        self.assertEqual(seen, [4096, 8192, 10000])
+        self.assertEqual(reader.md5.hexdigest(), hashlib.md5(data).hexdigest())
+        self.assertEqual(reader.multihash.hexdigest(), hashlib.sha256(data).hexdigest())
+
+    def test_guess_disk_format(self):
+        self.assertEqual(glance.guess_disk_format('/x/jammy.QCOW2'), 'qcow2')
+        self.assertEqual(glance.guess_disk_format('disk.img'), 'raw')
+        self.assertEqual(glance.guess_disk_format('blob'), 'raw')
+
+    def test_verify(self):
+        local = {'size': 3, 'checksum': 'a', 'os_hash_algo': 'sha512', 'os_hash_value': 'b'}
+        self.assertEqual(glance.verify(local, dict(local)), [])
+        self.assertEqual(glance.verify(local, {'size': 3, 'checksum': 'a', 'os_hash_algo': 'sha256', 'os_hash_value': 'z'}), [])
+        problems = glance.verify(local, dict(local, size=4, os_hash_value='c'))
+        self.assertEqual(len(problems), 2)
+
+
+class TestImageClientFakeCloud(unittest.TestCase):
+    def setUp(self):
+        self.cloud = FakeOpenStack().start()
+        self.addCleanup(self.cloud.stop)
+        self.client = glance.ImageClient(self.cloud.catalog_env('proj-1'), chunk_size=1 << 20)
+        self.addCleanup(self.client.close)
+        self.td = tempfile.TemporaryDirectory()
+        self.addCleanup(self.td.cleanup)
+
+    def write(self, size):
+        path = Path(self.td.name) / ('disk-%d.raw' % size)
+        data = os.urandom(size)
+        path.write_bytes(data)
+        return path, data
+
+    def test_upload_matches_server_hashes(self):
+        path, data = self.write(5 * (1 << 20) + 17)
+        image = self.client.create_image('disk', 'raw', visibility='private', properties={'os_distro': 'ubuntu'})
+        self.assertEqual(image['status'], 'queued')
+        result = self.client.upload_file(image['id'], path)
+        stored = self.client.get_image(image['id'])
+        self.assertEqual(stored['status'], 'active')
+        self.assertEqual(stored['os_distro'], 'ubuntu')
+        self.assertEqual(result['size'], len(data))
+        self.assertEqual(result['os_hash_value'], hashlib.sha512(data).hexdigest())
+        self.assertEqual(glance.verify(result, stored), [])
+        self.assertGreater(result['throughput'], 0)
+        # One connection for create, upload and show
+        self.assertEqual(self.cloud.requests['image'], 3)
+
+    def test_empty_file_and_errors(self):
+        path, _ = self.write(0)
+        image = self.client.create_image('empty', 'raw')
+        result = self.client.upload_file(image['id'], path)
+        self.assertEqual(result['checksum'], hashlib.md5(b'').hexdigest())
+        with self.assertRaises(glance.GlanceError) as ctx:
+            self.client.upload_file(image['id'], path)
+        self.assertIn('HTTP 409', str(ctx.exception))
+        with self.assertRaises(glance.GlanceError):
+            self.client.get_image('missing')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import gzip
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from core.history import HistoryStore, split_parts
+
+
+class TestHistory(unittest.TestCase):
+    def setUp(self):
+        self.td = tempfile.TemporaryDirectory()
+        self.root = Path(self.td.name)
+        self.store = HistoryStore(self.root / 'history')
+
+    def tearDown(self):
+        self.td.cleanup()
+
+    def _write_run(self, name, files):
+        out = self.root / name
+        paths = []
+        for rel, content in files.items():
+            p = out / rel
+            p.parent.mkdir(parents=True, exist_ok=True)
+            p.write_bytes(content)
+            paths.append(p)
+        return out, paths
+
+    def test_split_parts(self):
+        self.assertEqual(split_parts(b'# h\n# t\n\nbody\n'), [b'# h\n# t\n\n', b'body\n'])
+        self.assertEqual(split_parts(b'plain\n\ntext'), [b'plain\n\ntext'])
+        self.assertEqual(split_parts(b'# header only\n\n'), [b'# header only\n\n'])
+
+    def test_identical_bodies_stored_once_and_restored(self):
+        body = b'| ID | Name |\n' * 200
+        t0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        out1, files1 = self._write_run('r1', {'dev/app/report.txt': b'# Time: 1\n\n' + body})
+        run1, stats1 = self.store.record_run(out1, files1, now=t0)
+        out2, files2 = self._write_run('r2', {'dev/app/report.txt': b'# Time: 2\n\n' + body})
+        run2, stats2 = self.store.record_run(out2, files2, now=t0 + timedelta(days=1))
+        self.assertEqual(stats1['new_objects'], 2)
+        self.assertEqual(stats2['new_objects'], 1)  # only the new header
+        blob = next((self.store.root / 'objects').glob('*/*.gz'))
+        gzip.decompress(blob.read_bytes())
+
+        dest = self.root / 'restored'
+        self.assertEqual(self.store.restore(run1, dest), 1)
+        self.assertEqual((dest / 'dev/app/report.txt').read_bytes(), b'# Time: 1\n\n' + body)
+        with self.assertRaises(LookupError):
+            self.store.restore('nope', dest)
+
+    def test_prune_by_runs_and_days(self):
+        t0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        ids = []
+        for i in range(4):
+            out, files = self._write_run('r%d' % i, {'p/c/report.txt': b'# t%d\n\nbody%d\n' % (i, i % 2)})
+            ids.append(self.store.record_run(out, files, now=t0 + timedelta(days=i))[0])
+        # keep newest 3: drops run 0 and its header (body0 still used by run 2)
+        removed_runs, removed_objects = self.store.prune(keep_runs=3, now=t0 + timedelta(days=4))
+        self.assertEqual((removed_runs, removed_objects), (1, 1))
+        # older than 1.5 days relative to day 4: drops runs 1 and 2
+        removed_runs, removed_objects = self.store.prune(keep_days=1.5, now=t0 + timedelta(days=4))
+        self.assertEqual(removed_runs, 2)
+        self.assertEqual([r['run_id'] for r in self.store.list_runs()], [ids[3]])
+        self.assertEqual(len(list((self.store.root / 'objects').glob('*/*.gz'))), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import json
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from pathlib import Path
+
+from core import incremental
+
+
+def rows(*items):
+    return json.dumps([{'ID': i, 'Name': 'vm-' + i, 'Status': s} for i, s in items], indent=2)
+
+
+class TestIncremental(unittest.TestCase):
+    def setUp(self):
+        self.td = tempfile.TemporaryDirectory()
+        self.path = Path(self.td.name) / incremental.SYNC_FILE
+        self.t0 = datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+    def tearDown(self):
+        self.td.cleanup()
+
+    def test_full_then_delta_merge(self):
+        m = incremental.ServerMap.load(self.path, 'sig')
+        self.assertEqual(m.fetch_args(), [])
+        self.assertEqual(m.apply(rows(('a', 'ACTIVE'), ('b', 'ACTIVE')), self.t0), (2, 0))
+        m.save()
+
+        m = incremental.ServerMap.load(self.path, 'sig')
+        self.assertEqual(m.fetch_args(), ['--changes-since', '2026-03-01T11:55:00Z'])
+        self.assertEqual(m.apply(rows(('b', 'DELETED'), ('c', 'BUILD'), ('a', 'SHUTOFF')), self.t0), (2, 1))
+        rendered = json.loads(m.render())
+        self.assertEqual([(r['ID'], r['Status']) for r in rendered], [('a', 'SHUTOFF'), ('c', 'BUILD')])
+        self.assertEqual(json.loads(m.render(['Name'])), [{'Name': 'vm-a'}, {'Name': 'vm-c'}])
+
+    def test_other_query_starts_over(self):
+        m = incremental.ServerMap.load(self.path, 'sig')
+        m.apply(rows(('a', 'ACTIVE')), self.t0)
+        m.save()
+        other = incremental.ServerMap.load(self.path, 'other')
+        self.assertEqual((other.synced_at, other.servers), (None, {}))
+        self.path.write_text('{broken')
+        self.assertEqual(incremental.ServerMap.load(self.path, 'sig').servers, {})
+
+    def test_fetch_columns_and_signature(self):
+        self.assertEqual(incremental.fetch_columns([]), [])
+        self.assertEqual(incremental.fetch_columns(['Name', 'status']), ['Name', 'status', 'ID'])
+        env = {'OS_AUTH_URL': 'u', 'OS_PROJECT_ID': 'p', 'OS_PASSWORD': 'x'}
+        sig = incremental.signature(['--long'], env)
+        self.assertEqual(sig, incremental.signature(['--long'], dict(env, OS_PASSWORD='y')))
+        self.assertNotEqual(sig, incremental.signature([], env))
+        self.assertNotEqual(sig, incremental.signature(['--long'], dict(env, OS_PROJECT_ID='q')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+import json
+import threading
+import time
+import unittest
+import urllib.error
+import urllib.request
+
+from core.commands import serve_cmd
+from core.inventory import Inventory, make_server, parse_bind
+
+
+class FakeFetch:
+    def __init__(self):
+        self.calls = 0
+        self.release = threading.Event()
+        self.release.set()
+        self.fail = None
+        self.rows = [{'ID': '1', 'Status': 'ACTIVE'}, {'ID': '2', 'Status': 'ERROR'}]
+
+    def __call__(self, profile, catalog):
+        self.calls += 1
+        self.release.wait(5)
+        if self.fail:
+            raise RuntimeError(self.fail)
+        return [dict(r, Name='%s-%s' % (catalog, r['ID'])) for r in self.rows]
+
+
+class TestInventory(unittest.TestCase):
+    def serve(self, fetch, **kwargs):
+        inv = Inventory(fetch, [('dev', 'app'), ('dev', 'db')], **kwargs).start()
+        server = make_server(inv, '127.0.0.1', 0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        def cleanup():
+            server.shutdown()
+            server.server_close()
+            fetch.release.set()
+            inv.stop()
+
+        self.addCleanup(cleanup)
+        self.base = 'http://127.0.0.1:%d' % server.server_address[1]
+        return inv
+
+    def get(self, path, etag=None):
+        req = urllib.request.Request(self.base + path, headers={'If-None-Match': etag} if etag else {})
+        try:
+            with urllib.request.urlopen(req, timeout=10) as resp:
+                return resp.status, resp.headers, resp.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers, e.read()
+
+    def test_many_readers_share_one_fetch(self):
+        fetch = FakeFetch()
+        fetch.release.clear()
+        self.serve(fetch)
+        results = []
+        readers = [threading.Thread(target=lambda: results.append(self.get('/catalogs/dev/app/servers')))
+                   for _ in range(20)]
+        for t in readers:
+            t.start()
+        time.sleep(0.2)
+        fetch.release.set()
+        for t in readers:
+            t.join()
+        self.assertEqual(fetch.calls, 2)  # one per catalog
+        self.assertEqual({r[0] for r in results}, {200})
+        self.assertEqual(len({r[2] for r in results}), 1)
+        body = json.loads(results[0][2])
+        self.assertEqual([s['Name'] for s in body['servers']], ['app-1', 'app-2'])
+
+    def test_etag_conditional_and_summary(self):
+        self.serve(FakeFetch())
+        status, headers, body = self.get('/catalogs/dev/db/summary')
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body)['status'], {'ACTIVE': 1, 'ERROR': 1})
+        self.assertIn('max-age=', headers['Cache-Control'])
+        status, _, body = self.get('/catalogs/dev/db/summary', etag=headers['ETag'])
+        self.assertEqual((status, body), (304, b''))
+
+        status, headers, body = self.get('/summary')
+        self.assertEqual(json.loads(body)['total']['servers'], 4)
+        self.assertEqual(self.get('/summary', etag=headers['ETag'])[0], 304)
+        self.assertEqual(self.get('/catalogs/dev/nope/servers')[0], 404)
+        self.assertEqual(self.get('/healthz')[0], 200)
+
+    def test_ttl_refresh_keeps_last_good_data_on_error(self):
+        fetch = FakeFetch()
+        inv = self.serve(fetch, ttl=0.2, error_ttl=0.2)
+        _, headers, _ = self.get('/catalogs/dev/app/servers')
+        fetches = inv.entries[('dev', 'app')].fetches
+        time.sleep(0.5)
+        # Refreshed with identical data: same ETag, though fetched_at moved
+        self.assertGreater(inv.entries[('dev', 'app')].fetches, fetches)
+        self.assertEqual(self.get('/catalogs/dev/app/servers', etag=headers['ETag'])[0], 304)
+        status, summary_headers, _ = self.get('/summary')
+        time.sleep(0.5)
+        self.assertEqual(self.get('/summary', etag=summary_headers['ETag'])[0], 304)
+
+        fetch.rows = fetch.rows[:1]
+        time.sleep(0.5)
+        status, headers2, body = self.get('/catalogs/dev/app/servers', etag=headers['ETag'])
+        self.assertEqual(status, 200)
+        self.assertEqual(len(json.loads(body)['servers']), 1)
+
+        fetch.fail = 'exit=1: HTTP 503'
+        time.sleep(0.5)
+        self.assertEqual(self.get('/catalogs/dev/app/servers', etag=headers2['ETag'])[0], 304)
+        catalogs = {c['catalog']: c for c in json.loads(self.get('/catalogs')[2])}
+        self.assertEqual(catalogs['app']['error'], 'exit=1: HTTP 503')
+        self.assertEqual(catalogs['app']['servers'], 1)
+        self.assertGreaterEqual(inv.entries[('dev', 'app')].fetches, 3)
+
+    def test_first_fetch_failure_is_502(self):
+        fetch = FakeFetch()
+        fetch.fail = 'boom'
+        self.serve(fetch)
+        status, _, body = self.get('/catalogs/dev/app/servers')
+        self.assertEqual((status, json.loads(body)['error']), (502, 'boom'))
+
+    def test_option_parsing(self):
+        self.assertEqual(parse_bind('0.0.0.0:8080'), ('0.0.0.0', 8080))
+        self.assertEqual(parse_bind(':9'), ('127.0.0.1', 9))
+        with self.assertRaises(ValueError):
+            parse_bind('localhost')
+        self.assertEqual(serve_cmd.parse_catalog_ttls(['dev/app=30']), {'dev/app': 30})
+        with self.assertRaises(ValueError):
+            serve_cmd.parse_catalog_ttls(['app=30'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+from core import journal
+
+
+class TestRunJournal(unittest.TestCase):
+    def setUp(self):
+        self.td = tempfile.TemporaryDirectory()
+        self.out = Path(self.td.name)
+        self.sig = journal.signature(SimpleNamespace(format='json', filter=['status=ACTIVE'], summary=True))
+
+    def tearDown(self):
+        self.td.cleanup()
+
+    def write_report(self, name, text):
+        path = self.out / name / 'report.txt'
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+
+    def test_resume_reuses_only_intact_successes(self):
+        j = journal.RunJournal(self.out)
+        self.assertEqual(j.begin(self.sig, resume=True), {})
+        for name, code in (('p/a', 0), ('p/b', 0), ('p/c', 1), ('p/d', 0)):
+            self.write_report(name, name)
+            j.record(name, code, name, counts={'servers': 1}, counted=name != 'p/d', note='n' if name == 'p/d' else None)
+        self.write_report('p/b', 'changed after the run')
+        with open(j.path, 'a') as f:
+            f.write('{"type": "report", "name": "p/e"')  # torn by a crash
+
+        done = journal.RunJournal(self.out).begin(self.sig, resume=True)
+        self.assertEqual(sorted(done), ['p/a', 'p/d'])
+        self.assertEqual(done['p/a']['counts'], {'servers': 1})
+        self.assertEqual((done['p/d']['counted'], done['p/d']['note']), (False, 'n'))
+
+        # A later success for the same report wins
+        j.record('p/c', 0, 'p/c')
+        self.assertIn('p/c', journal.RunJournal(self.out).begin(self.sig, resume=True))
+
+    def test_options_must_match_and_fresh_run_resets(self):
+        j = journal.RunJournal(self.out)
+        j.begin(self.sig)
+        self.write_report('p/a', 'x')
+        j.record('p/a', 0, 'x')
+        other = dict(self.sig, format='table')
+        with self.assertRaisesRegex(ValueError, 'different format'):
+            journal.RunJournal(self.out).begin(other, resume=True)
+        self.assertEqual(journal.RunJournal(self.out).begin(other), {})
+        lines = j.path.read_text().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(json.loads(lines[0])['options']['format'], 'table')
+
+    def test_another_shard_cannot_resume(self):
+        sig = journal.signature(SimpleNamespace(format='json', shard='1/4'))
+        journal.RunJournal(self.out).begin(sig)
+        with self.assertRaisesRegex(ValueError, 'different shard'):
+            journal.RunJournal(self.out).begin(dict(sig, shard='2/4'), resume=True)
+        # A journal written before an option existed resumes with it unset
+        header = json.loads(journal.RunJournal(self.out).path.read_text())
+        del header['options']['shard']
+        journal.RunJournal(self.out).path.write_text(json.dumps(header) + '\n')
+        self.assertEqual(journal.RunJournal(self.out).begin(dict(sig, shard=None), resume=True), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+
+from core import authurls, keystone
+
+
+class _TokenHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.requests.append((self.path, body))
+        identity = body['auth']['identity']
+        if 'password' in identity and identity['password']['user']['password'] != 'good':
+            self.send_response(401)
+            self.send_header('Content-Type', 'application/json')
+            self.end_headers()
+            self.wfile.write(b'{"error": {"code": 401, "message": "The request you have made requires authentication."}}')
+            return
+        self.send_response(201)
+        self.send_header('X-Subject-Token', 'tok-%d' % len(self.server.requests))
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        token = {'expires_at': '2030-01-01T00:00:00Z', 'project': {'id': 'p1', 'name': 'app'}}
+        self.wfile.write(json.dumps({'token': token}).encode())
+
+
+class TestKeystone(unittest.TestCase):
+    def setUp(self):
+        self.server = HTTPServer(('127.0.0.1', 0), _TokenHandler)
+        self.server.requests = []
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.url = 'http://127.0.0.1:%d/v3' % self.server.server_address[1]
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_identity_url_normalization(self):
+        self.assertEqual(keystone.identity_url('https://k:5000'), 'https://k:5000/v3')
+        self.assertEqual(keystone.identity_url('https://k:5000/v3/'), 'https://k:5000/v3')
+        self.assertEqual(keystone.identity_url('https://k/identity/v2.0'), 'https://k/identity/v3')
+
+    def test_password_auth_body_scopes(self):
+        body = keystone.password_auth_body({
+            'OS_USERNAME': 'u', 'OS_PASSWORD': 'p', 'OS_USER_DOMAIN_NAME': 'Default',
+            'OS_PROJECT_NAME': 'app', 'OS_PROJECT_DOMAIN_ID': 'd1',
+        })
+        user = body['auth']['identity']['password']['user']
+        self.assertEqual(user['domain'], {'name': 'Default'})
+        self.assertEqual(body['auth']['scope'], {'project': {'name': 'app', 'domain': {'id': 'd1'}}})
+        body = keystone.password_auth_body({'OS_USERNAME': 'u', 'OS_PASSWORD': 'p', 'OS_PROJECT_ID': 'x'}, scoped=False)
+        self.assertNotIn('scope', body['auth'])
+
+    def test_authenticate_success(self):
+        env = {'OS_AUTH_URL': self.url, 'OS_USERNAME': 'u', 'OS_PASSWORD': 'good', 'OS_PROJECT_ID': 'p1'}
+        token = keystone.authenticate(env, timeout=5, catalog=False)
+        self.assertEqual(token['id'], 'tok-1')
+        self.assertEqual(token['project']['name'], 'app')
+        self.assertGreaterEqual(token['elapsed'], 0)
+        self.assertEqual(self.server.requests[0][0], '/v3/auth/tokens?nocatalog')
+
+    def test_authenticate_failure_and_rescope(self):
+        env = {'OS_AUTH_URL': self.url, 'OS_USERNAME': 'u', 'OS_PASSWORD': 'bad'}
+        with self.assertRaises(keystone.KeystoneError) as ctx:
+            keystone.authenticate(env, timeout=5)
+        self.assertIn('HTTP 401', str(ctx.exception))
+        token = keystone.rescope({'OS_AUTH_URL': self.url, 'OS_PROJECT_ID': 'p2'}, 'unscoped', timeout=5)
+        self.assertEqual(token['id'], 'tok-2')
+        sent = self.server.requests[1][1]['auth']
+        self.assertEqual(sent['identity']['token']['id'], 'unscoped')
+        self.assertEqual(sent['scope'], {'project': {'id': 'p2'}})
+
+    def test_unscoped_tokens_cache_and_renewal(self):
+        env = {'OS_AUTH_URL': self.url, 'OS_USERNAME': 'u', 'OS_PASSWORD': 'good', 'OS_PROJECT_ID': 'a'}
+        tokens = keystone.UnscopedTokens(timeout=5)
+        first = tokens.get(env)
+        self.assertIs(tokens.get(dict(env, OS_PROJECT_ID='b')), first)
+        self.assertNotIn('scope', self.server.requests[0][1]['auth'])
+        self.assertEqual(len(self.server.requests), 1)
+        # fake server tokens expire in 2030; a huge margin forces renewal
+        tokens.margin = 10 ** 10
+        self.assertNotEqual(tokens.get(env)['id'], first['id'])
+        bad = dict(env, OS_PASSWORD='bad')
+        for _ in range(2):
+            with self.assertRaises(keystone.KeystoneError):
+                tokens.get(bad)
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_token_env_strips_password(self):
+        env = keystone.token_env({'OS_AUTH_URL': 'u', 'OS_USERNAME': 'u', 'OS_PASSWORD': 'p',
+                                  'OS_USER_DOMAIN_NAME': 'D', 'OS_PROJECT_ID': 'x'}, 'tok')
+        self.assertEqual(env, {'OS_AUTH_URL': 'u', 'OS_PROJECT_ID': 'x', 'OS_AUTH_TYPE': 'v3token', 'OS_TOKEN': 'tok'})
+
+    def test_connection_error(self):
+        env = {'OS_AUTH_URL': 'http://127.0.0.1:1/v3', 'OS_USERNAME': 'u', 'OS_PASSWORD': 'p'}
+        with self.assertRaises(keystone.KeystoneError) as ctx:
+            keystone.authenticate(env, timeout=2)
+        self.assertIn('connection failed', str(ctx.exception))
+        self.assertIsInstance(ctx.exception, keystone.KeystoneConnectionError)
+
+    def test_authenticate_fails_over_to_alternate_auth_url(self):
+        dead = 'http://127.0.0.1:1/v3'
+        env = {'OS_AUTH_URL': dead, 'OSSC_AUTH_URLS': self.url, 'OS_USERNAME': 'u', 'OS_PASSWORD': 'good'}
+        with tempfile.TemporaryDirectory() as td, mock.patch.dict(os.environ, {'XDG_CACHE_HOME': td}):
+            token = keystone.authenticate(env, timeout=2)
+            self.assertEqual(token['auth_url'], self.url)
+            health = json.loads((Path(td) / 'ossc' / 'auth-urls.json').read_text())
+            self.assertFalse(health[dead]['ok'])
+            self.assertTrue(health[self.url]['ok'])
+            # The dead URL is now tried last, so it is not hit again; an unchanged
+            # healthy URL is only written when the process flushes the cache
+            with mock.patch.object(authurls.HealthCache, 'save') as save:
+                keystone.authenticate(env, timeout=2)
+            save.assert_not_called()
+            authurls.shared_cache().flush()
+            saved = json.loads((Path(td) / 'ossc' / 'auth-urls.json').read_text())
+            self.assertEqual(saved[dead]['failures'], 1)
+            self.assertGreaterEqual(saved[self.url]['checked'], health[self.url]['checked'])
+            self.assertFalse(authurls.shared_cache().dirty)
+        self.assertEqual(len(self.server.requests), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import io
+import json
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+from core import latency
+from core.commands import stats_cmd
+
+
+class TestLatency(unittest.TestCase):
+    def setUp(self):
+        self.td = tempfile.TemporaryDirectory()
+        self.path = Path(self.td.name) / 'state' / 'latency.log'
+
+    def tearDown(self):
+        self.td.cleanup()
+
+    def test_names(self):
+        env = {'OS_AUTH_URL': 'https://keystone.example.com:5000/v3', 'OS_REGION_NAME': 'RegionOne'}
+        self.assertEqual(latency.endpoint(env), 'keystone.example.com:5000/RegionOne')
+        self.assertEqual(latency.endpoint({}), '-')
+        self.assertEqual(latency.command_name(['server', 'list', '-f', 'json']), 'server list')
+        self.assertEqual(latency.command_name(['security', 'group', 'rule', 'list']), 'security group rule')
+        self.assertEqual(latency.command_name(['--help']), '-')
+
+    def test_log_path(self):
+        with mock.patch.dict('os.environ', {'OSSC_LATENCY_LOG': 'off'}):
+            self.assertIsNone(latency.log_path())
+        with mock.patch.dict('os.environ', {'OSSC_LATENCY_LOG': '', 'XDG_STATE_HOME': '/s'}):
+            self.assertEqual(latency.log_path(), Path('/s/ossc/latency.log'))
+
+    def test_record_and_rotate(self):
+        env = {'OS_AUTH_URL': 'http://k:5000/v3'}
+        latency.record('proxy', 'dev', 'app', 'server list', env, 0, 1.23456, None, path=self.path)
+        recs = list(latency.read_records(self.path))
+        self.assertEqual(len(recs), 1)
+        self.assertEqual(recs[0]['wall'], 1.235)
+        self.assertEqual(recs[0]['endpoint'], 'k:5000')
+        self.assertIsNone(recs[0]['child'])
+
+        with mock.patch.object(latency, 'MAX_BYTES', 1):
+            latency.record('proxy', 'dev', 'app', 'server list', env, 1, 2.0, 1.5, path=self.path)
+        self.assertFalse(self.path.exists())
+        self.assertTrue(self.path.with_name('latency.log.1').exists())
+        latency.record('report', 'dev', 'app', 'server list', env, 0, 3.0, 2.5, path=self.path)
+        with open(self.path, 'a') as f:
+            f.write('{"torn\n')
+        self.assertEqual([r['wall'] for r in latency.read_records(self.path)], [1.235, 2.0, 3.0])
+        self.assertEqual(len(list(latency.read_records(self.path, since=recs[0]['ts'] + 3600))), 0)
+
+    def test_record_never_raises(self):
+        blocker = Path(self.td.name) / 'file'
+        blocker.write_text('')
+        latency.record('proxy', 'p', 'c', 'x', {}, 0, 1.0, 1.0, path=blocker / 'latency.log')
+
+    def test_window_and_percentile(self):
+        self.assertEqual(latency.parse_window('30m', now=10000), 8200)
+        self.assertEqual(latency.parse_window('1d', now=86400), 0)
+        with self.assertRaises(ValueError):
+            latency.parse_window('yesterday')
+        values = list(range(1, 101))
+        self.assertEqual(latency.percentile(values, 50), 50)
+        self.assertEqual(latency.percentile(values, 95), 95)
+        self.assertEqual(latency.percentile([7], 99), 7)
+        self.assertIsNone(latency.percentile([], 50))
+
+    def test_aggregate(self):
+        recs = [{'profile': 'dev', 'catalog': 'a', 'cmd': 'server list', 'rc': 0, 'wall': w, 'child': w - 0.1}
+                for w in (1.0, 2.0, 3.0)]
+        recs.append({'profile': 'dev', 'catalog': 'b', 'cmd': 'server list', 'rc': 1, 'wall': 9.0, 'child': None})
+        rows = latency.aggregate(recs, 'catalog')
+        self.assertEqual([r['catalog'] for r in rows], ['dev/b', 'dev/a'])
+        self.assertEqual(rows[0]['error_rate'], 1.0)
+        self.assertIsNone(rows[0]['child_p50'])
+        self.assertEqual((rows[1]['count'], rows[1]['p50'], rows[1]['p95']), (3, 2.0, 3.0))
+        self.assertEqual(latency.aggregate(recs, 'command')[0]['count'], 4)
+        with self.assertRaises(ValueError):
+            latency.aggregate(recs, 'user')
+
+    def test_stats_command(self):
+        for catalog, wall in (('a', 1.0), ('a', 2.0), ('b', 0.5)):
+            latency.record('proxy', 'dev', catalog, 'server list', {}, 0, wall, wall, path=self.path)
+
+        def stats(**kw):
+            args = SimpleNamespace(since='1h', by='catalog', format='json', log=str(self.path), profile=None, catalog=None)
+            vars(args).update(kw)
+            buf = io.StringIO()
+            with redirect_stdout(buf):
+                code = stats_cmd.handle(args, Path('.'))
+            return code, buf.getvalue()
+
+        code, out = stats()
+        self.assertEqual(code, 0)
+        self.assertEqual([(r['catalog'], r['count']) for r in json.loads(out)], [('dev/a', 2), ('dev/b', 1)])
+        code, out = stats(catalog='b', format='table')
+        self.assertIn('dev/b', out)
+        self.assertNotIn('dev/a', out)
+        self.assertEqual(stats(since='soon')[0], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import stat
+import tempfile
+import unittest
+from pathlib import Path
+
+from core import metrics
+from core.summary import ServerCounts
+
+
+def samples(text):
+    """{series with labels: value} from the text exposition format."""
+    out = {}
+    for line in text.splitlines():
+        if line and not line.startswith('#'):
+            series, value = line.rsplit(' ', 1)
+            out[series] = float(value)
+    return out
+
+
+class TestMetrics(unittest.TestCase):
+    def test_render(self):
+        counts = ServerCounts()
+        for status in ('ACTIVE', 'ACTIVE', 'ERROR'):
+            counts.add({'Status': status})
+        run = metrics.RunMetrics()
+        run.add_catalog('prod/app', 0, 2048, duration=0.7, counts=counts)
+        run.add_catalog('prod/app-alias', 0, 2000, duration=0.7, counts=counts, counted=False)
+        run.add_catalog('prod/net/RegionTwo', 1, 300, duration=12.5)
+        run.add_catalog('dev/"odd"', 0, 100, reused=True)
+        text = run.render(1, 1700000000.5, 42.25)
+        s = samples(text)
+
+        self.assertEqual(s['ossc_report_run_exit_code'], 1)
+        self.assertEqual(s['ossc_report_run_timestamp_seconds'], 1700000000.5)
+        self.assertEqual(s['ossc_report_catalogs{result="failed"}'], 1)
+        self.assertEqual(s['ossc_report_catalogs{result="ok"}'], 2)
+        self.assertEqual(s['ossc_report_catalogs{result="reused"}'], 1)
+        self.assertEqual(s['ossc_report_catalog_exit_code{profile="prod",catalog="net",region="RegionTwo"}'], 1)
+        self.assertEqual(s['ossc_report_catalog_exit_code{profile="dev",catalog="\\"odd\\"",region=""}'], 0)
+        self.assertEqual(s['ossc_report_catalog_servers{profile="prod",catalog="app",region="",status="ACTIVE"}'], 2)
+        self.assertEqual(s['ossc_report_catalog_bytes{profile="prod",catalog="app",region=""}'], 2048)
+        self.assertNotIn('ossc_report_catalog_duration_seconds{profile="dev",catalog="\\"odd\\"",region=""}', s)
+        # Histograms count each query once and are cumulative
+        self.assertEqual(s['ossc_report_query_duration_seconds_bucket{le="0.5"}'], 0)
+        self.assertEqual(s['ossc_report_query_duration_seconds_bucket{le="1"}'], 1)
+        self.assertEqual(s['ossc_report_query_duration_seconds_bucket{le="30"}'], 2)
+        self.assertEqual(s['ossc_report_query_duration_seconds_bucket{le="+Inf"}'], 2)
+        self.assertEqual(s['ossc_report_query_duration_seconds_sum'], 13.2)
+        self.assertEqual(s['ossc_report_report_bytes_bucket{le="1048576"}'], 2)
+        self.assertIn('# TYPE ossc_report_query_duration_seconds histogram', text)
+        self.assertEqual(text.count('# TYPE ossc_report_catalog_servers gauge'), 1)
+
+    def test_write_is_atomic_and_readable(self):
+        with tempfile.TemporaryDirectory() as td:
+            path = Path(td) / 'ossc.prom'
+            metrics.write(path, 'a 1\n')
+            metrics.write(path, 'a 2\n')
+            self.assertEqual(path.read_text(), 'a 2\n')
+            self.assertEqual(os.listdir(td), ['ossc.prom'])
+            self.assertTrue(path.stat().st_mode & stat.S_IROTH)
+
+
+if __name__ == '__main__':
+    unittest.main()
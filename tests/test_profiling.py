@@ -0,0 +1,94 @@
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from core import profiling
+from core.commands import profile_cmd
+
+FAKE_OPENSTACK = """#!{python}
+import sys
+import json, decimal
+
+def main():
+    sys.stdout.write("servers:" + " ".join(sys.argv[1:]) + "\\n")
+    sys.stderr.write("warning: fake\\n")
+    return 3
+
+if __name__ == "__main__":
+    sys.exit(main())
+"""
+
+
+class TestProfiling(unittest.TestCase):
+    def setUp(self):
+        self.td = tempfile.TemporaryDirectory()
+        self.root = Path(self.td.name)
+        self.exe = self.root / 'openstack'
+        self.exe.write_text(FAKE_OPENSTACK.format(python=sys.executable), encoding='utf-8')
+        os.chmod(self.exe, 0o755)
+
+    def tearDown(self):
+        self.td.cleanup()
+
+    def test_child_python_from_shebang(self):
+        self.assertEqual(profiling.child_python(str(self.exe)), sys.executable)
+        env_script = self.root / 'envscript'
+        env_script.write_text('#!/usr/bin/env python3\n', encoding='utf-8')
+        self.assertEqual(profiling.child_python(str(env_script)), 'python3')
+
+    def test_cprofile_keeps_exit_code_and_summarizes(self):
+        artifact = self.root / 'profile.pstats'
+        cmd = profiling.profiled_command([str(self.exe), 'server', 'list'], 'cprofile', artifact)
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        self.assertEqual(proc.returncode, 3)
+        self.assertEqual(proc.stdout, 'servers:server list\n')
+        rows = profiling.summarize_pstats(artifact, top=1000)
+        self.assertTrue(any(label.startswith('main (') for label, *_ in rows))
+        self.assertIn('cumulative time', profiling.format_summary(artifact, 5))
+
+    def test_importtime_split_and_summary(self):
+        artifact = self.root / 'importtime.log'
+        cmd = profiling.profiled_command([str(self.exe), 'server', 'list'], 'importtime', artifact)
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        self.assertEqual(proc.returncode, 3)
+        log, rest = profiling.split_importtime(proc.stderr)
+        self.assertEqual(rest, 'warning: fake\n')
+        modules, packages = profiling.summarize_importtime(log, top=500)
+        self.assertIn('decimal', [m[0] for m in modules])
+        self.assertIn('json', [p[0] for p in packages])
+
+        artifact.write_text(log, encoding='utf-8')
+        buf = io.StringIO()
+        with mock.patch('sys.stdout', new=buf):
+            code = profile_cmd.handle(mock.Mock(path=str(artifact), top=3), Path('.'))
+        self.assertEqual(code, 0)
+        self.assertIn('by cumulative import time', buf.getvalue())
+
+    def test_run_profiled_importtime_forwards_stderr(self):
+        artifact = self.root / 'p' / 'importtime.log'
+        err = io.StringIO()
+        with mock.patch('sys.stderr', new=err), mock.patch('sys.stdout', new_callable=io.StringIO) as out:
+            code = profiling.run_profiled([str(self.exe), 'x'], None, 'importtime', artifact)
+        self.assertEqual(code, 3)
+        self.assertEqual(out.getvalue(), 'servers:x\n')
+        self.assertEqual(err.getvalue(), 'warning: fake\n')
+        self.assertTrue(artifact.read_text(encoding='utf-8').startswith('import time:'))
+
+    def test_run_profiled_cprofile_copies_stdout(self):
+        artifact = self.root / 'p' / 'profile.pstats'
+        with mock.patch('sys.stdout', new_callable=io.StringIO) as out, \
+                mock.patch('sys.stderr', new_callable=io.StringIO) as err:
+            code = profiling.run_profiled([str(self.exe), 'server', 'list'], None, 'cprofile', artifact)
+        self.assertEqual(code, 3)
+        self.assertEqual(out.getvalue(), 'servers:server list\n')
+        self.assertEqual(err.getvalue(), 'warning: fake\n')
+        self.assertTrue(artifact.exists())
+
+
+if __name__ == '__main__':
+    unittest.main()
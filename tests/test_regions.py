@@ -0,0 +1,59 @@
+import unittest
+
+from core import keystone, regions
+from tests.fakeos import FakeOpenStack
+
+
+class TestRegions(unittest.TestCase):
+    def test_parse_regions(self):
+        self.assertIsNone(regions.parse_regions(None))
+        self.assertEqual(regions.parse_regions('ALL'), 'all')
+        self.assertEqual(regions.parse_regions(' r1, r2,r1 '), ['r1', 'r2'])
+        with self.assertRaises(ValueError):
+            regions.parse_regions(' , ')
+
+    def test_catalog_regions_by_interface(self):
+        catalog = [
+            {'type': 'identity', 'endpoints': [{'interface': 'public', 'region': 'r0'}]},
+            {'type': 'compute', 'endpoints': [
+                {'interface': 'public', 'region': 'r1', 'region_id': 'r1'},
+                {'interface': 'internal', 'region': 'r2'},
+                {'interface': 'public', 'region': 'r3'},
+                {'interface': 'public', 'region': 'r1'},
+            ]},
+        ]
+        self.assertEqual(regions.catalog_regions(catalog), ['r1', 'r3'])
+        self.assertEqual(regions.catalog_regions(catalog, interface='internal'), ['r2'])
+
+    def test_endpoint_url(self):
+        catalog = [{'type': 'compute', 'endpoints': [
+            {'interface': 'internal', 'region_id': 'r1', 'url': 'http://r1-int'},
+            {'interface': 'public', 'region_id': 'r1', 'url': 'http://r1'},
+            {'interface': 'public', 'region_id': 'r2', 'url': 'http://r2'},
+        ]}]
+        self.assertEqual(regions.endpoint_url({}, catalog, 'compute'), 'http://r1')
+        self.assertEqual(regions.endpoint_url({'OS_REGION_NAME': 'r2'}, catalog, 'compute'), 'http://r2')
+        self.assertEqual(regions.endpoint_url({'OS_INTERFACE': 'internalURL'}, catalog, 'compute'), 'http://r1-int')
+        self.assertIsNone(regions.endpoint_url({'OS_REGION_NAME': 'r3'}, catalog, 'compute'))
+        self.assertIsNone(regions.endpoint_url({}, catalog, 'image'))
+
+    def test_region_envs_use_one_token(self):
+        with FakeOpenStack(regions=('east', 'west')) as cloud:
+            env = cloud.catalog_env('proj-1')
+            result = regions.region_envs(env, 'all')
+            self.assertEqual([r for r, _ in result], ['east', 'west'])
+            self.assertEqual(cloud.requests['identity'], 1)
+            east = result[0][1]
+            self.assertEqual(east['OS_REGION_NAME'], 'east')
+            self.assertEqual(east['OS_AUTH_TYPE'], 'v3token')
+            self.assertNotIn('OS_PASSWORD', east)
+            self.assertEqual(result[0][1]['OS_TOKEN'], result[1][1]['OS_TOKEN'])
+            self.assertIsNotNone(keystone.rescope(east, east['OS_TOKEN'])['project'])
+
+            self.assertEqual(regions.region_envs(env, ['west', 'north'])[1], ('north', None))
+            with self.assertRaises(keystone.KeystoneError):
+                regions.region_envs(dict(env, OS_PASSWORD='bad'), 'all')
+
+
+if __name__ == '__main__':
+    unittest.main()
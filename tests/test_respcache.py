@@ -0,0 +1,67 @@
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+from core import respcache
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.td = tempfile.TemporaryDirectory()
+        self.cache = respcache.ResponseCache(Path(self.td.name))
+        self.env = {'OS_AUTH_URL': 'u', 'OS_PROJECT_ID': 'p', 'OS_PASSWORD': 'x', 'PATH': '/bin'}
+
+    def tearDown(self):
+        self.td.cleanup()
+
+    def test_classification(self):
+        self.assertEqual(respcache.cache_ttl(['flavor', 'list', '-f', 'json']), 3600)
+        self.assertEqual(respcache.cache_ttl(['availability', 'zone', 'list']), 3600)
+        self.assertIsNone(respcache.cache_ttl(['server', 'list']))
+        self.assertIsNone(respcache.cache_ttl(['--os-region-name', 'r', 'flavor', 'list']))
+        self.assertTrue(respcache.is_mutating(['flavor', 'create', '--ram', '1', 'f']))
+        self.assertTrue(respcache.is_mutating(['security', 'group', 'rule', 'create', 'sg']))
+        self.assertFalse(respcache.is_mutating(['server', 'list', '--name', 'delete']))
+        self.assertTrue(respcache.is_mutating(['project', 'purge', '--project', 'p']))
+        self.assertTrue(respcache.is_mutating(['--os-region-name', 'r', 'flavor', 'create', 'f']))
+        self.assertTrue(respcache.is_mutating(['--debug', '--os-cloud=c', 'flavor', 'delete', 'f']))
+        self.assertTrue(respcache.is_mutating(['--unknown-flag', 'flavor', 'set', 'f']))
+        self.assertFalse(respcache.is_mutating(['--os-region-name', 'r', 'flavor', 'list']))
+        self.assertEqual(respcache.skip_options(['--os-region-name', 'r', '-v', 'server', 'list']), ['server', 'list'])
+
+    def test_read_only(self):
+        for argv in (['flavor', 'list'], ['server', 'list', '--long'], ['server', 'show', 'vm1'],
+                     ['security', 'group', 'list'], ['server', 'event', 'list', 'vm1']):
+            self.assertTrue(respcache.is_read_only(argv), argv)
+        for argv in (['server', 'create', 'show'], ['--os-region-name', 'r', 'server', 'list'],
+                     ['--os-region-name', 'r', 'server', 'create', 'vm'], ['server', 'resize', 'confirm', 'vm'],
+                     ['project', 'purge', '--project', 'p'], ['volume', 'backup', 'restore', 'b'], []):
+            self.assertFalse(respcache.is_read_only(argv), argv)
+
+    def test_identity_ignores_secrets(self):
+        ident = respcache.identity(self.env)
+        self.assertEqual(ident, respcache.identity(dict(self.env, OS_PASSWORD='y', OS_TOKEN='t', PATH='/x')))
+        self.assertNotEqual(ident, respcache.identity(dict(self.env, OS_REGION_NAME='r2')))
+
+    def test_get_put_ttl_and_invalidate(self):
+        argv = ['flavor', 'list']
+        self.assertIsNone(self.cache.get(self.env, argv))
+        self.cache.put(self.env, argv, 60, b'm1.small\n', now=1000)
+        self.assertEqual(self.cache.get(self.env, argv, now=1030), (b'm1.small\n', 30))
+        self.assertIsNone(self.cache.get(self.env, argv, now=1061))
+        self.assertIsNone(self.cache.get(self.env, ['flavor', 'list', '-f', 'json'], now=1030))
+        self.assertIsNone(self.cache.get(dict(self.env, OS_PROJECT_ID='q'), argv, now=1030))
+        self.assertTrue(self.cache.invalidate(dict(self.env, OS_PASSWORD='other')))
+        self.assertIsNone(self.cache.get(self.env, argv, now=1030))
+        self.assertFalse(self.cache.invalidate(self.env))
+
+    def test_enabled(self):
+        self.assertFalse(respcache.enabled(SimpleNamespace(), {}))
+        self.assertTrue(respcache.enabled(SimpleNamespace(cache=True), {}))
+        self.assertTrue(respcache.enabled(SimpleNamespace(), {'OSSC_CACHE': '1'}))
+        self.assertFalse(respcache.enabled(SimpleNamespace(cache=True, no_cache=True), {'OSSC_CACHE': '1'}))
+
+
+if __name__ == '__main__':
+    unittest.main()
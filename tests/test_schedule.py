@@ -0,0 +1,41 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from core import schedule
+
+
+class TestSchedule(unittest.TestCase):
+    def test_history_predict_update_save(self):
+        with tempfile.TemporaryDirectory() as td:
+            history = schedule.DurationHistory(Path(td))
+            self.assertEqual(history.predict('p/a'), schedule.DEFAULT_DURATION)
+            history.update('p/a', 10)
+            history.update('p/a', 20)
+            history.update('p/b', 2)
+            history.update('p/c', 4)
+            history.save()
+
+            history = schedule.DurationHistory(Path(td))
+            self.assertEqual(history.predict('p/a'), 15)
+            self.assertEqual(history.durations['p/a']['runs'], 2)
+            self.assertTrue(history.known('p/b'))
+            # Unknown catalogs get the median of the known ones
+            self.assertEqual(history.predict('p/new'), 4)
+
+            (Path(td) / schedule.DURATIONS_FILE).write_text('{broken')
+            self.assertEqual(schedule.DurationHistory(Path(td)).durations, {})
+
+    def test_lpt_order_and_makespan(self):
+        predicted = {'a': 1, 'b': 6, 'c': 1, 'd': 6, 'e': 3}
+        order = schedule.lpt_order(list(predicted), predicted.get)
+        self.assertEqual(order, ['b', 'd', 'e', 'a', 'c'])
+        self.assertEqual(schedule.makespan([predicted[k] for k in order], 2), 9)
+        # The slow tasks started last dominate the tail
+        self.assertEqual(schedule.makespan([1, 1, 3, 6, 6], 2), 10)
+        self.assertEqual(schedule.makespan([5, 5], 1), 10)
+        self.assertEqual(schedule.makespan([], 4), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
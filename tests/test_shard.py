@@ -0,0 +1,77 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from core import shard
+
+
+class TestShard(unittest.TestCase):
+    def test_parse_shard(self):
+        self.assertEqual(shard.parse_shard('2/8'), (2, 8))
+        self.assertEqual(shard.parse_shard(' 1 / 1 '), (1, 1))
+        for bad in ('0/4', '5/4', '1', 'a/b', ''):
+            with self.assertRaises(ValueError):
+                shard.parse_shard(bad)
+
+    def test_rendezvous_assignment_is_stable(self):
+        keys = ['p%d/c%03d' % (i % 3, i) for i in range(600)]
+        before = {k: shard.shard_of(k, 4) for k in keys}
+        self.assertEqual(set(before.values()), {1, 2, 3, 4})
+        self.assertTrue(all(100 < list(before.values()).count(s) < 200 for s in range(1, 5)))
+        # Assignment is per key, so adding catalogs never moves existing ones
+        self.assertEqual({k: shard.shard_of(k, 4) for k in keys}, before)
+        # Growing to 5 shards only moves keys onto the new shard
+        after = {k: shard.shard_of(k, 5) for k in keys}
+        moved = [k for k in keys if after[k] != before[k]]
+        self.assertTrue(all(after[k] == 5 for k in moved))
+        self.assertLess(len(moved), 600 * 0.3)
+
+    def test_read_manifests_checks_completeness(self):
+        with tempfile.TemporaryDirectory() as td:
+            dirs = []
+            for i in (1, 2, 3):
+                d = Path(td) / ('s%d' % i)
+                d.mkdir()
+                shard.write_manifest(d, i, 3, 0, {'p/c%d' % i: 0}, 'now')
+                dirs.append(d)
+            self.assertEqual([m['shard'] for m in shard.read_manifests(reversed(dirs))], [1, 2, 3])
+            with self.assertRaisesRegex(ValueError, 'Missing shard'):
+                shard.read_manifests(dirs[:2])
+            with self.assertRaisesRegex(ValueError, 'given twice'):
+                shard.read_manifests(dirs + [dirs[0]])
+            with self.assertRaisesRegex(ValueError, 'Not a shard output'):
+                shard.read_manifests([Path(td)])
+            shard.write_manifest(dirs[2], 3, 4, 0, {}, 'now')
+            with self.assertRaisesRegex(ValueError, 'different N'):
+                shard.read_manifests(dirs)
+
+    def test_copy_tree_and_merge_summaries(self):
+        with tempfile.TemporaryDirectory() as td:
+            a, b, out = Path(td) / 'a', Path(td) / 'b', Path(td) / 'out'
+            for d, name, servers in ((a, 'c1', 2), (b, 'c2', 3)):
+                (d / 'p' / name).mkdir(parents=True)
+                (d / 'p' / name / 'report.txt').write_text(name)
+                summary = {'total': {'servers': servers, 'status': {'ACTIVE': servers}},
+                           'catalogs': {'p/' + name: {'exit_code': 0, 'servers': servers}}}
+                (d / 'summary.json').write_text(json.dumps(summary))
+            # Leftovers of an earlier run with other shard settings
+            (b / 'p' / 'c1').mkdir()
+            (b / 'p' / 'c1' / 'report.txt').write_text('stale')
+            (b / 'p' / 'c2' / 'r1').mkdir()
+            (b / 'p' / 'c2' / 'r1' / 'report.txt').write_text('r1')
+            owners = {}
+            copied = shard.copy_tree(a, out, owners, {'p/c1': 0}) + shard.copy_tree(b, out, owners, {'p/c2': 0})
+            self.assertEqual(copied, 3)
+            self.assertFalse((out / 'summary.json').exists())
+            self.assertEqual((out / 'p' / 'c1' / 'report.txt').read_text(), 'c1')
+            self.assertEqual((out / 'p' / 'c2' / 'report.txt').read_text(), 'c2')
+            with self.assertRaisesRegex(ValueError, 'in both'):
+                shard.copy_tree(a, out, owners, {'p/c1': 0})
+            merged = shard.merge_summaries([a / 'summary.json', b / 'summary.json'])
+            self.assertEqual(merged.total.to_dict()['status'], {'ACTIVE': 5})
+            self.assertEqual(sorted(merged.catalogs), ['p/c1', 'p/c2'])
+
+
+if __name__ == '__main__':
+    unittest.main()
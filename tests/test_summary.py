@@ -0,0 +1,86 @@
+import json
+import unittest
+
+from core import summary
+
+ROWS = [
+    {'ID': '1', 'Name': 'web-1', 'Status': 'ACTIVE', 'Flavor Name': 'm1.small', 'Image Name': 'ubuntu',
+     'Availability Zone': 'az1', 'Networks': {'net': ['10.0.0.1']}},
+    {'ID': '2', 'Name': 'web-2', 'Status': 'ERROR', 'Flavor Name': 'm1.small', 'Image Name': '',
+     'Availability Zone': 'az2', 'Networks': {}},
+    {'ID': '3', 'Name': 'db', 'Status': 'ACTIVE', 'Flavor Name': 'm1.large', 'Image Name': 'ubuntu',
+     'Availability Zone': 'az1', 'Networks': {}},
+]
+
+
+class TestSummary(unittest.TestCase):
+    def test_json_rows_streamed_in_small_chunks(self):
+        text = json.dumps(ROWS, indent=2)
+        chunks = [text[i:i + 7] for i in range(0, len(text), 7)]
+        rows = list(summary.iter_rows(chunks, 'json'))
+        self.assertEqual([r['ID'] for r in rows], ['1', '2', '3'])
+        self.assertEqual(list(summary.iter_rows(['[]\n'], 'json')), [])
+
+    def test_json_rows_from_one_long_line(self):
+        # `-f json --noindent`: the whole array on one line, split across reads
+        rows = [dict(ROWS[i % 3], ID=str(i)) for i in range(20000)]
+        text = json.dumps(rows) + '\n'
+        chunks = [text[:len(text) // 2], text[len(text) // 2:]]
+        ids = []
+        counts = summary.ServerCounts()
+        for row in summary.iter_rows(chunks, 'json'):
+            ids.append(row['ID'])
+            counts.add(row)
+        self.assertEqual(ids, [str(i) for i in range(20000)])
+        self.assertEqual(counts.servers, 20000)
+        self.assertEqual(counts.to_dict()['status'], {'ACTIVE': 13333, 'ERROR': 6667})
+
+    def test_table_rows_skip_continuation_lines(self):
+        lines = [
+            '+----+-------+--------+\n',
+            '| ID | Name  | Status |\n',
+            '+----+-------+--------+\n',
+            '| 1  | web-1 | ACTIVE |\n',
+            '|    | (cont)|        |\n',
+            '| 2  | web-2 | ERROR  |\n',
+            '+----+-------+--------+\n',
+        ]
+        rows = list(summary.iter_rows(lines, 'table'))
+        self.assertEqual(rows, [{'ID': '1', 'Name': 'web-1', 'Status': 'ACTIVE'},
+                                {'ID': '2', 'Name': 'web-2', 'Status': 'ERROR'}])
+
+    def test_csv_and_yaml_rows(self):
+        csv_lines = ['"ID","Status","Flavor"\n', '"1","ACTIVE","m1"\n', '"2","SHUTOFF","m1"\n']
+        self.assertEqual([r['Status'] for r in summary.iter_rows(csv_lines, 'csv')], ['ACTIVE', 'SHUTOFF'])
+        yaml_lines = [
+            '- Flavor: m1\n', '  ID: a\n', '  Networks:\n', '    net:\n', '    - 10.0.0.1\n', "  Status: 'ACTIVE'\n",
+            '- Flavor: m2\n', '  ID: b\n', '  Networks: {}\n', '  Status: ERROR\n',
+        ]
+        rows = list(summary.iter_rows(yaml_lines, 'yaml'))
+        self.assertEqual(rows, [{'Flavor': 'm1', 'ID': 'a', 'Networks': '', 'Status': 'ACTIVE'},
+                                {'Flavor': 'm2', 'ID': 'b', 'Networks': '{}', 'Status': 'ERROR'}])
+        with self.assertRaises(ValueError):
+            summary.iter_rows([], 'value')
+
+    def test_report_summary_counts_and_dedupe(self):
+        counts = summary.ServerCounts()
+        for row in ROWS:
+            counts.add(row)
+        rs = summary.ReportSummary()
+        rs.add_catalog('dev/app', counts, 0)
+        rs.add_catalog('dev/alias', counts, 0, counted=False, note='same query as dev/app')
+        rs.add_catalog('prod/net', None, 1)
+        data = rs.to_dict('now')
+        self.assertEqual(data['total']['servers'], 3)
+        self.assertEqual(data['total']['status'], {'ACTIVE': 2, 'ERROR': 1})
+        self.assertEqual(data['total']['image'], {'ubuntu': 2, '(none)': 1})
+        self.assertEqual(data['total']['availability_zone'], {'az1': 2, 'az2': 1})
+        self.assertEqual(data['catalogs']['dev/alias']['servers'], 3)
+        self.assertNotIn('servers', data['catalogs']['prod/net'])
+        md = rs.to_markdown('now')
+        self.assertIn('| m1.small | 2 |', md)
+        self.assertIn('| prod/net | 1 | - |  |', md)
+
+
+if __name__ == '__main__':
+    unittest.main()
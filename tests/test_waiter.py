@@ -0,0 +1,110 @@
+import unittest
+from unittest import mock
+
+from core import waiter
+from core.bulk import ComputeError
+
+
+def server(sid, status, task=None):
+    return {'id': sid, 'name': 'vm-' + sid, 'status': status, 'OS-EXT-STS:task_state': task}
+
+
+class FakeSession:
+    """Answers each listing with the next batch; records the query filters."""
+
+    def __init__(self, batches):
+        self.batches = list(batches)
+        self.filters = []
+        self.date = 'Mon, 19 Oct 2026 12:00:10 GMT'
+
+    def list_servers(self, filters=(), page_size=1000, detail=False):
+        assert detail
+        self.filters.append(list(filters))
+        batch = self.batches.pop(0)
+        if isinstance(batch, Exception):
+            raise batch
+        return iter(batch)
+
+
+class TestWaiter(unittest.TestCase):
+    def make(self, batches, wanted=('ACTIVE',), **kwargs):
+        self.now = [0.0]
+        self.sleeps = []
+
+        def sleep(seconds):
+            self.sleeps.append(seconds)
+            self.now[0] += seconds
+
+        session = FakeSession(batches)
+        w = waiter.Waiter(session, wanted, clock=lambda: self.now[0], sleep=sleep, **kwargs)
+        w.track(['a', 'b', 'c'], w.listing())
+        return session, w
+
+    def test_server_state(self):
+        self.assertEqual(waiter.server_state(server('a', 'build', 'spawning')), 'BUILD(spawning)')
+        self.assertEqual(waiter.server_state(server('a', 'ACTIVE')), 'ACTIVE')
+
+    def test_changes_since_comes_from_the_cloud_clock(self):
+        session, w = self.make([[server('a', 'BUILD')]])
+        self.assertEqual(session.filters, [[]])
+        self.assertEqual(w.since, '2026-10-19T12:00:05Z')
+        self.assertEqual(w.states, {'a': 'BUILD', 'b': 'DELETED', 'c': 'DELETED'})
+
+    def test_one_listing_per_poll_until_all_reach_status(self):
+        changes = []
+        session, w = self.make([
+            [server('a', 'BUILD'), server('b', 'BUILD'), server('c', 'ACTIVE')],
+            [],
+            [server('a', 'BUILD', 'spawning'), server('x', 'ACTIVE')],
+            [server('a', 'ACTIVE'), server('b', 'ACTIVE'), server('c', 'ACTIVE')],
+        ])
+        with mock.patch('core.waiter.random.uniform', return_value=1.0):
+            self.assertTrue(w.run(60, on_change=lambda *c: changes.append(c)))
+        self.assertEqual(changes, [('a', 'BUILD', 'BUILD(spawning)'), ('a', 'BUILD(spawning)', 'ACTIVE'),
+                                   ('b', 'BUILD', 'ACTIVE')])
+        self.assertEqual(w.polls, 4)
+        self.assertEqual([f[0][0] for f in session.filters[1:]], ['changes-since'] * 3)
+        # Backs off while nothing changes, back to the base interval after a change
+        self.assertEqual(self.sleeps, [2.0, 3.0, 2.0])
+
+    def test_error_and_deleted_are_final(self):
+        session, w = self.make([
+            [server('a', 'BUILD'), server('b', 'BUILD'), server('c', 'BUILD')],
+            [server('a', 'ERROR'), server('b', 'DELETED')],
+            [server('a', 'ACTIVE'), server('c', 'ACTIVE')],
+        ])
+        self.assertTrue(w.run(60))
+        self.assertEqual(w.states, {'a': 'ERROR', 'b': 'DELETED', 'c': 'ACTIVE'})
+        self.assertEqual(sorted(w.failed()), ['a', 'b'])
+
+    def test_fail_fast_and_waiting_for_deletion(self):
+        session, w = self.make([
+            [server('a', 'BUILD'), server('b', 'BUILD'), server('c', 'BUILD')],
+            [server('a', 'ERROR')],
+        ])
+        self.assertTrue(w.run(60, fail_fast=True))
+        self.assertEqual(w.pending(), ['b', 'c'])
+
+        session, w = self.make([[server('a', 'ACTIVE')], [server('a', 'DELETED')]], wanted=['DELETED'])
+        self.assertTrue(w.run(60))
+        self.assertEqual(w.failed(), [])
+
+    def test_timeout_and_transient_errors(self):
+        session, w = self.make(
+            [[server('a', 'BUILD')], ComputeError('HTTP 429', status=429, retry_after=20)] + [[]] * 20,
+            max_interval=10,
+        )
+        errors = []
+        with mock.patch('core.waiter.random.uniform', return_value=1.0):
+            self.assertFalse(w.run(60, on_error=errors.append))
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(self.sleeps[:3], [2.0, 20, 10])
+        self.assertEqual(self.now[0], 60)
+
+        session, w = self.make([[server('a', 'BUILD')], ComputeError('HTTP 403', status=403)])
+        with self.assertRaises(ComputeError):
+            w.run(60)
+
+
+if __name__ == '__main__':
+    unittest.main()